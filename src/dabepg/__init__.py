@@ -24,12 +24,130 @@
 import datetime
 import locale
 import re
+from operator import attrgetter
 from dateutil.tz import tzlocal
 
 MAX_SHORTCRID = 16777215
 TRIGGER_PATTERN = '[0-9a-fA-F]{8}'
 
-class Bearer:  
+# locale of text not given one, which is that of the host and so not counted as
+# the language of a document
+DEFAULT_LOCALE = locale.getdefaultlocale()
+
+def slot_names(cls):
+    """Returns the names of all the slots of a class and its bases"""
+    names = []
+    for base in cls.__mro__:
+        for name in base.__dict__.get('__slots__', ()):
+            if name not in names: names.append(name)
+    return names
+
+class Compact(object):
+    """Base of the model classes held in large numbers, which keep their attributes 
+    in __slots__ rather than a dictionary on each instance"""
+    
+    __slots__ = ()
+    
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in slot_names(type(self)) if hasattr(self, name))
+    
+    def __setstate__(self, state):
+        for name, value in state.items(): setattr(self, name, value)
+
+class LazyList(list):
+    """Empty list standing in for a collection which has not yet been allocated, 
+    which puts itself in the slot of its owner once something is added to it"""
+    
+    __slots__ = ('owner', 'slot')
+    
+    def __init__(self, owner, slot):
+        list.__init__(self)
+        self.owner = owner
+        self.slot = slot
+        
+    def __reduce__(self):
+        return (list, (list(self),))
+    
+def attaching(name):
+    method = getattr(list, name)
+    def attach(self, *args):
+        owner = self.owner
+        if owner is not None:
+            self.owner = None
+            current = getattr(owner, self.slot)
+            if current is not None: # allocated since this stood in for it
+                return getattr(current, name)(*args)
+            setattr(owner, self.slot, self)
+        return method(self, *args)
+    attach.__name__ = name
+    return attach
+
+for name in ['append', 'extend', 'insert', '__setitem__', '__setslice__', '__iadd__', '__imul__']:
+    setattr(LazyList, name, attaching(name))
+del name
+
+def lazy_list(slot):
+    """Returns a property for a list held in a slot, which is only allocated once
+    something is added to it"""
+    def get(self):
+        value = getattr(self, slot)
+        if value is None: return LazyList(self, slot)
+        return value
+    def set(self, value):
+        setattr(self, slot, value)
+    return property(get, set)
+
+"""Types whose values stand for themselves in a structural key"""
+primitive_types = frozenset([str, unicode, int, long, float, bool, type(None), datetime.timedelta])
+slot_getters = {}
+
+def structural_key(value):
+    """Returns a tuple equal for model objects of the same structure and content,
+    taken over their classes and the values of their attributes in turn. Values are
+    keyed with their class, so that 1, 1.0 and True are told apart."""
+    
+    values = []
+    append = values.append
+    stack = [value]
+    pop = stack.pop
+    push = stack.extend
+    while stack:
+        value = pop()
+        cls = type(value)
+        if cls in primitive_types:
+            append(cls)
+            append(value)
+        elif cls is LazyList or cls is list:
+            append(len(value))
+            push(value)
+        else:
+            getter = slot_getters.get(cls)
+            if getter is not None:
+                append(cls)
+                push(getter(value))
+            elif isinstance(value, Compact):
+                names = slot_names(cls)
+                slot_getters[cls] = lambda value, names=names: [getattr(value, name, None) for name in names]
+                stack.append(value)
+            elif cls is datetime.datetime:
+                # equal times in different zones are written differently, and the
+                # offset goes first as naive and aware times cannot be compared
+                append(value.utcoffset())
+                append(value)
+            elif hasattr(value, '__dict__'):
+                append(value.__class__)
+                for name, x in sorted(value.__dict__.items()):
+                    append(name)
+                    stack.append(x)
+            else:
+                append(value)
+    return tuple(values)
+
+def structural_hash(value):
+    """Returns the hash of the :func:structural_key of a value"""
+    return hash(structural_key(value))
+
+class Bearer(Compact):
     """DAB Bearer details
 
     :param id: ContentId
@@ -40,6 +158,8 @@ class Bearer:
     8 hexadecimal characters.
     :type trigger: str
     """
+    __slots__ = ('id', 'trigger')
+    
     def __init__(self, id, trigger=None):
         """Creates the Bearer"""
 
@@ -53,6 +173,12 @@ class Bearer:
         if isinstance(other, Bearer):
             return self.id == other.id and self.trigger == other.trigger            
         
+    def __ne__(self, other):
+        return not self == other
+    
+    def __hash__(self):
+        return hash((self.id, self.trigger))
+        
     def __str__(self):
         return '%s' % self.id
     
@@ -61,8 +187,9 @@ class Bearer:
         
 
 CONTENTID_PATTERN = '([0-9a-fA-F]{2})\\.([0-9a-fA-F]{4})(\\.([0-9a-fA-F]{4,8})\\.([0-9a-fA-F]{1})){0,1}'
+contentid_pattern = re.compile(CONTENTID_PATTERN)
 
-class ContentId:
+class ContentId(Compact):
     """DAB ensemble Content ID, of the form:
     
     ::
@@ -95,8 +222,23 @@ class ContentId:
     :: 
     
         e1c238
+        
+    A ContentId is a value, hashed and compared on the parts of its string form.
+    Instances shared through :meth:intern or :meth:fromstring must not be modified.
     """
     
+    """Shared instances by the values they were created from, emptied once it holds
+       :attr:interned_size entries"""
+    interned = {}
+    interned_size = 4096
+    
+    """Shared instances by the strings they were parsed from, emptied once it holds
+       :attr:parsed_size entries"""
+    parsed = {}
+    parsed_size = 4096
+    
+    __slots__ = ('ecc', 'eid', 'sid', 'scids', 'xpad')
+    
     def __init__(self, ecc, eid, sid=None, scids=None, xpad=None):
         """Values can be passed in as hex string or integers"""
         self.sid = sid
@@ -126,12 +268,29 @@ class ContentId:
             if isinstance(xpad, int): self.xpad = xpad
             else: self.xpad = int(xpad, 16)  
         
+    @classmethod
+    def intern(cls, ecc, eid, sid=None, scids=None, xpad=None):
+        """Returns the shared ContentId with the given values, creating it the first 
+        time they are seen"""
+        
+        key = (ecc, eid, sid, scids, xpad)
+        id = cls.interned.get(key)
+        if id is None:
+            id = ContentId(ecc, eid, sid, scids, xpad)
+            if len(cls.interned) >= cls.interned_size - 1: cls.interned.clear()
+            id = cls.interned.setdefault((id.ecc, id.eid, id.sid, id.scids, id.xpad), id)
+            cls.interned[key] = id
+        return id
+    
     @classmethod
     def fromstring(cls, string):
-        """Parses a ContentId from its string representation"""        
+        """Parses a ContentId from its string representation, returning the shared
+        instance for it"""        
         
-        pattern = re.compile(CONTENTID_PATTERN)
-        matcher = pattern.search(string)
+        id = cls.parsed.get(string)
+        if id is not None: return id
+        
+        matcher = contentid_pattern.search(string)
         if not matcher: raise ValueError('ContentId %s does not match the pattern: %s' % (string, CONTENTID_PATTERN))
         ecc = matcher.group(1)
         eid = matcher.group(2)
@@ -140,7 +299,11 @@ class ContentId:
         if len(matcher.groups()) > 2:
             sid = matcher.group(4)
             scids = matcher.group(5)
-        return ContentId(ecc, eid, sid, scids)
+        id = ContentId.intern(ecc, eid, sid, scids)
+        
+        if len(cls.parsed) >= cls.parsed_size: cls.parsed.clear()
+        cls.parsed[string] = id
+        return id
     
     def __str__(self):
         id = '{ecc:02x}.{eid:04x}'.format(ecc=self.ecc, eid=self.eid)
@@ -152,7 +315,19 @@ class ContentId:
         return '<ContentId: %s>' % str(self)
     
     def __eq__(self, other):
+        if self is other: return True
+        if isinstance(other, ContentId):
+            if self.ecc != other.ecc or self.eid != other.eid: return False
+            if self.sid is None or self.scids is None: return other.sid is None or other.scids is None
+            return self.sid == other.sid and self.scids == other.scids
         return str(self) == str(other)
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    def __hash__(self):
+        if self.sid is None or self.scids is None: return hash((self.ecc, self.eid))
+        return hash((self.ecc, self.eid, self.sid, self.scids))
             
         
 CRID_PATTERN = 'crid://([^\\/]+)/([^\\/]+)'
@@ -227,8 +402,10 @@ class Epg:
         self.type = type
         self.schedule = schedule if schedule is not None else Schedule()
     
-class Link:
+class Link(Compact):
     """This is used to link to additional information of content."""    
+    
+    __slots__ = ('url', 'mimetype', 'description', 'expiry', 'locale')
         
     def __init__(self, url, mimetype=None, description=None, expiry=None, locale=locale.getlocale()):
         self.url = url
@@ -241,7 +418,7 @@ class Link:
         return self.url
         
         
-class Location:
+class Location(Compact):
     """Describes the time information and the location in the DAB or DRM channel of a programme.
     There may be:
     
@@ -250,9 +427,14 @@ class Location:
     * One bearer element and multiple time elements
     """
     
+    __slots__ = ('_times', '_bearers')
+    
+    times = lazy_list('_times')
+    bearers = lazy_list('_bearers')
+    
     def __init__(self, times=None, bearers=None):
-        self.times = times if times is not None else []
-        self.bearers = [] if bearers is None else map(lambda x: x if isinstance(x, ContentId) else ContentId.fromstring(str(x)), bearers)
+        self._times = times
+        self._bearers = None if bearers is None else map(lambda x: x if isinstance(x, ContentId) else ContentId.fromstring(str(x)), bearers)
         
     def __str__(self):
         return str(dict(times=self.times, bearers=self.bearers))
@@ -261,9 +443,11 @@ class Location:
         return '<Location: %s>' % str(self)
         
         
-class BaseTime:
+class BaseTime(Compact):
     """Base for Absolute and Relative times"""
     
+    __slots__ = ()
+    
     def get_billed_time(self, base):
         raise ValueError('not implemented')
         
@@ -280,6 +464,8 @@ class BaseTime:
 class RelativeTime(BaseTime):
     """Time for a :class:ProgrammeEvent relative to the start of the containing :class:Programme"""
     
+    __slots__ = ('actual_offset', 'actual_duration', 'billed_offset', 'billed_duration')
+    
     def __init__(self, billed_offset, billed_duration, actual_offset=None, actual_duration=None):
         self.actual_offset = actual_offset
         self.actual_duration = actual_duration
@@ -310,6 +496,8 @@ class RelativeTime(BaseTime):
 class Time(BaseTime):
     """Absolute time for a :class:ProgrammeEvent or :class:Programme"""
     
+    __slots__ = ('actual_time', 'actual_duration', 'billed_time', 'billed_duration')
+    
     def __init__(self, billed_time, billed_duration, actual_time=None, actual_duration=None):
         self.actual_time = actual_time
         self.actual_duration = actual_duration
@@ -334,14 +522,20 @@ class Time(BaseTime):
     def __repr__(self):
         return '<Time: %s>' % str(self)
 
-class Text:
+class Text(Compact):
     """Abstract class for textual information"""
     
-    def __init__(self, text, max_length, locale=locale.getdefaultlocale()):
+    __slots__ = ('text', 'locale', '_max_length')
+    
+    # subclasses replace this with their own fixed maximum
+    max_length = property(lambda self: self._max_length)
+    
+    def __init__(self, text, max_length, locale=DEFAULT_LOCALE):
         if not isinstance(text, basestring): raise ValueError('text must be of a basestring subtype, not %s: %s', type(text), text)
         if len(text) > max_length: raise ValueError('text length exceeds the maximum: %d>%d' % (len(text), max_length))
-        self.max_length = max_length
+        self._max_length = max_length
         self.text = text
+        self.locale = locale
         
     def __str__(self):
         return self.text
@@ -352,41 +546,46 @@ class Text:
 class LongDescription(Text):
     """Long descriptive text, with maximum length of 1800 characters"""
     
+    __slots__ = ()
     max_length = 1800
     
-    def __init__(self, text, locale=locale.getdefaultlocale()):
+    def __init__(self, text, locale=DEFAULT_LOCALE):
         Text.__init__(self, text, 1800, locale)
 
 class ShortDescription(Text):
     """Short descriptive text, with maximum length of 180 characters"""
     
+    __slots__ = ()
     max_length = 180
     
-    def __init__(self, text, locale=locale.getdefaultlocale()):
+    def __init__(self, text, locale=DEFAULT_LOCALE):
         Text.__init__(self, text, 180, locale)
         
 class LongName(Text):
     """Long name text, with maximum length of 128 characters"""
     
+    __slots__ = ()
     max_length = 128
     
-    def __init__(self, text, locale=locale.getdefaultlocale()):
+    def __init__(self, text, locale=DEFAULT_LOCALE):
         Text.__init__(self, text, 128, locale)
 
 class MediumName(Text):
     """Medium name text, with maximum length of 16 characters"""
 
+    __slots__ = ()
     max_length = 16
     
-    def __init__(self, text, locale=locale.getdefaultlocale()):
+    def __init__(self, text, locale=DEFAULT_LOCALE):
         Text.__init__(self, text, 16, locale)
         
 class ShortName(Text):
     """Short name text, with maximum length of 8 characters"""
     
+    __slots__ = ()
     max_length = 8
     
-    def __init__(self, text, locale=locale.getdefaultlocale()):
+    def __init__(self, text, locale=DEFAULT_LOCALE):
         Text.__init__(self, text, 8, locale)    
         
 def suggest_names(names):   
@@ -409,7 +608,7 @@ def suggest_names(names):
     return result
         
        
-class Membership:
+class Membership(Compact):
     """The member of a :class:Programme or :class:ProgrammeEvent to a group, references by a
     Short Crid
     
@@ -421,6 +620,8 @@ class Membership:
     :type index: int    
     """
     
+    __slots__ = ('shortcrid', 'crid', 'index')
+    
     def __init__(self, shortcrid, crid=None, index=None):
         self.shortcrid = shortcrid
         self.crid = crid
@@ -453,7 +654,7 @@ class Multimedia:
     LOGO_MONO_RECTANGLE = "logo_mono_rectangle"
     LOGO_COLOUR_RECTANGLE = "logo_colour_rectangle"
     
-    def __init__(self, url, type=LOGO_UNRESTRICTED, mimetype=None, height=None, width=None, locale=locale.getdefaultlocale()):
+    def __init__(self, url, type=LOGO_UNRESTRICTED, mimetype=None, height=None, width=None, locale=DEFAULT_LOCALE):
         self.url = url
         self.type = type
         self.mimetype = mimetype
@@ -464,7 +665,7 @@ class Multimedia:
         elif type != Multimedia.LOGO_UNRESTRICTED and (height or width):
             raise ValueError('should not specify width or height when type is restricted')    
         
-class Programme:
+class Programme(Compact):
     """Describes and locates a programme.
     
     :param shortcrid: Short Crid
@@ -482,6 +683,18 @@ class Programme:
     :type version: int
     """   
     
+    __slots__ = ('shortcrid', 'crid', 'version', 'bitrate', 'onair', 'recommendation', '_names', '_locations', 
+                 '_media', '_genres', '_keywords', '_memberships', '_links', '_events')
+    
+    names = lazy_list('_names')
+    locations = lazy_list('_locations')
+    media = lazy_list('_media')
+    genres = lazy_list('_genres')
+    keywords = lazy_list('_keywords')
+    memberships = lazy_list('_memberships')
+    links = lazy_list('_links')
+    events = lazy_list('_events')
+    
     def __init__(self, shortcrid, crid=None, bitrate=None, onair=True, recommendation=True, version=1):
         self.shortcrid = shortcrid
         self.crid = crid
@@ -489,14 +702,8 @@ class Programme:
         self.bitrate = bitrate
         self.onair = onair
         self.recommendation = recommendation
-        self.names = []
-        self.locations = []
-        self.media = []
-        self.genres = []
-        self.keywords = []
-        self.memberships = []
-        self.links = []
-        self.events = []
+        self._names = self._locations = self._media = self._genres = None
+        self._keywords = self._memberships = self._links = self._events = None
         
     def get_name(self, max_length=LongName.max_length):
         """returns the first name set with a length at or below the max_length field, which 
@@ -527,7 +734,7 @@ class Programme:
         return '<Programme: %s>' % str(self)    
     
     
-class ProgrammeEvent:
+class ProgrammeEvent(Compact):
     """Describes and locates a programme event
     
     :param shortcrid: Short Crid
@@ -545,6 +752,17 @@ class ProgrammeEvent:
     :type version: int
     """       
     
+    __slots__ = ('shortcrid', 'originator', 'crid', 'version', 'bitrate', 'onair', 'recommendation', '_names', 
+                 '_locations', '_media', '_genres', '_keywords', '_memberships', '_links')
+    
+    names = lazy_list('_names')
+    locations = lazy_list('_locations')
+    media = lazy_list('_media')
+    genres = lazy_list('_genres')
+    keywords = lazy_list('_keywords')
+    memberships = lazy_list('_memberships')
+    links = lazy_list('_links')
+    
     def __init__(self, shortcrid, originator=None, crid=None, version=None, bitrate=None, onair=True, recommendation=False):
         self.shortcrid = shortcrid
         self.originator = originator
@@ -553,13 +771,8 @@ class ProgrammeEvent:
         self.bitrate = bitrate
         self.onair = onair
         self.recommendation = recommendation
-        self.names = []
-        self.locations = []
-        self.media = []
-        self.genres = []
-        self.keywords = []
-        self.memberships = []
-        self.links = []
+        self._names = self._locations = self._media = self._genres = None
+        self._keywords = self._memberships = self._links = None
         
     def __str__(self):
         return str(self.names)
@@ -567,6 +780,17 @@ class ProgrammeEvent:
     def __repr__(self):
         return '<ProgrammeEvent: %s>' % str(self)
     
+"""Reads the names, locations, media, genres, memberships and links of a programme 
+   or programme event in one call, giving None for those not yet allocated rather
+   than standing in an empty list as the properties do, for reading them in bulk"""
+content_lists = attrgetter('_names', '_locations', '_media', '_genres', '_memberships', '_links')
+
+"""Reads the same lists of a programme followed by its events, in the same way"""
+programme_lists = attrgetter('_names', '_locations', '_media', '_genres', '_memberships', '_links', '_events')
+
+"""Reads the times and bearers of a location in one call, in the same way"""
+location_lists = attrgetter('_times', '_bearers')
+    
     
 class Schedule:
     """Contains programmes within a given time period."""
@@ -579,29 +803,39 @@ class Schedule:
         
     def get_scope(self):
         """Returns the suggested scope of the schedule, taken as an aggregate of the bearers
-        and times in the locations of each programme"""
+        and times in the locations of each programme. This is cached until any of those
+        change, which is checked on each call."""
         
-        start = None
-        end = None
-        services = []
+        key = scope_key(self.programmes)
+        cached = self.__dict__.get('_scope')
+        try:
+            if cached is not None and cached[0] == key: return copy_scope(cached[1])
+        except TypeError: pass # naive and aware times cannot be compared
         
+        aggregate = ScopeAggregate()
         for programme in self.programmes:
-            for location in programme.locations:
-                for time in location.times:
-                    if isinstance(time, RelativeTime): continue
-                    if start is None or start > time.billed_time:
-                        start = time.billed_time
-                    if end is None or end < time.billed_time + time.billed_duration:
-                        end = time.billed_time + time.billed_duration
-                for bearer in location.bearers:
-                    if isinstance(bearer, Bearer) and bearer.id not in services:
-                        services.append(bearer.id) # we have a Bearer
-                    elif isinstance(bearer, ContentId) and bearer not in services:
-                        services.append(bearer) # we have a ContentId
-                    
-        if start is None or end is None: return None    
+            aggregate.add(programme)
+        scope = aggregate.get_scope()
+        self._scope = (key, scope)
+        return copy_scope(scope)
     
-        return Scope(start, end, services)
+billed_values = attrgetter('billed_time', 'billed_duration')
+
+def scope_key(programmes):
+    """Returns the times and bearers that the scope of the programmes is aggregated
+    from, in order, taken much faster than the aggregate itself"""
+    
+    locations = [l for p in programmes if p._locations for l in p._locations]
+    times = [t for l in locations if l._times for t in l._times]
+    try: 
+        times = map(billed_values, times)
+    except AttributeError: # relative times
+        times = [billed_values(t) if isinstance(t, Time) else None for t in times]
+    bearers = [b.id if isinstance(b, Bearer) else b for l in locations if l._bearers for b in l._bearers]
+    return times, bearers
+
+def copy_scope(scope):
+    if scope is not None: return Scope(scope.start, scope.end, list(scope.services))
         
         
 class Scope:
@@ -618,6 +852,37 @@ class Scope:
     def __repr__(self):
         return '<Scope: %s>' % str(self)
 
+
+class ScopeAggregate:
+    """Aggregates the scope of programmes added one at a time, as :meth:Schedule.get_scope
+    does for the programmes of a schedule"""
+    
+    def __init__(self):
+        self.start = None
+        self.end = None
+        self.services = []
+        self.seen = set()
+        
+    def add(self, programme):
+        for location in programme.locations:
+            for time in location.times:
+                if isinstance(time, RelativeTime): continue
+                if self.start is None or self.start > time.billed_time:
+                    self.start = time.billed_time
+                end_time = time.billed_time + time.billed_duration
+                if self.end is None or self.end < end_time:
+                    self.end = end_time
+            for bearer in location.bearers:
+                if isinstance(bearer, Bearer): bearer = bearer.id # we have a Bearer
+                elif not isinstance(bearer, ContentId): continue
+                if bearer not in self.seen:
+                    self.seen.add(bearer)
+                    self.services.append(bearer)
+                    
+    def get_scope(self):
+        """Returns the scope of the programmes added so far, or None if they have no times"""
+        if self.start is None or self.end is None: return None
+        return Scope(self.start, self.end, list(self.services))
                 
 class Service:
     """DAB Service details
@@ -639,7 +904,7 @@ class Service:
     DGPS = "DGPS"
     PROPRIETARY = "proprietary"
     
-    def __init__(self, id, bitrate=None, type=PRIMARY, format=AUDIO, version=1, locale=locale.getdefaultlocale()):
+    def __init__(self, id, bitrate=None, type=PRIMARY, format=AUDIO, version=1, locale=DEFAULT_LOCALE):
         self.ids = [id]
         self.bitrate = bitrate
         self.type = type
@@ -676,7 +941,7 @@ class ServiceInfo:
         self.ensembles = []
         
          
-class Genre:
+class Genre(Compact):
     """Indicates the genre of a programme, group or service. The genre scheme is based on that used by the 
     TV-Anytime specification.
     
@@ -684,6 +949,8 @@ class Genre:
     :type href: str  
     """
     
+    __slots__ = ('href', 'name')
+    
     def __init__(self, href, name=None):
         self.href = href
         self.name = name     
@@ -693,3 +960,53 @@ class Genre:
     
     def __repr__(self):
         return '<Genre: %s>' % str(self)    
+        
+        
+class ProgrammeCache:
+    """Encoded fragments of programmes, keyed on their short CRID, version and 
+    :func:structural_key, so that re-marshalling a schedule only encodes the 
+    programmes that have changed since it was last marshalled. 
+    
+    Each marshall starts the cache with the context it encodes in, such as the 
+    token table, and the fragments are dropped when that changes. Fragments that a
+    marshall does not use are dropped at its end, so the cache holds at most one 
+    schedule.
+    
+    The number of programmes taken from the cache and encoded afresh are counted
+    in `hits` and `misses`.
+    """
+    
+    def __init__(self):
+        self.fragments = {}
+        self.used = {}
+        self.context = None
+        self.hits = 0
+        self.misses = 0
+        
+    def start(self, context):
+        """Starts a marshall encoding in the given context"""
+        if context != self.context:
+            self.fragments.clear()
+            self.context = context
+        self.used = {}
+        
+    def get(self, programme, encode):
+        """Returns the fragment of a programme, encoding it with the function given
+        if it is not in the cache"""
+        key = (programme.shortcrid, programme.version, structural_key(programme))
+        fragment = self.fragments.get(key)
+        if fragment is None:
+            self.misses += 1
+            fragment = encode(programme)
+        else:
+            self.hits += 1
+        self.used[key] = fragment
+        return fragment
+    
+    def finish(self):
+        """Finishes a marshall, keeping only the fragments it used"""
+        self.fragments = self.used
+        self.used = {}
+        
+    def __repr__(self):
+        return '<ProgrammeCache: %d fragments, %d hits, %d misses>' % (len(self.fragments), self.hits, self.misses)
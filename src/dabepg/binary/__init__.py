@@ -23,11 +23,55 @@
 from dabepg import *
 from bitarray import bitarray, bits2bytes
 import math
+import struct
 import datetime, dateutil.tz
 import logging
 
 logger = logging.getLogger("dabepg.binary")
 
+def encode_length(length):
+    """Returns the length prefix for an element, attribute or CData carrying
+    the given number of data bytes"""
+    
+    # b8-15: element data length (0-253 bytes)
+    # b16-31: extended element length (256-65536 bytes)
+    # b16-39: extended element length (65537-16777216 bytes)
+    if length <= 253:
+        return chr(length)
+    elif length <= 1<<16:
+        return '\xfe' + struct.pack('>H', length & 0xffff)
+    elif length <= 1<<24:
+        return '\xff' + struct.pack('>I', length)[1:]
+    else: raise ValueError('element data length exceeds the maximum allowed by the extended element length (24bits): %d > %d' % (length, 1<<24))
+
+def patch_length(buf, offset):
+    """Back-patches the single length byte reserved at the offset with the
+    length prefix for all data written to the buffer after it"""
+    length = len(buf) - offset - 1
+    if length <= 253: buf[offset] = length
+    else: buf[offset:offset+1] = encode_length(length)
+
+def decode_header(buf, offset):
+    """Reads the tag and length prefix of an element, attribute or CData at the
+    offset into a buffer, returning the tag and the start and end offsets of its data.
+    Raises a ValueError if the prefix or the data runs past the end of the buffer."""
+    try:
+        tag, length = struct.unpack_from('>BB', buf, offset)
+        if length == 0xfe:
+            length, = struct.unpack_from('>H', buf, offset + 2)
+            start = offset + 4
+        elif length == 0xff:
+            high, low = struct.unpack_from('>BH', buf, offset + 2)
+            length = (high << 16) | low
+            start = offset + 5
+        else:
+            start = offset + 2
+    except struct.error:
+        raise ValueError('header at %d is beyond length: %d' % (offset, len(buf)))
+    end = start + length
+    if end > len(buf): raise ValueError('end of data is beyond length: %d > %d' % (end, len(buf)))
+    return tag, start, end
+
 class Element:
     
     def __init__(self, tag, attributes=None, children=None, cdata=None):
@@ -79,6 +123,28 @@ class Element:
         bits += data
         return bits
     
+    def encode(self, buf=None):
+        """Encodes this element directly into a bytearray, returning the buffer.
+        The length prefix is reserved and back-patched once the attributes,
+        children and CData have been written."""
+        if buf is None: buf = bytearray()
+        buf.append(self.tag)
+        offset = len(buf)
+        buf.append(0)
+        for attribute in self.attributes: 
+            try: attribute.encode(buf)
+            except: 
+                logger.exception('error encoding attribute %s of %s', attribute, self)
+                raise
+        for child in self.children: 
+            try: child.encode(buf)
+            except: 
+                logger.exception('error encoding child %s of %s', child, self)
+                raise
+        if self.cdata is not None: self.cdata.encode(buf)
+        patch_length(buf, offset)
+        return buf
+    
     def __iter__(self):
         return iter(self.children)
     
@@ -155,7 +221,7 @@ class Element:
                 e.default_contentid = default_contentid
             # default language
             elif child_tag == 0x06: 
-                pass               
+                e.default_language = child_data.tobytes()
             # children
             elif child_tag >= 0x02 and child_tag <= 0x30:
                 child = Element.frombits(data[i:i+end])
@@ -171,6 +237,55 @@ class Element:
             i += end
             
         return e
+    
+    @staticmethod
+    def frombuffer(buf, offset=0):
+        """Parses an element from a memoryview (or bytes) at the given offset, walking
+        its children by integer offsets into the one buffer rather than slicing
+        copies of it at each level. CData payloads are only copied out of the buffer
+        when their value is first read."""
+        
+        if not isinstance(buf, memoryview): buf = memoryview(buf)
+        
+        tag, start, end = decode_header(buf, offset)
+        if tag < 0x02 or tag > 0x30: raise ValueError('invalid value for tag: 0x%02x' % tag)
+        if end > len(buf): raise ValueError('end of data is beyond length: %d > %d' % (end, len(buf)))
+        
+        e = Element(tag)
+        logger.debug('parsing data of length %d bytes for element with tag 0x%02x', end - start, tag)
+        i = start
+        while i < end:
+            child_tag, child_start, child_end = decode_header(buf, i)
+            if child_end > end:
+                raise ValueError('end of data is beyond length: %d > %d' % (child_end - start, end - start))
+            
+            # attributes
+            if child_tag >= 0x80 and child_tag <= 0x87:
+                e.attributes.append(Attribute.frombuffer(tag, buf, i))
+            # token table
+            elif child_tag == 0x04:
+                e.tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+                logger.debug('parsed token table: %s', e.tokens)
+            # default content ID
+            elif child_tag == 0x05:
+                e.default_contentid = unpack_contentid(buf[child_start:child_end].tobytes())
+            # default language
+            elif child_tag == 0x06: 
+                e.default_language = buf[child_start:child_end].tobytes()
+            # children
+            elif child_tag >= 0x02 and child_tag <= 0x30:
+                child = Element.frombuffer(buf, i)
+                child.parent = e
+                e.children.append(child)
+            # cdata
+            elif child_tag == 0x01:
+                e.cdata = CData.frombuffer(buf, i)
+            else:
+                raise ValueError('unknown element 0x%02x under parent 0x%02x' % (child_tag, tag))
+            
+            i = child_end
+            
+        return e
         
     def __str__(self):
         return 'tag=0x%02X, attributes=%s, children=%s, cdata=%s' % (self.tag, self.attributes, self.children, self.cdata)
@@ -245,6 +360,19 @@ class Attribute:
         bits += data
         return bits
     
+    def encode(self, buf=None):
+        """Encodes this attribute directly into a bytearray, returning the buffer"""
+        if buf is None: buf = bytearray()
+        try:
+            data = pack_value(self.value, self.bitlength)
+        except ValueError:
+            logger.exception('error encoding attribute %s', self)
+            raise
+        buf.append(self.tag)
+        buf.extend(encode_length(len(data)))
+        buf.extend(data)
+        return buf
+    
     @staticmethod
     def frombits(parent, bits):
         
@@ -269,36 +397,29 @@ class Attribute:
         # decode data
         if isinstance(parent, Element): parent_tag = parent.tag
         else: parent_tag = int(parent)
-        if (parent_tag, tag) in [ # integer 
-                (0x02, 0x80), (0x21, 0x80), (0x23, 0x80), (0x23, 0x81), (0x23, 0x82), (0x23, 0x84), (0x25, 0x80),
-                (0x1c, 0x81), (0x1c, 0x82), (0x1c, 0x87), (0x17, 0x81), (0x17, 0x82), (0x03, 0x80), (0x26, 0x81),
-                (0x27, 0x81), (0x2b, 0x84), (0x2b, 0x85), (0x2e, 0x81)
-        ]: 
+        type = attribute_type(parent_tag, tag)
+        if type == INT:
             logger.debug('decoding tag/attribute 0x%02x/0x%02x as int', parent_tag, tag)
             value = int(data.to01(), 2)
-        elif (parent_tag, tag) in [ # string
-                (0x14, 0x80), (0x18, 0x80), (0x18, 0x83), (0x20, 0x82), (0x21, 0x82), (0x03, 0x82), (0x03, 0x83), 
-                (0x2b, 0x80), (0x2b, 0x81), (0x2b, 0x82)
-        ]:
+        elif type == STRING:
             logger.debug('decoding tag/attribute 0x%02x/0x%02x as string', parent_tag, tag)
             value = data.tostring()
-        elif (parent_tag, tag) in [(0x2c, 0x81), (0x2c, 0x83), (0x2f, 0x80), (0x2f, 0x81)]: # duration
+        elif type == DURATION:
             logger.debug('decoding tag/attribute 0x%02x/0x%02x as duration', parent_tag, tag)
             value = datetime.timedelta(seconds=int(data.to01(), 2))
-        elif (parent_tag, tag) in [(0x20, 0x80), (0x1c, 0x80), (0x17, 0x80), (0x2e, 0x80)]: # CRID
+        elif type == CRID:
             logger.debug('decoding tag/attribute 0x%02x/0x%02x as CRID', parent_tag, tag)
             value = Crid.fromstring(data.tostring())
-        elif (parent_tag, tag) in []: # genre
+        elif type == GENRE:
             logger.debug('decoding tag/attribute 0x%02x/0x%02x as genre', parent_tag, tag)
             value = decode_genre(data)
-        elif (parent_tag, tag) in [(0x20, 0x81), (0x21, 0x81), (0x24, 0x80), (0x24, 0x81), (0x2c, 0x80), (0x2c, 0x82),
-                                   (0x03, 0x81)]: # time
+        elif type == TIMEPOINT:
             logger.debug('decoding tag/attribute 0x%02x/0x%02x as timepoint', parent_tag, tag)
             value = decode_timepoint(data)
-        elif (parent_tag, tag) in [(0x25, 0x80), (0x26, 0x80), (0x29, 0x80), (0x2d, 0x80)]: # content ID
+        elif type == CONTENTID:
             logger.debug('decoding tag/attribute 0x%02x/0x%02x as ContentId', parent_tag, tag)
             value = decode_contentid(data)
-        elif (parent_tag, tag) in [(0x1c, 0x83), (0x1c, 0x84), (0x03, 0x84), (0x2b, 0x83), (0x2e, 0x83), (0x2e, 0x84)]: # ENUM
+        elif type == ENUM:
             try:
                 value = decode_enum(parent_tag, tag, data)
             except:
@@ -309,12 +430,220 @@ class Attribute:
         
         return Attribute(tag, value)
     
+    @staticmethod
+    def frombuffer(parent, buf, offset=0):
+        """Parses an attribute from a memoryview (or bytes) at the given offset"""
+        
+        tag, start, end = decode_header(buf, offset)
+        data = buf[start:end]
+        if isinstance(data, memoryview): data = data.tobytes()
+        
+        if isinstance(parent, Element): parent_tag = parent.tag
+        else: parent_tag = int(parent)
+        value = unpack_attribute(parent_tag, tag, data)
+        
+        return Attribute(tag, value)
+    
     def __str__(self):
         return str('0x%x' % self.tag)
     
     def __repr__(self):
         return '<Attribute: tag=%s, value=%s>' % (str(self), self.value)
     
+INT = 'int'
+STRING = 'string'
+DURATION = 'duration'
+CRID = 'crid'
+GENRE = 'genre'
+TIMEPOINT = 'timepoint'
+CONTENTID = 'contentid'
+ENUM = 'enum'
+
+"""Names of the elements by their tag"""
+elements = {
+    0x02 : 'epg', 0x03 : 'serviceInformation', 0x04 : 'tokenTable', 0x05 : 'defaultContentID', 
+    0x06 : 'defaultLanguage', 0x10 : 'shortName', 0x11 : 'mediumName', 0x12 : 'longName', 
+    0x13 : 'mediaDescription', 0x14 : 'genre', 0x15 : 'CA', 0x16 : 'keywords', 0x17 : 'memberOf', 
+    0x18 : 'link', 0x19 : 'location', 0x1a : 'shortDescription', 0x1b : 'longDescription', 
+    0x1c : 'programme', 0x20 : 'programmeGroups', 0x21 : 'schedule', 0x22 : 'alternateSource', 
+    0x23 : 'programmeGroup', 0x24 : 'scope', 0x25 : 'serviceScope', 0x26 : 'ensemble', 
+    0x27 : 'frequency', 0x28 : 'service', 0x29 : 'serviceID', 0x2a : 'epgLanguage', 
+    0x2b : 'multimedia', 0x2c : 'time', 0x2d : 'bearer', 0x2e : 'programmeEvent', 
+    0x2f : 'relativeTime', 0x30 : 'radiodns'
+}
+
+class AttributeSchema:
+    """Schema of an attribute, being its name, value type, the bit length of an
+    integer value and the mapping of enum values to the values of the model
+    
+    :param name: Attribute name
+    :type name: str
+    :param type: Value type, one of :const:INT, :const:STRING, :const:DURATION, 
+    :const:CRID, :const:GENRE, :const:TIMEPOINT, :const:CONTENTID or :const:ENUM
+    :type type: str
+    :param bitlength: Bit length of an integer or enum value
+    :type bitlength: int
+    :param enum: Model values of an enum by their encoded value
+    :type enum: dict
+    """
+    
+    def __init__(self, name, type, bitlength=None, enum=None):
+        self.name = name
+        self.type = type
+        self.bitlength = bitlength
+        self.enum = enum if enum is not None else {}
+        self.values = dict((value, key) for key, value in self.enum.items())
+        
+    def __repr__(self):
+        return '<AttributeSchema: %s, type=%s>' % (self.name, self.type)
+
+system_enum = {0x01 : Epg.DAB, 0x02 : Epg.DRM}
+
+"""Schema of the attributes by their parent element tag and their tag, through
+which both the encoder and decoder dispatch.
+   Note that the enums without values are not currently implemented, which will
+   cause the decoder to skip over their details"""
+attributes = {
+    # epg
+    (0x02, 0x80) : AttributeSchema('system', ENUM, 8, system_enum),
+    # serviceInformation
+    (0x03, 0x80) : AttributeSchema('version', INT, 16),
+    (0x03, 0x81) : AttributeSchema('creationTime', TIMEPOINT),
+    (0x03, 0x82) : AttributeSchema('originator', STRING),
+    (0x03, 0x83) : AttributeSchema('serviceProvider', STRING),
+    (0x03, 0x84) : AttributeSchema('system', ENUM, 8, system_enum),
+    # genre
+    (0x14, 0x80) : AttributeSchema('href', STRING),
+    # memberOf
+    (0x17, 0x80) : AttributeSchema('id', CRID),
+    (0x17, 0x81) : AttributeSchema('shortId', INT, 24),
+    (0x17, 0x82) : AttributeSchema('index', INT, 16),
+    # link
+    (0x18, 0x80) : AttributeSchema('uri', STRING),
+    (0x18, 0x81) : AttributeSchema('mimeValue', STRING),
+    (0x18, 0x83) : AttributeSchema('description', STRING),
+    (0x18, 0x84) : AttributeSchema('expiryTime', TIMEPOINT),
+    # programme
+    (0x1c, 0x80) : AttributeSchema('id', CRID),
+    (0x1c, 0x81) : AttributeSchema('shortId', INT, 24),
+    (0x1c, 0x82) : AttributeSchema('version', INT, 16),
+    (0x1c, 0x83) : AttributeSchema('recommendation', ENUM, 8, {0x01 : False, 0x02 : True}),
+    (0x1c, 0x84) : AttributeSchema('broadcast', ENUM, 8, {0x01 : 'on-air', 0x02 : 'off-air'}),
+    (0x1c, 0x87) : AttributeSchema('bitrate', INT, 16),
+    # programmeGroups
+    (0x20, 0x80) : AttributeSchema('id', CRID),
+    (0x20, 0x81) : AttributeSchema('creationTime', TIMEPOINT),
+    (0x20, 0x82) : AttributeSchema('originator', STRING),
+    # schedule
+    (0x21, 0x80) : AttributeSchema('version', INT, 16),
+    (0x21, 0x81) : AttributeSchema('creationTime', TIMEPOINT),
+    (0x21, 0x82) : AttributeSchema('originator', STRING),
+    # programmeGroup
+    (0x23, 0x80) : AttributeSchema('id', INT),
+    (0x23, 0x81) : AttributeSchema('shortId', INT),
+    (0x23, 0x82) : AttributeSchema('version', INT),
+    (0x23, 0x84) : AttributeSchema('numOfItems', INT),
+    # scope
+    (0x24, 0x80) : AttributeSchema('startTime', TIMEPOINT),
+    (0x24, 0x81) : AttributeSchema('stopTime', TIMEPOINT),
+    # serviceScope
+    (0x25, 0x80) : AttributeSchema('id', CONTENTID),
+    # ensemble
+    (0x26, 0x80) : AttributeSchema('id', CONTENTID),
+    (0x26, 0x81) : AttributeSchema('version', INT, 16),
+    # frequency
+    (0x27, 0x81) : AttributeSchema('kHz', INT, 24),
+    # service
+    (0x28, 0x80) : AttributeSchema('version', INT, 16),
+    (0x28, 0x83) : AttributeSchema('bitrate', INT, 16),
+    # serviceID
+    (0x29, 0x80) : AttributeSchema('id', CONTENTID),
+    (0x29, 0x81) : AttributeSchema('type', ENUM, 8, {0x01 : Service.PRIMARY, 0x02 : Service.SECONDARY}),
+    # multimedia
+    (0x2b, 0x80) : AttributeSchema('mimeValue', STRING),
+    (0x2b, 0x81) : AttributeSchema('xml:lang', STRING),
+    (0x2b, 0x82) : AttributeSchema('url', STRING),
+    (0x2b, 0x83) : AttributeSchema('type', ENUM, 8, {
+        0x02 : Multimedia.LOGO_UNRESTRICTED,
+        0x03 : Multimedia.LOGO_MONO_SQUARE,
+        0x04 : Multimedia.LOGO_COLOUR_SQUARE,
+        0x05 : Multimedia.LOGO_MONO_RECTANGLE,
+        0x06 : Multimedia.LOGO_COLOUR_RECTANGLE
+    }),
+    (0x2b, 0x84) : AttributeSchema('width', INT, 16),
+    (0x2b, 0x85) : AttributeSchema('height', INT, 16),
+    # time
+    (0x2c, 0x80) : AttributeSchema('time', TIMEPOINT),
+    (0x2c, 0x81) : AttributeSchema('duration', DURATION, 16),
+    (0x2c, 0x82) : AttributeSchema('actualTime', TIMEPOINT),
+    (0x2c, 0x83) : AttributeSchema('actualDuration', DURATION, 16),
+    # bearer
+    (0x2d, 0x80) : AttributeSchema('id', CONTENTID),
+    # programmeEvent
+    (0x2e, 0x80) : AttributeSchema('id', CRID),
+    (0x2e, 0x81) : AttributeSchema('shortId', INT, 24),
+    (0x2e, 0x82) : AttributeSchema('version', INT, 16),
+    (0x2e, 0x83) : AttributeSchema('recommendation', ENUM, 8, {0x01 : False, 0x02 : True}),
+    (0x2e, 0x84) : AttributeSchema('broadcast', ENUM, 8, {0x01 : 'on-air', 0x02 : 'off-air'}),
+    # relativeTime
+    (0x2f, 0x80) : AttributeSchema('time', DURATION, 16),
+    (0x2f, 0x81) : AttributeSchema('duration', DURATION, 16),
+    (0x2f, 0x82) : AttributeSchema('actualTime', DURATION, 16),
+    (0x2f, 0x83) : AttributeSchema('actualDuration', DURATION, 16),
+}
+
+def attribute_type(parent_tag, tag):
+    """Returns the value type of an attribute tag under the given parent element tag"""
+    schema = attributes.get((parent_tag, tag))
+    if schema is not None: return schema.type
+
+def unpack_attribute(parent_tag, tag, data):
+    """Decodes the value of an attribute from its data bytes, by the type of the
+    attribute under its parent element"""
+    
+    schema = attributes.get((parent_tag, tag))
+    if schema is None:
+        raise ValueError('dont know how to decode attribute value for parent 0x%02x from tag: 0x%02x' % (parent_tag, tag))
+    if schema.type == ENUM:
+        try:
+            return unpack_enum(parent_tag, tag, data)
+        except ValueError:
+            logger.warning('error decoding enum for parent 0x%02x from tag: 0x%02x - IGNORING for now' % (parent_tag, tag))
+            value = bitarray()
+            value.frombytes(data)
+            return value
+    return unpackers[schema.type](data)
+    
+def build_attribute(parent_tag, tag, value):
+    """Returns an :class:Attribute of an element tree for the value of an attribute,
+    with its bit length and any enum code taken from the schema"""
+    
+    schema = attributes.get((parent_tag, tag))
+    if schema is None:
+        raise ValueError('dont know how to encode attribute value for parent 0x%02x from tag: 0x%02x' % (parent_tag, tag))
+    if schema.type == ENUM:
+        if value not in schema.values:
+            raise ValueError('no enum value for parent 0x%02x from tag 0x%02x: %s' % (parent_tag, tag, value))
+        value = schema.values[value]
+    return Attribute(tag, value, schema.bitlength)
+    
+def pack_attribute(parent_tag, tag, value):
+    """Encodes the value of an attribute to its data bytes, by the type of the
+    attribute under its parent element"""
+    
+    schema = attributes.get((parent_tag, tag))
+    if schema is None:
+        raise ValueError('dont know how to encode attribute value for parent 0x%02x from tag: 0x%02x' % (parent_tag, tag))
+    if schema.type == INT:
+        return pack_int(value, schema.bitlength)
+    elif schema.type == DURATION:
+        return pack_int(value.seconds, schema.bitlength)
+    elif schema.type == ENUM:
+        if value not in schema.values:
+            raise ValueError('no enum value for parent 0x%02x from tag 0x%02x: %s' % (parent_tag, tag, value))
+        return pack_int(schema.values[value], schema.bitlength)
+    return packers[schema.type](value)
+
 genre_map = dict(
     IntentionCS=1,
     FormatCS=2,
@@ -366,6 +695,36 @@ def decode_genre(bits):
             i += 8
     
     return Genre('urn:tva:metadata:cs:ContentCS:2002:%s' % level)
+
+def unpack_genre(data):
+    """Byte-aligned equivalent of :func:decode_genre"""
+    
+    # b4-7: CS
+    cs_val = ord(data[0]) & 0x0f
+    if cs_val not in genre_map.values(): raise ValueError('unknown CS value for genre: %d' % cs_val)
+    
+    # optional schema levels
+    level = '.'.join(['%d' % cs_val] + ['%d' % ord(x) for x in data[1:]])
+    
+    return Genre('urn:tva:metadata:cs:ContentCS:2002:%s' % level)
+
+def pack_genre(genre):
+    """Byte-aligned equivalent of :func:encode_genre"""
+    
+    segments = genre.href.split(':')
+    if len(segments) < 6: raise ValueError('genre is incorrectly formatted: %s' % genre)
+    
+    # b0-3: RFU(0)
+    # b4-7: CS
+    cs = segments[4]
+    if cs in genre_map: data = chr(genre_map[cs])
+    else: raise ValueError('unknown CS in genre: %s' % cs)
+    
+    # optional schema levels
+    if len(segments) >= 6:
+        data += ''.join(chr(int(level) & 0xff) for level in segments[6].split('.'))
+        
+    return data
     
 def encode_timepoint(timepoint):
     
@@ -414,6 +773,68 @@ def encode_timepoint(timepoint):
             
     return bits
 
+"""Maximum number of entries held by each of the timepoint caches, which are 
+   emptied once full. A week long schedule has a few thousand distinct times."""
+timepoint_cache_size = 8192
+packed_timepoints = {}
+unpacked_timepoints = {}
+
+def cache_timepoint(cache, key, value):
+    if len(cache) >= timepoint_cache_size: cache.clear()
+    cache[key] = value
+    
+tz_utc = dateutil.tz.tzutc()
+tz_offsets = {}
+
+def get_timezone(seconds):
+    """Returns the shared timezone for an offset from UTC in seconds"""
+    timezone = tz_offsets.get(seconds)
+    if timezone is None:
+        timezone = tz_offsets[seconds] = dateutil.tz.tzoffset(None, seconds)
+    return timezone
+
+def pack_timepoint(timepoint):
+    """Byte-aligned equivalent of :func:encode_timepoint, memoized by timepoint 
+    and timezone"""
+    
+    # key on the wall clock and the identity of the timezone, as hashing an aware
+    # timepoint is slower than encoding it and most timezones are unhashable. The
+    # entry holds the timezone too, so its identity cannot be reused while cached
+    tzinfo = timepoint.tzinfo
+    key = (id(tzinfo), timepoint.year, timepoint.month, timepoint.day, timepoint.hour, timepoint.minute, timepoint.second)
+    entry = packed_timepoints.get(key)
+    if entry is not None and entry[0] is tzinfo: return entry[1]
+    
+    # b1-17: Date
+    a = (14 - timepoint.month) / 12
+    y = timepoint.year + 4800 - a
+    m = timepoint.month + (12 * a) - 3
+    jdn = timepoint.day + ((153 * m) + 2) / 5 + (365 * y) + (y / 4) - (y / 100) + (y / 400) - 32045
+    jd = jdn + (timepoint.hour - 12) / 24 + timepoint.minute / 1440 + timepoint.second / 86400
+    mjd = int(jd - 2400000.5) & 0x1ffff
+    
+    # b19: LTO Flag
+    offset = timepoint.utcoffset()
+    lto = not (timepoint.tzinfo is None or (offset.days == 0 and offset.seconds == 0))
+    
+    # b20: UTC Flag
+    # b21: UTC - 11 or 27 bits depending on the form
+    if timepoint.second > 0:
+        value = (mjd << 30) | (lto << 28) | (1 << 27) | ((timepoint.hour & 0x1f) << 22) | ((timepoint.minute & 0x3f) << 16) | ((timepoint.second & 0x3f) << 10)
+        data = struct.pack('>HI', value >> 32, value & 0xffffffff)
+    else:
+        value = (mjd << 14) | (lto << 12) | ((timepoint.hour & 0x1f) << 6) | (timepoint.minute & 0x3f)
+        data = struct.pack('>I', value)
+        
+    # b32/48: LTO
+    if lto:
+        dst = timepoint.dst()
+        offset = (offset.days * 86400 + offset.seconds) + (dst.days * 86400 + dst.days)
+        data += chr(((0 if offset > 0 else 1) << 5) | ((offset / (60 * 60) * 2) & 0x1f))
+            
+    cache_timepoint(packed_timepoints, key, (tzinfo, data))
+    return data
+
 def decode_timepoint(bits):
     
     if not bits.any(): return None # NOW
@@ -426,9 +847,9 @@ def decode_timepoint(bits):
     if bits[19]:
         sign = bits[-6]
         half_hours = int(bits[-5:].to01(), 2)
-        timezone = dateutil.tz.tzoffset(None, half_hours * 30 * 60 * (-1 if sign else 1))
+        timezone = get_timezone(half_hours * 30 * 60 * (-1 if sign else 1))
     else:
-        timezone = dateutil.tz.tzutc()
+        timezone = tz_utc
 
     # parse date with UTC short form or long form
     if bits[20]:
@@ -444,6 +865,41 @@ def decode_timepoint(bits):
         
     return timepoint
 
+def unpack_timepoint(data):
+    """Byte-aligned equivalent of :func:decode_timepoint, memoized by data"""
+    
+    timepoint = unpacked_timepoints.get(data)
+    if timepoint is not None: return timepoint
+    if not data.strip('\x00'): return None # NOW
+    
+    value, = struct.unpack_from('>I', data)
+    mjd = (value >> 14) & 0x1ffff
+    date = datetime.datetime.fromtimestamp((mjd - 40587) * 86400)
+    timepoint = datetime.datetime.combine(date, datetime.time())
+    
+    # parse timezone
+    if value & 0x1000:
+        lto = ord(data[-1])
+        timezone = get_timezone((lto & 0x1f) * 30 * 60 * (-1 if lto & 0x20 else 1))
+    else:
+        timezone = tz_utc
+        
+    # parse date with UTC short form or long form
+    if value & 0x800:
+        extension, = struct.unpack_from('>H', data, 4)
+        timepoint = timepoint.replace(hour=(value >> 6) & 0x1f,
+                                      minute=value & 0x3f,
+                                      second=extension >> 10,
+                                      microsecond=(extension & 0x3ff) * 1000,
+                                      tzinfo=timezone)
+    else:
+        timepoint = timepoint.replace(hour=(value >> 6) & 0x1f,
+                                      minute=value & 0x3f,
+                                      tzinfo=timezone)
+        
+    cache_timepoint(unpacked_timepoints, data, timepoint)
+    return timepoint
+
 def encode_contentid(id):
 
     if id.sid is not None and id.scids is not None:
@@ -499,6 +955,35 @@ def encode_contentid(id):
         
     return bits
 
+def pack_contentid(id):
+    """Byte-aligned equivalent of :func:encode_contentid"""
+    
+    if id.sid is not None and id.scids is not None:
+        
+        # b1: Ensemble Flag
+        # b2: X-PAD flag
+        # b3: SId encoding flag (audio only right now)
+        # b4-7: SCIdS
+        flags = id.scids & 0x0f
+        if id.ecc is not None and id.eid is not None: flags |= 0x40
+        if id.xpad is not None: flags |= 0x20
+        data = chr(flags)
+        
+        # optional ECC, EId
+        if id.ecc is not None: data += chr(id.ecc & 0xff)
+        if id.eid is not None: data += struct.pack('>H', id.eid & 0xffff)
+        
+        # SId
+        data += struct.pack('>H', id.sid & 0xffff)
+        
+        # optional X-PAD extension
+        if id.xpad is not None: data += chr(id.xpad & 0xff)
+        
+    else: # we have an ensemble id. probably.
+        data = chr(id.ecc & 0xff) + struct.pack('>H', id.eid & 0xffff)
+        
+    return data
+
 def decode_contentid(bits):
     """decodes a ContentId from a bitarray"""
     
@@ -554,6 +1039,46 @@ def decode_contentid(bits):
         
     return ContentId(ecc, eid, sid, scids, xpad)   
 
+def unpack_contentid(data):
+    """Byte-aligned equivalent of :func:decode_contentid"""
+    
+    ecc = None
+    eid = None
+    sid = None
+    scids = None
+    xpad = None
+    
+    try:
+        if len(data) == 3: # EnsembleId
+            ecc, eid = struct.unpack('>BH', data)
+        else:
+            flags = ord(data[0])
+            
+            # SCIdS
+            scids = flags & 0x0f
+            
+            # ECC, EId
+            i = 1
+            if flags & 0x40:
+                ecc, eid = struct.unpack_from('>BH', data, 1)
+                i = 4
+                
+            # SId
+            if not flags & 0x10:
+                sid, = struct.unpack_from('>H', data, i)
+                i += 2
+            else:
+                sid, = struct.unpack_from('>I', data, i)
+                i += 4
+                
+            # XPAD
+            if flags & 0x20:
+                xpad = ord(data[i]) & 0x1f
+    except:
+        raise ValueError('error parsing ContentId from data: %s' % ' '.join('%02X' % ord(x) for x in data))
+    
+    return ContentId(ecc, eid, sid, scids, xpad)
+
 def decode_tokentable(bits):
     
     tokens = {}
@@ -567,17 +1092,21 @@ def decode_tokentable(bits):
         i += 16 + (length * 8)
     return tokens
 
-"""Map of possible num values and their binary equivalents.
-   Note that not all the values are currently implemented, which will
-   cause the decoder to skip over their details"""
-enum_values = {
-    (0x02, 0x80, 0x01) : Epg.DAB,
-    (0x02, 0x80, 0x02) : Epg.DRM,
-    (0x1c, 0x83, 0x01) : False,
-    (0x1c, 0x83, 0x02) : True,
-    (0x1c, 0x84, 0x01) : "on-air",
-    (0x1c, 0x84, 0x02) : "off-air"
-}
+def unpack_tokentable(data):
+    """Byte-aligned equivalent of :func:decode_tokentable"""
+    
+    tokens = {}
+    
+    i = 0
+    while i < len(data):
+        if i + 2 > len(data): raise ValueError('token table is truncated at %d: %d bytes' % (i, len(data)))
+        tag, length = struct.unpack_from('>BB', data, i)
+        tokens[tag] = data[i+2:i+2+length]
+        i += 2 + length
+    return tokens
+
+"""Map of possible enum values and their binary equivalents, from the attribute schema"""
+enum_values = dict(((parent_tag, tag, key), value) for (parent_tag, tag), schema in attributes.items() for key, value in schema.enum.items())
 
 def decode_enum(parent_tag, tag, bits):
     
@@ -585,16 +1114,34 @@ def decode_enum(parent_tag, tag, bits):
     
     value = int(bits.to01(), 2)
     key = (parent_tag, tag, value)
-    if key in enum_values.keys():
-        return enum_values.get(key)
+    if key in enum_values:
+        return enum_values[key]
+    else:
+        raise ValueError('unknown enum value for parent/attribute 0x%02x/0x%02x: 0x%02x' % (parent_tag, tag, value))
+    
+def unpack_enum(parent_tag, tag, data):
+    """Byte-aligned equivalent of :func:decode_enum"""
+    
+    if len(data) != 1: raise ValueError('enum data for parent/attribute 0x%02x/0x%02x is of incorrect length: %d bytes' % (parent_tag, tag, len(data)))
+    
+    key = (parent_tag, tag, ord(data))
+    if key in enum_values:
+        return enum_values[key]
     else:
-        raise NotImplementedError('enum for parent/attribute 0x%02x/0x%02x not implemented' % (parent_tag, tag))
+        raise ValueError('unknown enum value for parent/attribute 0x%02x/0x%02x: 0x%02x' % (parent_tag, tag, ord(data)))
     
 class CData:
     
     def __init__(self, value):
         self.value = value
         
+    def __getattr__(self, name):
+        # a CData parsed from a buffer holds a view onto it until the value is needed
+        if name == 'value' and '_view' in self.__dict__:
+            self.value = self.__dict__.pop('_view').tobytes()
+            return self.value
+        raise AttributeError(name)
+        
     def tobytes(self):
         # b0-b7: element tag
         bits = bitarray()
@@ -626,6 +1173,14 @@ class CData:
         
         return bits
     
+    def encode(self, buf=None):
+        """Encodes this CData directly into a bytearray, returning the buffer"""
+        if buf is None: buf = bytearray()
+        buf.append(0x01)
+        buf.extend(encode_length(len(self.value)))
+        buf.extend(str(self.value))
+        return buf
+    
     @staticmethod
     def frombits(bits):
                 
@@ -649,22 +1204,59 @@ class CData:
         data = bits[start:start+(datalength * 8)]
         
         return CData(data.tostring())
-
-def marshall(obj):
-    """Marshalls an :class:Epg or :class:ServiceInfo to its binary document"""    
-    if isinstance(obj, ServiceInfo): return marshall_serviceinfo(obj)
-    elif isinstance(obj, Epg): return marshall_epg(obj)
     
-def marshall_serviceinfo(info):
+    @staticmethod
+    def frombuffer(buf, offset=0):
+        """Parses a CData from a memoryview at the given offset, deferring the copy
+        of its payload until the value is first read"""
+        
+        # b0-b7: element tag
+        tag, start, end = decode_header(buf, offset)
+        if tag != 0x01: raise ValueError('CData does not have the correct tag: 0x%02x != 0x01' % tag)
+        
+        cdata = CData(None)
+        del cdata.value
+        cdata._view = buf[start:end] if isinstance(buf, memoryview) else memoryview(buf)[start:end]
+        return cdata
+
+def marshall(obj, token_table=False, defaults=False, cache=None):
+    """Marshalls an :class:Epg or :class:ServiceInfo to its binary document
+    
+    :param token_table: Whether to generate a token table from the repeated text
+    :type token_table: bool
+    :param defaults: Whether to write the most common bearer and language once,
+    as the default content ID and default language of the document
+    :type defaults: bool
+    :param cache: Cache of the programme elements encoded by previous marshalls 
+    of the schedule, to take those that are unchanged from
+    :type cache: ProgrammeCache
+    """    
+    if isinstance(obj, ServiceInfo): return marshall_serviceinfo(obj, token_table, defaults)
+    elif isinstance(obj, Epg): return marshall_epg(obj, token_table, defaults, cache)
+    
+def marshall_serviceinfo(info, token_table=False, defaults=False):
+    buf = bytearray()
+    write_service_information(buf, info, 
+                              build_token_table(iter_text(info))[0] if token_table else None,
+                              find_default_language(info) if defaults else None)
+    return str(buf)
+
+# The build_* functions build the element tree of a document, for inspecting
+# or rendering with Element.encode or Element.tobytes. They give the same bytes
+# as the write_* functions below, through which marshall encodes, but only for
+# the plain encoding: token tables, defaults and the programme cache are left
+# to the write_* functions, which are the supported encoder.
+
+def build_service_information(info):
  
     if info.type == ServiceInfo.DRM: raise Exception("DRM not yet supported");
 
     # serviceInformation
     info_element = Element(0x03)
-    if info.version > 1: info_element.attributes.append(Attribute(0x80, info.version, 16)) 
-    if info.created: info_element.attributes.append(Attribute(0x81, info.created))
-    if info.originator: info_element.attributes.append(Attribute(0x82, info.originator))
-    if info.provider: info_element.attributes.append(Attribute(0x83, info.provider))
+    if info.version > 1: info_element.attributes.append(build_attribute(0x03, 0x80, info.version)) 
+    if info.created: info_element.attributes.append(build_attribute(0x03, 0x81, info.created))
+    if info.originator: info_element.attributes.append(build_attribute(0x03, 0x82, info.originator))
+    if info.provider: info_element.attributes.append(build_attribute(0x03, 0x83, info.provider))
 
     # only one ensemble per file
     if len(info.ensembles) == 0: raise ValueError("You must specify an ensemble in this binary encoded Service Information file")
@@ -676,9 +1268,18 @@ def marshall_serviceinfo(info):
 
     info_element.children.append(ensemble_element)
 
-    return info_element.tobytes().tobytes()
+    return info_element
+
+def marshall_epg(epg, token_table=False, defaults=False, cache=None):
+    buf = bytearray()
+    write_epg(buf, epg, 
+              build_token_table(iter_text(epg))[0] if token_table else None,
+              find_default_contentid(epg) if defaults else None,
+              find_default_language(epg) if defaults else None,
+              cache)
+    return str(buf)
 
-def marshall_epg(epg):
+def build_epg(epg):
     
     schedule = epg.schedule
     
@@ -689,10 +1290,10 @@ def marshall_epg(epg):
     schedule_element = Element(0x21)
     epg_element.children.append(schedule_element)
     if schedule.version is not None and schedule.version > 1:
-        schedule_element.attributes.append(Attribute(0x80, schedule.version, 16))
-    schedule_element.attributes.append(Attribute(0x81, schedule.created))
+        schedule_element.attributes.append(build_attribute(0x21, 0x80, schedule.version))
+    schedule_element.attributes.append(build_attribute(0x21, 0x81, schedule.created))
     if schedule.originator is not None:
-        schedule_element.attributes.append(Attribute(0x82, schedule.originator))
+        schedule_element.attributes.append(build_attribute(0x21, 0x82, schedule.originator))
         
     # schedule scope
     scope = schedule.get_scope()
@@ -701,58 +1302,53 @@ def marshall_epg(epg):
     
     # programmes
     for programme in schedule.programmes:
-        programme_element = Element(0x1c)
-        programme_element.attributes.append(Attribute(0x81, programme.shortcrid, 24))
-        if programme.crid is not None:
-            programme_element.attributes.append(Attribute(0x80, programme.crid))
-        if programme.version is not None:
-            programme_element.attributes.append(Attribute(0x82, programme.version, 16))
-        if programme.recommendation:
-            programme_element.attributes.append(Attribute(0x83, 0x02, 8)) # hardcoded to 'yes'
-        if not programme.onair:
-            programme_element.attributes.append(Attribute(0x84, 0x02, 8)) # hardcoded to 'on-air'
-        if programme.bitrate is not None:
-            programme_element.attributes.append(Attribute(0x87, math.ceil(programme.bitrate), 16))
-        # names
-        for name in programme.names:
-            child = build_name(name)
-            programme_element.children.append(child)
-        # locations
-        for location in programme.locations:
-            child = build_location(location)
-            programme_element.children.append(child)
-        # media
-        if len(programme.media) > 0:
-            child = build_mediagroup(programme.media)
-            programme_element.children.append(child)
-        # genre
-        for genre in programme.genres:
-            child = build_genre(genre)
-            programme_element.children.append(child)
-        # membership
-        for membership in programme.memberships:
-            child = build_membership(membership)
-            programme_element.children.append(child)    
-        # link
-        for link in programme.links:
-            child = build_link(link)
-            programme_element.children.append(child)      
-        # events
-        for event in programme.events:
-            child = build_programme_event(event)
-            programme_element.children.append(child) 
-            
-        schedule_element.children.append(programme_element)
+        schedule_element.children.append(build_programme(programme))
      
-    return epg_element.tobytes().tobytes()
+    return epg_element
+
+def build_programme(programme):
+    programme_element = Element(0x1c)
+    programme_element.attributes.append(build_attribute(0x1c, 0x81, programme.shortcrid))
+    if programme.crid is not None:
+        programme_element.attributes.append(build_attribute(0x1c, 0x80, programme.crid))
+    if programme.version is not None:
+        programme_element.attributes.append(build_attribute(0x1c, 0x82, programme.version))
+    if programme.recommendation:
+        programme_element.attributes.append(build_attribute(0x1c, 0x83, True))
+    if not programme.onair:
+        programme_element.attributes.append(build_attribute(0x1c, 0x84, 'off-air'))
+    if programme.bitrate is not None:
+        programme_element.attributes.append(build_attribute(0x1c, 0x87, int(math.ceil(programme.bitrate))))
+    # names
+    for name in programme.names:
+        programme_element.children.append(build_name(name))
+    # locations
+    for location in programme.locations:
+        programme_element.children.append(build_location(location))
+    # media
+    if len(programme.media) > 0:
+        programme_element.children.append(build_mediagroup(programme.media))
+    # genre
+    for genre in programme.genres:
+        programme_element.children.append(build_genre(genre))
+    # membership
+    for membership in programme.memberships:
+        programme_element.children.append(build_membership(membership))
+    # link
+    for link in programme.links:
+        programme_element.children.append(build_link(link))
+    # events
+    for event in programme.events:
+        programme_element.children.append(build_programme_event(event))
+    return programme_element
     
 def build_scope(scope):
     scope_element = Element(0x24)
-    scope_element.attributes.append(Attribute(0x80, scope.start))
-    scope_element.attributes.append(Attribute(0x81, scope.end))
+    scope_element.attributes.append(build_attribute(0x24, 0x80, scope.start))
+    scope_element.attributes.append(build_attribute(0x24, 0x81, scope.end))
     for service in scope.services:
         service_scope_element = Element(0x25)
-        service_scope_element.attributes.append(Attribute(0x80, service))
+        service_scope_element.attributes.append(build_attribute(0x25, 0x80, service))
         scope_element.children.append(service_scope_element)
     return scope_element
     
@@ -770,7 +1366,7 @@ def build_location(location):
         location_element.children.append(build_time(time))                
     for bearer in location.bearers:
         bearer_element = Element(0x2d)
-        bearer_element.attributes.append(Attribute(0x80, bearer))
+        bearer_element.attributes.append(build_attribute(0x2d, 0x80, bearer))
         location_element.children.append(bearer_element)       
     return location_element  
 
@@ -778,20 +1374,20 @@ def build_time(time):
     time_element = None
     if isinstance(time, Time):
         time_element = Element(0x2c)
-        time_element.attributes.append(Attribute(0x80, time.billed_time))
+        time_element.attributes.append(build_attribute(0x2c, 0x80, time.billed_time))
         if time.actual_time is not None:
-            time_element.attributes.append(Attribute(0x82, time.actual_time))
+            time_element.attributes.append(build_attribute(0x2c, 0x82, time.actual_time))
         if time.actual_duration is not None:
-            time_element.attributes.append(Attribute(0x83, time.actual_duration))            
-        time_element.attributes.append(Attribute(0x81, time.billed_duration))
+            time_element.attributes.append(build_attribute(0x2c, 0x83, time.actual_duration))            
+        time_element.attributes.append(build_attribute(0x2c, 0x81, time.billed_duration))
     elif isinstance(time, RelativeTime):
         time_element = Element(0x2f)
-        time_element.attributes.append(Attribute(0x80, time.billed_offset))
-        time_element.attributes.append(Attribute(0x81, time.billed_duration))
+        time_element.attributes.append(build_attribute(0x2f, 0x80, time.billed_offset))
+        time_element.attributes.append(build_attribute(0x2f, 0x81, time.billed_duration))
         if time.actual_offset is not None:
-            time_element.attributes.append(Attribute(0x82, time.actual_offset))
+            time_element.attributes.append(build_attribute(0x2f, 0x82, time.actual_offset))
         if time.actual_duration is not None:
-            time_element.attributes.append(Attribute(0x83, time.actual_duration))
+            time_element.attributes.append(build_attribute(0x2f, 0x83, time.actual_duration))
     return time_element   
     
 def build_mediagroup(media):
@@ -809,60 +1405,53 @@ def build_mediagroup(media):
             media_element = Element(0x2b)
             mediagroup_element.children.append(media_element)
             if media.mimetype is not None:
-                media_element.attributes.append(Attribute(0x80, media.mimetype))
+                media_element.attributes.append(build_attribute(0x2b, 0x80, media.mimetype))
             if media.url is not None:
-                media_element.attributes.append(Attribute(0x82, media.url))
+                media_element.attributes.append(build_attribute(0x2b, 0x82, media.url))
+            if media.type in multimedia_types:
+                media_element.attributes.append(build_attribute(0x2b, 0x83, media.type))
             if media.type == Multimedia.LOGO_UNRESTRICTED:
-                media_element.attributes.append(Attribute(0x83, 0x02, 8))
-                if media.width: media_element.attributes.append(Attribute(0x84, media.width, 16))
-                if media.height: media_element.attributes.append(Attribute(0x85, media.height, 16))
-            if media.type == Multimedia.LOGO_MONO_SQUARE:
-                media_element.attributes.append(Attribute(0x83, 0x03, 8))
-            if media.type == Multimedia.LOGO_COLOUR_SQUARE:
-                media_element.attributes.append(Attribute(0x83, 0x04, 8))
-            if media.type == Multimedia.LOGO_MONO_RECTANGLE:
-                media_element.attributes.append(Attribute(0x83, 0x05, 8))
-            if media.type == Multimedia.LOGO_COLOUR_RECTANGLE:
-                media_element.attributes.append(Attribute(0x83, 0x06, 8))
+                if media.width: media_element.attributes.append(build_attribute(0x2b, 0x84, media.width))
+                if media.height: media_element.attributes.append(build_attribute(0x2b, 0x85, media.height))
         # TODO language
     return mediagroup_element
     
 def build_genre(genre):
     genre_element = Element(0x14)
-    genre_element.attributes.append(Attribute(0x80, genre.href))
+    genre_element.attributes.append(build_attribute(0x14, 0x80, genre.href))
     return genre_element    
     
 def build_membership(membership):
     membership_element = Element(0x17)
     if membership.crid is not None:
-        membership_element.attributes.append(Attribute(0x80, membership.crid))
-    membership_element.attributes.append(Attribute(0x81, membership.shortcrid, 24))
+        membership_element.attributes.append(build_attribute(0x17, 0x80, membership.crid))
+    membership_element.attributes.append(build_attribute(0x17, 0x81, membership.shortcrid))
     if membership.index is not None: 
-        membership_element.attributes.append(0x82, membership.index)
+        membership_element.attributes.append(build_attribute(0x17, 0x82, membership.index))
     return membership_element  
     
 def build_link(link):
     link_element = Element(0x18)
-    link_element.attributes.append(Attribute(0x80, link.url))
+    link_element.attributes.append(build_attribute(0x18, 0x80, link.url))
     if link.description is not None:
-        link_element.attributes.append(Attribute(0x83, link.description))
+        link_element.attributes.append(build_attribute(0x18, 0x83, link.description))
     if link.mimetype is not None:
-        link_element.attributes.append(Attribute(0x81, link.mimetype))
+        link_element.attributes.append(build_attribute(0x18, 0x81, link.mimetype))
     if link.expiry is not None:
-        link_element.attributes.append(Attribute(0x84, link.expiry))
+        link_element.attributes.append(build_attribute(0x18, 0x84, link.expiry))
     return link_element   
 
 def build_programme_event(event):
     event_element = Element(0x2e)
     if event.crid is not None:
-        event_element.attributes.append(Attribute(0x80, event.crid))
-    event_element.attributes.append(Attribute(0x81, event.shortcrid, 24))
+        event_element.attributes.append(build_attribute(0x2e, 0x80, event.crid))
+    event_element.attributes.append(build_attribute(0x2e, 0x81, event.shortcrid))
     if event.version is not None and event.version > 1:
-        event_element.attributes.append(Attribute(0x82, event.version, 16))
+        event_element.attributes.append(build_attribute(0x2e, 0x82, event.version))
     if event.recommendation is True:
-        event_element.attributes.append(Attribute(0x83, 0x02, 8))
-    if not event.onair is False:
-        event_element.attributes.append(Attribute(0x84, 0x02, 8))
+        event_element.attributes.append(build_attribute(0x2e, 0x83, True))
+    if not event.onair:
+        event_element.attributes.append(build_attribute(0x2e, 0x84, 'off-air'))
     # names
     for name in event.names:
         event_element.children.append(build_name(name))
@@ -888,19 +1477,19 @@ def build_service(service):
     service_element = Element(0x28)
 
     # version
-    if service.version > 1: service_element.attributes.append(Attribute(0x80, service.version, 16)) 
+    if service.version > 1: service_element.attributes.append(build_attribute(0x28, 0x80, service.version)) 
 
     # format
     # TODO 
 
     # bitrate
-    if service.bitrate: service_element.attributes.append(Attribute(0x83, service.bitrate * 10, 16))
+    if service.bitrate: service_element.attributes.append(build_attribute(0x28, 0x83, service.bitrate * 10))
 
     # service IDs - the first in the list is primary, all others secondary 
     for i, id in enumerate(service.ids):
         serviceid_element = Element(0x29)
-        serviceid_element.attributes.append(Attribute(0x80, id))    
-        if i > 0: serviceid_element.attributes.append(Attribute(0x81, 0x02, 8)) # mark as secondary
+        serviceid_element.attributes.append(build_attribute(0x29, 0x80, id))    
+        if i > 0: serviceid_element.attributes.append(build_attribute(0x29, 0x81, Service.SECONDARY))
         service_element.children.append(serviceid_element)
 
     # simulcast TODO
@@ -937,8 +1526,8 @@ def build_keywords(keywords):
 def build_ensemble(ensemble):
     ensemble_element = Element(0x26)
 
-    ensemble_element.attributes.append(Attribute(0x80, ensemble.id))
-    if ensemble.version > 1: ensemble_element.attributes.append(Attribute(0x81, ensemble.version, 16))
+    ensemble_element.attributes.append(build_attribute(0x26, 0x80, ensemble.id))
+    if ensemble.version > 1: ensemble_element.attributes.append(build_attribute(0x26, 0x81, ensemble.version))
 
     # names
     for name in ensemble.names:
@@ -949,7 +1538,7 @@ def build_ensemble(ensemble):
         raise ValueError('At least one frequency must be defined for this ensemble')
     for frequency in ensemble.frequencies:
         frequency_element = Element(0x27)
-        frequency_element.attributes.append(Attribute(0x81, frequency, 24))
+        frequency_element.attributes.append(build_attribute(0x27, 0x81, frequency))
         ensemble_element.children.append(frequency_element)
 
     # media
@@ -967,27 +1556,1062 @@ def build_ensemble(ensemble):
 
     return ensemble_element
 
+# The write_* functions are the single-pass equivalents of the build_* functions
+# above, writing the model straight into a bytearray rather than building an
+# element tree to be rendered, and are what marshall encodes with. Each element
+# reserves a length byte which is back-patched once its content has been written.
+
+def start_element(buf, tag):
+    """Writes an element tag and reserves its length byte, returning the offset
+    to back-patch with :func:patch_length once the element content is written"""
+    buf.append(tag)
+    buf.append(0)
+    return len(buf) - 1
+
+def write_attribute(buf, parent_tag, tag, value):
+    data = pack_attribute(parent_tag, tag, value)
+    buf.append(tag)
+    buf.extend(encode_length(len(data)))
+    buf.extend(data)
+    
+def write_cdata(buf, value):
+    buf.append(0x01)
+    buf.extend(encode_length(len(value)))
+    buf.extend(str(value))
+
+def write_service_information(buf, info, tokens=None, default_language=None):
+    
+    if info.type == ServiceInfo.DRM: raise Exception("DRM not yet supported");
+    
+    # only one ensemble per file
+    if len(info.ensembles) == 0: raise ValueError("You must specify an ensemble in this binary encoded Service Information file")
+    if len(info.ensembles) > 1: raise ValueError("Cannot have more than one ensemble per binary encoded Service Information file")
+
+    # serviceInformation
+    offset = start_element(buf, 0x03)
+    if info.version > 1: write_attribute(buf, 0x03, 0x80, info.version)
+    if info.created: write_attribute(buf, 0x03, 0x81, info.created)
+    if info.originator: write_attribute(buf, 0x03, 0x82, info.originator)
+    if info.provider: write_attribute(buf, 0x03, 0x83, info.provider)
+    
+    # token table
+    if tokens: write_tokentable(buf, tokens)
+    
+    # default language
+    if default_language is not None: write_default_language(buf, default_language)
+    
+    # ensemble
+    write_ensemble(buf, info.ensembles[0], tokens)
+    
+    patch_length(buf, offset)
+    
+def write_epg(buf, epg, tokens=None, default_contentid=None, default_language=None, cache=None):
+    
+    schedule = epg.schedule
+    
+    # epg (default type is DAB, so no need to encode)
+    epg_offset = start_element(buf, 0x02)
+    
+    # token table
+    if tokens: write_tokentable(buf, tokens)
+    
+    # default content ID, passed down packed for the locations to compare against
+    default_bearer = None
+    if default_contentid is not None:
+        default_bearer = pack_contentid(default_contentid)
+        offset = start_element(buf, 0x05)
+        buf.extend(default_bearer)
+        patch_length(buf, offset)
+    
+    # default language
+    if default_language is not None: write_default_language(buf, default_language)
+    
+    # schedule
+    schedule_offset = start_element(buf, 0x21)
+    write_schedule_attributes(buf, schedule)
+        
+    # schedule scope
+    scope = schedule.get_scope()
+    if scope is not None:
+        write_scope(buf, scope)
+        
+    # programmes
+    if cache is None:
+        for programme in schedule.programmes:
+            write_programme(buf, programme, tokens, default_bearer)
+    else:
+        # the token table and default bearer change how every programme is encoded
+        cache.start((tuple(tokens) if tokens else None, default_bearer))
+        encode = lambda programme: encode_programme(programme, tokens, default_bearer)
+        for programme in schedule.programmes:
+            buf.extend(cache.get(programme, encode))
+        cache.finish()
+        
+    patch_length(buf, schedule_offset)
+    patch_length(buf, epg_offset)
+    
+def write_schedule_attributes(buf, schedule):
+    if schedule.version is not None and schedule.version > 1:
+        write_attribute(buf, 0x21, 0x80, schedule.version)
+    write_attribute(buf, 0x21, 0x81, schedule.created)
+    if schedule.originator is not None:
+        write_attribute(buf, 0x21, 0x82, schedule.originator)
+    
+def encode_programme(programme, tokens=None, default_bearer=None):
+    """Returns the bytes of a programme element"""
+    buf = bytearray()
+    write_programme(buf, programme, tokens, default_bearer)
+    return str(buf)
+    
+def write_programme(buf, programme, tokens=None, default_bearer=None):
+    offset = start_element(buf, 0x1c)
+    write_attribute(buf, 0x1c, 0x81, programme.shortcrid)
+    if programme.crid is not None:
+        write_attribute(buf, 0x1c, 0x80, programme.crid)
+    if programme.version is not None:
+        write_attribute(buf, 0x1c, 0x82, programme.version)
+    if programme.recommendation:
+        write_attribute(buf, 0x1c, 0x83, True)
+    if not programme.onair:
+        write_attribute(buf, 0x1c, 0x84, 'off-air')
+    if programme.bitrate is not None:
+        write_attribute(buf, 0x1c, 0x87, int(math.ceil(programme.bitrate)))
+    # names
+    for name in programme.names:
+        write_name(buf, name, tokens)
+    # locations
+    for location in programme.locations:
+        write_location(buf, location, default_bearer)
+    # media
+    if len(programme.media) > 0:
+        write_mediagroup(buf, programme.media, tokens)
+    # genre
+    for genre in programme.genres:
+        write_genre(buf, genre)
+    # membership
+    for membership in programme.memberships:
+        write_membership(buf, membership)
+    # link
+    for link in programme.links:
+        write_link(buf, link)
+    # events
+    for event in programme.events:
+        write_programme_event(buf, event, tokens, default_bearer)
+    patch_length(buf, offset)
+    
+def write_scope(buf, scope):
+    offset = start_element(buf, 0x24)
+    write_attribute(buf, 0x24, 0x80, scope.start)
+    write_attribute(buf, 0x24, 0x81, scope.end)
+    for service in scope.services:
+        service_offset = start_element(buf, 0x25)
+        write_attribute(buf, 0x25, 0x80, service)
+        patch_length(buf, service_offset)
+    patch_length(buf, offset)
+    
+name_tags = [(ShortName, 0x10), (MediumName, 0x11), (LongName, 0x12)]
+    
+def write_name(buf, name, tokens=None):
+    for type, tag in name_tags:
+        if isinstance(name, type): break
+    else: raise ValueError('unknown name type: %s' % name.__class__.__name__)
+    offset = start_element(buf, tag)
+    write_cdata(buf, tokenise(name.text, tokens))
+    patch_length(buf, offset)
+    
+def write_location(buf, location, default_bearer=None):
+    offset = start_element(buf, 0x19)
+    for time in location.times:
+        write_time(buf, time)
+    bearers = location.bearers
+    if default_bearer is not None and len(bearers) == 1 and pack_value(bearers[0]) == default_bearer:
+        bearers = []
+    for bearer in bearers:
+        bearer_offset = start_element(buf, 0x2d)
+        write_attribute(buf, 0x2d, 0x80, bearer)
+        patch_length(buf, bearer_offset)
+    patch_length(buf, offset)
+    
+def write_time(buf, time):
+    if isinstance(time, Time):
+        offset = start_element(buf, 0x2c)
+        write_attribute(buf, 0x2c, 0x80, time.billed_time)
+        if time.actual_time is not None:
+            write_attribute(buf, 0x2c, 0x82, time.actual_time)
+        if time.actual_duration is not None:
+            write_attribute(buf, 0x2c, 0x83, time.actual_duration)
+        write_attribute(buf, 0x2c, 0x81, time.billed_duration)
+    elif isinstance(time, RelativeTime):
+        offset = start_element(buf, 0x2f)
+        write_attribute(buf, 0x2f, 0x80, time.billed_offset)
+        write_attribute(buf, 0x2f, 0x81, time.billed_duration)
+        if time.actual_offset is not None:
+            write_attribute(buf, 0x2f, 0x82, time.actual_offset)
+        if time.actual_duration is not None:
+            write_attribute(buf, 0x2f, 0x83, time.actual_duration)
+    else: raise ValueError('unknown time type: %s' % time.__class__.__name__)
+    patch_length(buf, offset)
+    
+"""Encoded multimedia types, by the multimedia type of the model"""
+multimedia_types = attributes[(0x2b, 0x83)].values
+    
+def write_mediagroup(buf, media, tokens=None):
+    offset = start_element(buf, 0x13)
+    for media in media:
+        if isinstance(media, ShortDescription):
+            media_offset = start_element(buf, 0x1a)
+            write_cdata(buf, tokenise(media.text, tokens))
+            patch_length(buf, media_offset)
+        elif isinstance(media, LongDescription):
+            media_offset = start_element(buf, 0x1b)
+            write_cdata(buf, tokenise(media.text, tokens))
+            patch_length(buf, media_offset)
+        elif isinstance(media, Multimedia):
+            media_offset = start_element(buf, 0x2b)
+            if media.mimetype is not None:
+                write_attribute(buf, 0x2b, 0x80, media.mimetype)
+            if media.url is not None:
+                write_attribute(buf, 0x2b, 0x82, media.url)
+            if media.type in multimedia_types:
+                write_attribute(buf, 0x2b, 0x83, media.type)
+            if media.type == Multimedia.LOGO_UNRESTRICTED:
+                if media.width: write_attribute(buf, 0x2b, 0x84, media.width)
+                if media.height: write_attribute(buf, 0x2b, 0x85, media.height)
+            patch_length(buf, media_offset)
+    patch_length(buf, offset)
+    
+def write_genre(buf, genre):
+    offset = start_element(buf, 0x14)
+    write_attribute(buf, 0x14, 0x80, genre.href)
+    patch_length(buf, offset)
+    
+def write_membership(buf, membership):
+    offset = start_element(buf, 0x17)
+    if membership.crid is not None:
+        write_attribute(buf, 0x17, 0x80, membership.crid)
+    write_attribute(buf, 0x17, 0x81, membership.shortcrid)
+    if membership.index is not None:
+        write_attribute(buf, 0x17, 0x82, membership.index)
+    patch_length(buf, offset)
+    
+def write_link(buf, link):
+    offset = start_element(buf, 0x18)
+    write_attribute(buf, 0x18, 0x80, link.url)
+    if link.description is not None:
+        write_attribute(buf, 0x18, 0x83, link.description)
+    if link.mimetype is not None:
+        write_attribute(buf, 0x18, 0x81, link.mimetype)
+    if link.expiry is not None:
+        write_attribute(buf, 0x18, 0x84, link.expiry)
+    patch_length(buf, offset)
+    
+def write_programme_event(buf, event, tokens=None, default_bearer=None):
+    offset = start_element(buf, 0x2e)
+    if event.crid is not None:
+        write_attribute(buf, 0x2e, 0x80, event.crid)
+    write_attribute(buf, 0x2e, 0x81, event.shortcrid)
+    if event.version is not None and event.version > 1:
+        write_attribute(buf, 0x2e, 0x82, event.version)
+    if event.recommendation is True:
+        write_attribute(buf, 0x2e, 0x83, True)
+    if not event.onair:
+        write_attribute(buf, 0x2e, 0x84, 'off-air')
+    # names
+    for name in event.names:
+        write_name(buf, name, tokens)
+    # locations
+    for location in event.locations:
+        write_location(buf, location, default_bearer)
+    # media
+    if len(event.media) > 0:
+        write_mediagroup(buf, event.media, tokens)
+    # genre
+    for genre in event.genres:
+        write_genre(buf, genre)
+    # membership
+    for membership in event.memberships:
+        write_membership(buf, membership)
+    # link
+    for link in event.links:
+        write_link(buf, link)
+    patch_length(buf, offset)
+    
+def write_service(buf, service, tokens=None):
+    offset = start_element(buf, 0x28)
+    
+    # version
+    if service.version > 1: write_attribute(buf, 0x28, 0x80, service.version)
+    
+    # bitrate
+    if service.bitrate: write_attribute(buf, 0x28, 0x83, service.bitrate * 10)
+    
+    # service IDs - the first in the list is primary, all others secondary 
+    for i, id in enumerate(service.ids):
+        serviceid_offset = start_element(buf, 0x29)
+        write_attribute(buf, 0x29, 0x80, id)
+        if i > 0: write_attribute(buf, 0x29, 0x81, Service.SECONDARY)
+        patch_length(buf, serviceid_offset)
+        
+    # names
+    for name in service.names:
+        write_name(buf, name, tokens)
+        
+    # media
+    if len(service.media) > 0:
+        write_mediagroup(buf, service.media, tokens)
+        
+    # genre
+    for genre in service.genres:
+        write_genre(buf, genre)
+        
+    # keywords 
+    if len(service.keywords):
+        write_keywords(buf, service.keywords)
+        
+    patch_length(buf, offset)
+    
+def write_keywords(buf, keywords):
+    offset = start_element(buf, 0x16)
+    write_cdata(buf, ",".join(keywords))
+    patch_length(buf, offset)
+    
+def write_ensemble(buf, ensemble, tokens=None):
+    offset = start_element(buf, 0x26)
+    
+    write_attribute(buf, 0x26, 0x80, ensemble.id)
+    if ensemble.version > 1: write_attribute(buf, 0x26, 0x81, ensemble.version)
+    
+    # names
+    for name in ensemble.names:
+        write_name(buf, name, tokens)
+        
+    # frequencies
+    if not len(ensemble.frequencies):
+        raise ValueError('At least one frequency must be defined for this ensemble')
+    for frequency in ensemble.frequencies:
+        frequency_offset = start_element(buf, 0x27)
+        write_attribute(buf, 0x27, 0x81, frequency)
+        patch_length(buf, frequency_offset)
+        
+    # media
+    if len(ensemble.media) > 0:
+        write_mediagroup(buf, ensemble.media, tokens)
+        
+    # services
+    for service in ensemble.services:
+        write_service(buf, service, tokens)
+        
+    patch_length(buf, offset)
+
+# Token tables replace the most valuable repeated substrings of the names and 
+# descriptions with single byte tokens, expanded again by the decoder. Tokens
+# are held as a list of (string, token) pairs in the order they were chosen, as
+# each is substituted into the text left by those before it.
+
+"""Token values usable in a token table, skipping tab, line feed and carriage return"""
+token_slots = [0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08, 0x0b, 0x0c, 0x0e, 0x0f, 0x10, 0x11, 0x12, 0x13]
+token_word_pattern = re.compile('\\S+\\s*')
+
+def iter_texts(obj):
+    """Generates each :class:Text name and description of an :class:Epg or 
+    :class:ServiceInfo"""
+    if isinstance(obj, Epg):
+        for programme in obj.schedule.programmes:
+            for x in programme.names + programme.media: 
+                if isinstance(x, Text): yield x
+            for event in programme.events:
+                for x in event.names + event.media:
+                    if isinstance(x, Text): yield x
+    elif isinstance(obj, ServiceInfo):
+        for ensemble in obj.ensembles:
+            for x in ensemble.names + ensemble.media:
+                if isinstance(x, Text): yield x
+            for service in ensemble.services:
+                for x in service.names + service.media:
+                    if isinstance(x, Text): yield x
+                    
+def iter_text(obj):
+    """Generates the text of each name and description of an :class:Epg or 
+    :class:ServiceInfo, being the strings a token table applies to"""
+    for x in iter_texts(obj): yield str(x.text)
+
+def count_substrings(counts, max_words=8):
+    """Counts the occurrences of each run of up to a number of words in the 
+    strings, weighted by how many times each string occurs"""
+    candidates = {}
+    for text, n in counts.iteritems():
+        for segment in token_table_pattern.split(text):
+            words = token_word_pattern.findall(segment)
+            for i in range(len(words)):
+                candidate = ''
+                for word in words[i:i+max_words]:
+                    candidate += word
+                    if len(candidate) > 255: break
+                    candidates[candidate] = candidates.get(candidate, 0) + n
+                    stripped = candidate.rstrip()
+                    if stripped != candidate:
+                        candidates[stripped] = candidates.get(stripped, 0) + n
+    return candidates
+
+def build_token_table(strings, slots=token_slots):
+    """Chooses the repeated substrings that save the most bytes when replaced by 
+    tokens, returning the tokens and the number of bytes they save, net of the
+    token table itself. As the lengths of the elements containing the text can
+    only get shorter this is the least that will be saved.
+    
+    :param strings: Text to be tokenised
+    :type strings: iterable of str
+    :param slots: Token values free to use
+    :type slots: list of int
+    """
+    
+    counts = {}
+    for text in strings: counts[text] = counts.get(text, 0) + 1
+    
+    # text which already contains a token value cannot use it
+    slots = [x for x in slots if not any(chr(x) in text for text in counts)]
+    
+    tokens = []
+    saved = 0
+    table_length = 0
+    for slot in slots:
+        candidates = count_substrings(counts)
+        if not candidates: break
+        value = max(candidates, key=lambda x: candidates[x] * (len(x) - 1) - (len(x) + 2))
+        
+        # substitute the token and measure what it actually saves
+        token = chr(slot)
+        substituted = {}
+        reduction = 0
+        for text, n in counts.iteritems():
+            if value in text:
+                replaced = text.replace(value, token)
+                reduction += n * (len(text) - len(replaced))
+                text = replaced
+            substituted[text] = substituted.get(text, 0) + n
+        if reduction <= len(value) + 2: break
+        
+        counts = substituted
+        tokens.append((value, slot))
+        saved += reduction - (len(value) + 2)
+        table_length += len(value) + 2
+        
+    if tokens: saved -= 1 + len(encode_length(table_length))
+    logger.info('token table of %d tokens saves %d bytes', len(tokens), saved)
+    return tokens, saved
+
+def tokenise(text, tokens):
+    """Replaces each token string in the text with its token"""
+    if not tokens: return text
+    text = str(text)
+    for value, token in tokens:
+        text = text.replace(value, chr(token))
+    return text
+
+def write_tokentable(buf, tokens):
+    offset = start_element(buf, 0x04)
+    for value, token in tokens:
+        buf.append(token)
+        buf.append(len(value))
+        buf.extend(value)
+    patch_length(buf, offset)
+    
+# Defaults are written once at the top of a document in place of the values
+# they match further down. The default content ID stands in for the bearer of
+# any location with that as its only bearer.
+
+def find_default_contentid(epg):
+    """Returns the most common bearer :class:ContentId of the single bearer 
+    locations in a schedule, or None if no bearer is shared between locations"""
+    counts = {}
+    bearers = {}
+    for programme in epg.schedule.programmes:
+        for location in programme.locations + [l for event in programme.events for l in event.locations]:
+            if len(location.bearers) != 1: continue
+            bearer = location.bearers[0]
+            key = pack_value(bearer)
+            counts[key] = counts.get(key, 0) + 1
+            bearers[key] = bearer
+    if not counts: return None
+    key = max(counts, key=counts.get)
+    if counts[key] < 2: return None
+    bearer = bearers[key]
+    return bearer.id if isinstance(bearer, Bearer) else bearer
+
+def find_default_language(obj):
+    """Returns the most common language of the names and descriptions of an 
+    :class:Epg or :class:ServiceInfo, as its ISO 639 code, or None if they have 
+    no locale. Text left with the default locale of the host is not counted."""
+    counts = {}
+    for x in iter_texts(obj):
+        if x.locale is None or x.locale is DEFAULT_LOCALE or not x.locale[0]: continue
+        language = x.locale[0].split('_')[0]
+        counts[language] = counts.get(language, 0) + 1
+    if not counts: return None
+    return max(counts, key=counts.get)
+
+def write_default_language(buf, language):
+    offset = start_element(buf, 0x06)
+    buf.extend(language)
+    patch_length(buf, offset)
+    
+# The *_size functions compute the length of what the write_* functions would 
+# write for the same arguments, from the model alone and without encoding it,
+# element by element. They must be kept in step with the write_* functions, 
+# though the lengths of the attributes of a fixed width are taken from the schema
+# that the write_* functions pack them by.
+
+def element_size(length):
+    """Returns the length of an element, attribute or CData carrying the given 
+    number of data bytes, with its tag and length prefix"""
+    if length <= 253: return length + 2
+    elif length <= 1<<16: return length + 4
+    elif length <= 1<<24: return length + 5
+    else: raise ValueError('element data length exceeds the maximum allowed by the extended element length (24bits): %d > %d' % (length, 1<<24))
+
+"""Lengths of the attributes of a fixed width, with their tag and length prefix,
+   by their parent element tag and tag, from the schema"""
+attribute_sizes = dict((key, element_size((schema.bitlength + 7) / 8)) for key, schema in attributes.items() 
+                       if schema.bitlength is not None)
+
+"""Length of a time element with only a billed time and duration, less that of 
+   the billed time attribute"""
+billed_time_size = 2 + attribute_sizes[(0x2c, 0x81)]
+
+"""Lengths of the attributes of programmes and programme events, which are 
+   measured for every one in a schedule and so are looked up once here"""
+(programme_shortid_size, programme_version_size, programme_recommendation_size, 
+ programme_broadcast_size, programme_bitrate_size) = [attribute_sizes[(0x1c, tag)] for tag in (0x81, 0x82, 0x83, 0x84, 0x87)]
+(event_shortid_size, event_version_size, event_recommendation_size, 
+ event_broadcast_size) = [attribute_sizes[(0x2e, tag)] for tag in (0x81, 0x82, 0x83, 0x84)]
+
+"""Timezones whose offset from UTC never changes, and whether each seen has an 
+   offset, by their identity"""
+fixed_timezones = (dateutil.tz.tzutc, dateutil.tz.tzoffset)
+timezone_offsets = {}
+
+def has_offset(timepoint):
+    """Returns whether a timepoint is encoded with a local time offset, memoized
+    for the fixed timezones"""
+    tzinfo = timepoint.tzinfo
+    if tzinfo is None: return False
+    entry = timezone_offsets.get(id(tzinfo))
+    if entry is not None and entry[0] is tzinfo: return entry[1]
+    offset = timepoint.utcoffset()
+    flag = bool(offset.days or offset.seconds)
+    if isinstance(tzinfo, fixed_timezones): cache_timepoint(timezone_offsets, id(tzinfo), (tzinfo, flag))
+    return flag
+
+def timepoint_size(timepoint):
+    """Returns the length of a timepoint attribute"""
+    size = 8 if timepoint.second > 0 else 6
+    if timepoint.tzinfo is not None and has_offset(timepoint): size += 1
+    return size
+
+def contentid_size(id):
+    """Returns the length of a content ID attribute"""
+    if isinstance(id, Bearer): id = id.id
+    if id.sid is not None and id.scids is not None:
+        size = 5
+        if id.ecc is not None: size += 1
+        if id.eid is not None: size += 2
+        if id.xpad is not None: size += 1
+        return size
+    return 5
+
+def genre_size(genre):
+    """Returns the length of a genre element"""
+    length = len(genre.href)
+    if length <= 251: return length + 4
+    return element_size(element_size(length))
+
+"""Lengths of tokenised text by the text, held with the token table they were 
+   found with, as the same text recurs throughout a schedule"""
+tokenised_lengths = {}
+
+def text_size(text, tokens=None):
+    """Returns the length of an element carrying text as CData"""
+    if tokens:
+        entry = tokenised_lengths.get(text)
+        if entry is not None and entry[0] is tokens: 
+            length = entry[1]
+        else:
+            length = len(tokenise(text, tokens))
+            if len(tokenised_lengths) >= timepoint_cache_size: tokenised_lengths.clear()
+            tokenised_lengths[text] = (tokens, length)
+    else: length = len(text)
+    if length <= 251: return length + 4
+    return element_size(element_size(length))
+
+def programme_size(programme, tokens=None, default_bearer=None):
+    """Returns the length of a programme element, being that of 
+    :func:encode_programme for the same arguments"""
+    
+    size = programme_shortid_size
+    crid = programme.crid
+    if crid is not None: 
+        length = len(crid) if crid.__class__ is str else len(str(crid))
+        size += length + 2 if length <= 253 else element_size(length)
+    if programme.version is not None: size += programme_version_size
+    if programme.recommendation: size += programme_recommendation_size
+    if not programme.onair: size += programme_broadcast_size
+    if programme.bitrate is not None: size += programme_bitrate_size
+    lists = programme_lists(programme)
+    size += content_size(lists, tokens, default_bearer)
+    events = lists[6]
+    if events:
+        for event in events: size += programme_event_size(event, tokens, default_bearer)
+    return size + 2 if size <= 253 else element_size(size)
+
+def content_size(lists, tokens=None, default_bearer=None):
+    """Returns the length of the names, locations, media, genres, memberships and 
+    links of a programme or programme event, given as read by :func:content_lists. 
+    
+    This is the bulk of the work of measuring a schedule, so the common cases of 
+    elements short enough to take a single byte length are measured inline, and 
+    the lists are read in bulk without standing in empty lists."""
+    
+    size = 0
+    names, locations, media, genres, memberships, links = lists[:6]
+    if names:
+        if tokens:
+            for name in names: size += text_size(name.text, tokens)
+        else:
+            for name in names:
+                length = len(name.text)
+                size += length + 4 if length <= 251 else text_size(name.text)
+    if locations:
+        for location in locations: 
+            length = 0
+            times, bearers = location_lists(location)
+            if times:
+                for time in times:
+                    if time.__class__ is Time and time.actual_time is None and time.actual_duration is None:
+                        timepoint = time.billed_time
+                        length += billed_time_size + (8 if timepoint.second > 0 else 6) # with the billed time
+                        if timepoint.tzinfo is not None and has_offset(timepoint): length += 1
+                    else: length += time_size(time)
+            if bearers:
+                if default_bearer is not None and len(bearers) == 1 and pack_value(bearers[0]) == default_bearer:
+                    bearers = ()
+                for bearer in bearers:
+                    id = bearer.id if bearer.__class__ is Bearer else bearer
+                    if id.sid is not None and id.scids is not None:
+                        # bearer element and attribute headers, flags and SId
+                        length += 7
+                        if id.ecc is not None: length += 1
+                        if id.eid is not None: length += 2
+                        if id.xpad is not None: length += 1
+                    else: length += contentid_size(id) + 2
+            size += length + 2 if length <= 253 else element_size(length)
+    if media:
+        length = 0
+        for item in media:
+            cls = item.__class__
+            if (cls is ShortDescription or cls is LongDescription) and not tokens:
+                text_length = len(item.text)
+                length += text_length + 4 if text_length <= 251 else text_size(item.text)
+            else: length += media_size(item, tokens)
+        size += length + 2 if length <= 253 else element_size(length)
+    if genres:
+        for genre in genres:
+            length = len(genre.href)
+            size += length + 4 if length <= 251 else genre_size(genre)
+    if memberships:
+        for membership in memberships: size += membership_size(membership)
+    if links:
+        for link in links:
+            if link.mimetype is None and link.expiry is None:
+                length = len(link.url) + 2
+                if link.description is not None: length += len(link.description) + 2
+                size += length + 2 if length <= 253 else link_size(link)
+            else: size += link_size(link)
+    return size
+
+def scope_size(scope):
+    size = timepoint_size(scope.start) + timepoint_size(scope.end)
+    for service in scope.services: size += element_size(contentid_size(service))
+    return element_size(size)
+
+def time_size(time):
+    if isinstance(time, Time):
+        size = timepoint_size(time.billed_time) + attribute_sizes[(0x2c, 0x81)]
+        if time.actual_time is not None: size += timepoint_size(time.actual_time)
+        if time.actual_duration is not None: size += attribute_sizes[(0x2c, 0x83)]
+    elif isinstance(time, RelativeTime):
+        size = attribute_sizes[(0x2f, 0x80)] + attribute_sizes[(0x2f, 0x81)]
+        if time.actual_offset is not None: size += attribute_sizes[(0x2f, 0x82)]
+        if time.actual_duration is not None: size += attribute_sizes[(0x2f, 0x83)]
+    else: raise ValueError('unknown time type: %s' % time.__class__.__name__)
+    return element_size(size)
+
+def mediagroup_size(media, tokens=None):
+    size = 0
+    for item in media: size += media_size(item, tokens)
+    return size + 2 if size <= 253 else element_size(size)
+
+def media_size(media, tokens=None):
+    if isinstance(media, (ShortDescription, LongDescription)):
+        return text_size(media.text, tokens)
+    elif isinstance(media, Multimedia):
+        size = 0
+        if media.mimetype is not None: size += element_size(len(media.mimetype))
+        if media.url is not None: size += element_size(len(media.url))
+        type = media.type
+        if type in multimedia_types: size += attribute_sizes[(0x2b, 0x83)]
+        if type == Multimedia.LOGO_UNRESTRICTED:
+            if media.width: size += attribute_sizes[(0x2b, 0x84)]
+            if media.height: size += attribute_sizes[(0x2b, 0x85)]
+        return size + 2 if size <= 253 else element_size(size)
+    return 0
+
+def membership_size(membership):
+    size = attribute_sizes[(0x17, 0x81)] # shortId
+    if membership.crid is not None: size += element_size(len(str(membership.crid)))
+    if membership.index is not None: size += attribute_sizes[(0x17, 0x82)]
+    return element_size(size)
+
+def link_size(link):
+    length = len(link.url)
+    size = length + 2 if length <= 253 else element_size(length)
+    if link.description is not None: 
+        length = len(link.description)
+        size += length + 2 if length <= 253 else element_size(length)
+    if link.mimetype is not None: size += element_size(len(link.mimetype))
+    if link.expiry is not None: size += timepoint_size(link.expiry)
+    return size + 2 if size <= 253 else element_size(size)
+
+def programme_event_size(event, tokens=None, default_bearer=None):
+    size = event_shortid_size
+    if event.crid is not None: size += element_size(len(str(event.crid)))
+    if event.version is not None and event.version > 1: size += event_version_size
+    if event.recommendation is True: size += event_recommendation_size
+    if not event.onair: size += event_broadcast_size
+    size += content_size(content_lists(event), tokens, default_bearer)
+    return size + 2 if size <= 253 else element_size(size)
+
+def tokentable_size(tokens):
+    return element_size(sum(len(value) + 2 for value, token in tokens))
+
+def schedule_size(schedule, tokens=None, default_bearer=None):
+    """Returns the length of a schedule element, with its scope and programmes"""
+    size = 0
+    if schedule.version is not None and schedule.version > 1: size += attribute_sizes[(0x21, 0x80)]
+    size += timepoint_size(schedule.created)
+    if schedule.originator is not None: size += element_size(len(schedule.originator))
+    scope = schedule.get_scope()
+    if scope is not None: size += scope_size(scope)
+    for programme in schedule.programmes:
+        size += programme_size(programme, tokens, default_bearer)
+    return element_size(size)
+
+def epg_size(epg, tokens=None, default_contentid=None, default_language=None):
+    """Returns the length of the document written by :func:write_epg for the
+    same arguments"""
+    size = 0
+    if tokens: size += tokentable_size(tokens)
+    default_bearer = None
+    if default_contentid is not None:
+        default_bearer = pack_contentid(default_contentid)
+        size += element_size(len(default_bearer))
+    if default_language is not None: size += element_size(len(default_language))
+    size += schedule_size(epg.schedule, tokens, default_bearer)
+    return element_size(size)
+
+def service_size(service, tokens=None):
+    size = 0
+    if service.version > 1: size += attribute_sizes[(0x28, 0x80)]
+    if service.bitrate: size += attribute_sizes[(0x28, 0x83)]
+    for i, id in enumerate(service.ids):
+        size += element_size(contentid_size(id))
+        if i > 0: size += attribute_sizes[(0x29, 0x81)]
+    for name in service.names: size += text_size(name.text, tokens)
+    if len(service.media) > 0: size += mediagroup_size(service.media, tokens)
+    for genre in service.genres: size += genre_size(genre)
+    if len(service.keywords): size += text_size(",".join(service.keywords))
+    return size + 2 if size <= 253 else element_size(size)
+
+def ensemble_size(ensemble, tokens=None):
+    size = contentid_size(ensemble.id)
+    if ensemble.version > 1: size += attribute_sizes[(0x26, 0x81)]
+    for name in ensemble.names: size += text_size(name.text, tokens)
+    size += len(ensemble.frequencies) * element_size(attribute_sizes[(0x27, 0x81)])
+    if len(ensemble.media) > 0: size += mediagroup_size(ensemble.media, tokens)
+    for service in ensemble.services: size += service_size(service, tokens)
+    return element_size(size)
+
+def service_information_size(info, tokens=None, default_language=None):
+    """Returns the length of the document written by 
+    :func:write_service_information for the same arguments"""
+    size = 0
+    if info.version > 1: size += attribute_sizes[(0x03, 0x80)]
+    if info.created: size += timepoint_size(info.created)
+    if info.originator: size += element_size(len(info.originator))
+    if info.provider: size += element_size(len(info.provider))
+    if tokens: size += tokentable_size(tokens)
+    if default_language is not None: size += element_size(len(default_language))
+    size += ensemble_size(info.ensembles[0], tokens)
+    return element_size(size)
+
+def encoded_size(obj, token_table=False, defaults=False):
+    """Returns the length of the binary encoding of an :class:Epg, :class:Schedule,
+    :class:ServiceInfo or :class:Programme without encoding it, being that of 
+    :func:marshall for the same arguments, or of :func:encode_programme for a
+    programme. A schedule is measured as the :class:Epg document carrying it.
+    
+    :param token_table: Whether a token table is generated from the repeated text,
+    which is chosen as :func:marshall would
+    :type token_table: bool
+    :param defaults: Whether the most common bearer and language are written as
+    defaults
+    :type defaults: bool
+    """
+    
+    if isinstance(obj, Programme): return programme_size(obj)
+    if isinstance(obj, Schedule): obj = Epg(obj)
+    if isinstance(obj, ServiceInfo):
+        if len(obj.ensembles) != 1: raise ValueError('a binary encoded Service Information file must have exactly one ensemble')
+        return service_information_size(obj, 
+                                        build_token_table(iter_text(obj))[0] if token_table else None,
+                                        find_default_language(obj) if defaults else None)
+    if isinstance(obj, Epg):
+        return epg_size(obj, 
+                        build_token_table(iter_text(obj))[0] if token_table else None,
+                        find_default_contentid(obj) if defaults else None,
+                        find_default_language(obj) if defaults else None)
+    raise ValueError('cannot measure the encoding of: %s' % obj.__class__.__name__)
+    
+# The read_* functions are the single-pass equivalents of the parse_* functions
+# above, decoding the model straight from the offsets into a buffer rather than
+# from a parsed element tree. The nearest token table and default content ID are
+# passed down from the enclosing elements.
+
+def read_children(buf, start, end):
+    """Generates the tag and data offsets of each child of the element data
+    between the start and end offsets"""
+    i = start
+    while i < end:
+        tag, child_start, child_end = decode_header(buf, i)
+        if child_end > end:
+            raise ValueError('end of data is beyond length: %d > %d' % (child_end - start, end - start))
+        yield tag, child_start, child_end
+        i = child_end
+        
+def read_attribute(parent_tag, tag, buf, start, end):
+    return unpack_attribute(parent_tag, tag, buf[start:end].tobytes())
+
+def read_text(buf, start, end, tokens):
+    """Returns the token-expanded CData value of a text element"""
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x01: return expand_tokens(buf[child_start:child_end].tobytes(), tokens)
+    raise ValueError('text element has no CData')
+
+def read_time(buf, start, end):
+    attributes = {}
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag >= 0x80 and tag <= 0x83:
+            attributes[tag] = read_attribute(0x2c, tag, buf, child_start, child_end)
+    return Time(attributes[0x80], attributes[0x81], attributes.get(0x82), attributes.get(0x83))
+
+def read_location(buf, start, end, tokens, default_contentid):
+    location = Location()
+    for tag, child_start, child_end in read_children(buf, start, end):
+        # times
+        if tag == 0x2c:
+            location.times.append(read_time(buf, child_start, child_end))
+        # bearer
+        elif tag == 0x2d:
+            for attribute_tag, attribute_start, attribute_end in read_children(buf, child_start, child_end):
+                if attribute_tag == 0x80:
+                    location.bearers.append(Bearer(read_attribute(0x2d, 0x80, buf, attribute_start, attribute_end)))
+                    break
+        elif tag == 0x05:
+            default_contentid = unpack_contentid(buf[child_start:child_end].tobytes())
+            
+    # apply a default content ID
+    if not len(location.bearers) and default_contentid is not None:
+        location.bearers.append(default_contentid)
+    if not len(location.bearers):
+        raise ValueError('location has no bearers and no default content ID is defined')
+    
+    return location
+
+def read_media(buf, start, end, tokens):
+    short_descriptions = []
+    long_descriptions = []
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x1a:
+            short_descriptions.append(ShortDescription(read_text(buf, child_start, child_end, tokens)))
+        elif tag == 0x1b:
+            long_descriptions.append(LongDescription(read_text(buf, child_start, child_end, tokens)))
+        elif tag == 0x04:
+            tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+    return short_descriptions + long_descriptions
+
+def read_names(names, tag, buf, start, end, tokens):
+    """Reads a name element into the list of names for its type"""
+    text = read_text(buf, start, end, tokens)
+    if tag == 0x10: names[0].append(ShortName(text))
+    elif tag == 0x11: names[1].append(MediumName(text))
+    else: names[2].append(LongName(text))
+
+def read_programme(buf, start, end, tokens=None, default_contentid=None):
+    shortcrid = None
+    names = ([], [], [])
+    media = []
+    locations = []
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x81:
+            shortcrid = read_attribute(0x1c, tag, buf, child_start, child_end)
+        elif tag >= 0x10 and tag <= 0x12:
+            read_names(names, tag, buf, child_start, child_end, tokens)
+        elif tag == 0x13:
+            media.extend(read_media(buf, child_start, child_end, tokens))
+        elif tag == 0x19:
+            locations.append((child_start, child_end))
+        elif tag == 0x04:
+            tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+        elif tag == 0x05:
+            default_contentid = unpack_contentid(buf[child_start:child_end].tobytes())
+    if shortcrid is None: raise ValueError('programme has no short CRID')
+    
+    programme = Programme(shortcrid)
+    programme.names = names[0] + names[1] + names[2]
+    programme.media = media
+    programme.locations = [read_location(buf, location_start, location_end, tokens, default_contentid) for location_start, location_end in locations]
+    return programme
+
+def iter_schedule(buf, start, end, tokens=None, default_contentid=None):
+    """Generates each programme of the schedule element data between the offsets"""
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x1c:
+            yield read_programme(buf, child_start, child_end, tokens, default_contentid)
+        elif tag == 0x04:
+            tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+        elif tag == 0x05:
+            default_contentid = unpack_contentid(buf[child_start:child_end].tobytes())
+            
+def iter_epg(buf, start, end, tokens=None, default_contentid=None):
+    """Generates each programme of the first schedule in the epg element data 
+    between the offsets"""
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x21:
+            for programme in iter_schedule(buf, child_start, child_end, tokens, default_contentid):
+                yield programme
+            return
+        elif tag == 0x04:
+            tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+        elif tag == 0x05:
+            default_contentid = unpack_contentid(buf[child_start:child_end].tobytes())
+    raise ValueError('epg has no schedule')
+    
+def read_attributes(parent_tag, buf, start, end):
+    """Returns the values of the attributes of the element data between the 
+    offsets, by their tag"""
+    return dict((tag, read_attribute(parent_tag, tag, buf, child_start, child_end)) 
+                for tag, child_start, child_end in read_children(buf, start, end) if tag >= 0x80)
+    
+def read_epg(buf, start, end):
+    schedule = Schedule()
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x21:
+            attributes = read_attributes(0x21, buf, child_start, child_end)
+            if 0x80 in attributes: schedule.version = attributes[0x80]
+            if 0x81 in attributes: schedule.created = attributes[0x81]
+            if 0x82 in attributes: schedule.originator = attributes[0x82]
+            break
+    schedule.programmes.extend(iter_epg(buf, start, end))
+    return Epg(schedule)
+
+def read_service(buf, start, end, tokens=None):
+    id = None
+    names = ([], [], [])
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x29 and id is None:
+            for attribute_tag, attribute_start, attribute_end in read_children(buf, child_start, child_end):
+                if attribute_tag == 0x80:
+                    id = read_attribute(0x29, 0x80, buf, attribute_start, attribute_end)
+                    break
+        elif tag >= 0x10 and tag <= 0x12:
+            read_names(names, tag, buf, child_start, child_end, tokens)
+        elif tag == 0x04:
+            tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+    if id is None: raise ValueError('service has no service ID')
+    
+    service = Service(id)
+    service.names = names[0] + names[1] + names[2]
+    return service
+
+def read_ensemble(buf, start, end, tokens=None):
+    id = None
+    names = ([], [], [])
+    services = []
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x80:
+            id = read_attribute(0x26, tag, buf, child_start, child_end)
+        elif tag >= 0x10 and tag <= 0x12:
+            read_names(names, tag, buf, child_start, child_end, tokens)
+        elif tag == 0x28:
+            services.append(read_service(buf, child_start, child_end, tokens))
+        elif tag == 0x04:
+            tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+    if id is None: raise ValueError('ensemble has no ensemble ID')
+    
+    ensemble = Ensemble(id)
+    ensemble.names = names[0] + names[1] + names[2]
+    ensemble.services = services
+    return ensemble
+
+def read_service_information(buf, start, end):
+    tokens = None
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x26:
+            attributes = read_attributes(0x03, buf, start, end)
+            service_info = ServiceInfo(attributes.get(0x81), attributes.get(0x80, 1), 
+                                       attributes.get(0x82), attributes.get(0x83))
+            service_info.ensembles.append(read_ensemble(buf, child_start, child_end, tokens))
+            return service_info
+        elif tag == 0x04:
+            tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+    raise ValueError('service information has no ensemble')
+    
+def iter_programmes(i):
+    """Generates each :class:Programme of a binary PI file in turn, decoding 
+    straight from the bytes without building the whole schedule
+    
+    :param i: String or File object to read binary from
+    :type i: str, file
+    """
+    buf = memoryview(read_bytes(i))
+    tag, start, end = decode_header(buf, 0)
+    if tag != 0x02: raise ValueError('not a binary PI file, tag is 0x%02x' % tag)
+    return iter_epg(buf, start, end)
+
 token_table_pattern = re.compile('([\\x01\\x02\\x03\\x04\\x05\\x06\\x07\\x08\\x0b\\x0c\\x0e\\x0f\\x10\\x11\\x12\\x13])')
 def apply_token_table(val, e):
     x = e
     while x:
         if hasattr(x, 'tokens'):
-            tokens = x.tokens
-            matcher = re.findall(token_table_pattern, val)
-            if matcher:
-                for group in matcher: 
-                    logger.debug('replacing 0x%02x with %s', ord(group), tokens[ord(group)])
-                    val = val.replace(group, tokens[ord(group)])
-            matcher = re.search(token_table_pattern, val)
-            if matcher: 
-                logger.warning('%d tokens (%s) still remain in string "%s" from table: %s', len(matcher.groups()), matcher.groups(), val, tokens)
-            break
+            return expand_tokens(val, x.tokens)
         elif hasattr(x, 'parent'):
             x = x.parent
         else:
             break
     return val        
 
+def expand_tokens(val, tokens):
+    """Replaces each token in the string with its value from the token table"""
+    if tokens is None: return val
+    matcher = re.findall(token_table_pattern, val)
+    if matcher:
+        for group in matcher: 
+            logger.debug('replacing 0x%02x with %s', ord(group), tokens[ord(group)])
+            val = val.replace(group, tokens[ord(group)])
+    matcher = re.search(token_table_pattern, val)
+    if matcher: 
+        logger.warning('%d tokens (%s) still remain in string "%s" from table: %s', len(matcher.groups()), matcher.groups(), val, tokens)
+    return val
+
 def print_info(e):
     print e.attributes
     print e.children
@@ -999,7 +2623,7 @@ def parse_time(e):
     actual_time = None
     if e.has_attribute(0x82): actual_time = e.get_attributes(0x82)[0].value
     actual_duration = None
-    if e.has_attribute(0x82): actual_duration = e.get_attributes(0x83)[0].value
+    if e.has_attribute(0x83): actual_duration = e.get_attributes(0x83)[0].value
     time = Time(billed_time, billed_duration, actual_time, actual_duration)
     return time
 
@@ -1082,6 +2706,10 @@ def parse_programme(e):
 def parse_schedule(e):
     
     schedule = Schedule()
+    for attribute in e.attributes:
+        if attribute.tag == 0x80: schedule.version = attribute.value
+        elif attribute.tag == 0x81: schedule.created = attribute.value
+        elif attribute.tag == 0x82: schedule.originator = attribute.value
     
     # programmes
     programme_elements = e.get_children(0x1c)
@@ -1093,7 +2721,7 @@ def parse_schedule(e):
 
 def parse_epg(e):
     schedule = parse_schedule(e.get_children(0x21)[0])
-    return Epg(schedule, type)
+    return Epg(schedule)
 
 def parse_service(e):
     
@@ -1135,11 +2763,75 @@ def parse_ensemble(e):
     return ensemble 
 
 def parse_service_information(e):
-    service_info = ServiceInfo()
+    attributes = dict((x.tag, x.value) for x in e.attributes)
+    service_info = ServiceInfo(attributes.get(0x81), attributes.get(0x80, 1), 
+                               attributes.get(0x82), attributes.get(0x83))
     ensemble = parse_ensemble(e.get_children(0x26)[0])
     service_info.ensembles.append(ensemble)
     return service_info
     
+def pack_int(i, n):
+    """Byte-aligned equivalent of :func:int_to_bitarray, padded out to whole bytes"""
+    if n == 8: return chr(i & 0xff)
+    elif n == 16: return struct.pack('>H', i & 0xffff)
+    elif n == 24: return struct.pack('>I', i & 0xffffff)[1:]
+    size = (n + 7) / 8
+    i = (i & ((1 << n) - 1)) << (size * 8 - n)
+    return ''.join(chr((i >> (8 * j)) & 0xff) for j in xrange(size - 1, -1, -1))
+
+def unpack_int(data):
+    """Decodes a big-endian unsigned integer from a byte string"""
+    size = len(data)
+    if size == 1: return ord(data)
+    elif size == 2: return struct.unpack('>H', data)[0]
+    elif size == 3: return struct.unpack('>I', '\x00' + data)[0]
+    elif size == 4: return struct.unpack('>I', data)[0]
+    value = 0
+    for x in data: value = (value << 8) | ord(x)
+    return value
+
+def pack_value(value, bitlength=None):
+    """Encodes an attribute value to its byte string, dispatching on the type of
+    the value in the same way as :meth:Attribute.tobytes"""
+    if isinstance(value, int) or isinstance(value, long): # integer
+        if bitlength is None: raise ValueError('attribute with int value has no bitlength specification: %s' % value)
+        return pack_int(value, bitlength)
+    elif isinstance(value, datetime.timedelta): # duration
+        return struct.pack('>H', value.seconds & 0xffff)
+    elif isinstance(value, Crid): # CRID
+        return str(value)
+    elif isinstance(value, Genre): # genre
+        return pack_genre(value)
+    elif isinstance(value, datetime.datetime): # time
+        return pack_timepoint(value)
+    elif isinstance(value, str): # string
+        return value
+    elif isinstance(value, Bearer):
+        return pack_contentid(value.id)
+    elif isinstance(value, ContentId):
+        return pack_contentid(value)
+    else:
+        raise ValueError('dont know how to encode this type: %s = %s' % (value.__class__.__name__, str(value)))
+
+"""Value decoders and encoders by attribute value type, other than for enums"""
+unpackers = {
+    INT : unpack_int,
+    STRING : lambda data: data,
+    DURATION : lambda data: datetime.timedelta(seconds=unpack_int(data)),
+    CRID : Crid.fromstring,
+    GENRE : unpack_genre,
+    TIMEPOINT : unpack_timepoint,
+    CONTENTID : unpack_contentid
+}
+packers = {
+    STRING : str,
+    DURATION : lambda value: struct.pack('>H', value.seconds & 0xffff),
+    CRID : str,
+    GENRE : pack_genre,
+    TIMEPOINT : pack_timepoint,
+    CONTENTID : lambda value: pack_contentid(value.id if isinstance(value, Bearer) else value)
+}
+
 def int_to_bitarray(i, n):
     return bitarray(tuple((0,1)[i>>j & 1] for j in xrange(n-1,-1,-1)))
 
@@ -1164,17 +2856,13 @@ def bitarray_to_binary(bits):
         rows.append(' '.join(bytes))
     return '\r\n'.join(rows)
       
-def unmarshall(i):
-    """Unmarshalls a PI or SI binary file to its respective :class:Epg or :class:ServiceInfo object
-    
-    :param i: String or File object to read binary from
-    :type i: str, file
-    """    
-    
-    logger.debug('unmarshalling object of type: %s', type(i))
-    
-    b = bitarray()
-    if isinstance(i, file):
+BITARRAY = 'bitarray'
+BUFFER = 'buffer'
+DIRECT = 'direct'
+
+def read_bytes(i):
+    """Reads all the bytes of a file object, or returns a string as-is"""
+    if hasattr(i, 'read'):
         logger.debug('object is a file')
         import StringIO
         io = StringIO.StringIO()
@@ -1182,12 +2870,44 @@ def unmarshall(i):
         while d:
             io.write(d)
             d = i.read()
-        b.frombytes(io.getvalue()) 
+        return io.getvalue()
     else:
-        logger.debug('object is a string of %d bytes', len(str(i)))
-        b.frombytes(i)
+        logger.debug('object is a string of %d bytes', len(i))
+        return i
+
+def unmarshall(i, decoder=DIRECT):
+    """Unmarshalls a PI or SI binary file to its respective :class:Epg or :class:ServiceInfo object
+    
+    :param i: String or File object to read binary from
+    :type i: str, file
+    :param decoder: :const:DIRECT to decode straight to the objects, :const:BUFFER 
+    to parse an element tree from a single memoryview, or :const:BITARRAY to parse
+    the element tree through bitarray slices
+    :type decoder: str
+    """    
+    
+    logger.debug('unmarshalling object of type: %s', type(i))
+    
+    d = read_bytes(i)
         
-    e = Element.frombits(b)
+    if decoder == DIRECT:
+        buf = memoryview(d)
+        tag, start, end = decode_header(buf, 0)
+        if end > len(buf): raise ValueError('end of data is beyond length: %d > %d' % (end, len(buf)))
+        if tag == 0x03:
+            return read_service_information(buf, start, end)
+        elif tag == 0x02:
+            return read_epg(buf, start, end)
+        else:
+            raise Exception('Arrgh! this be neither serviceInformation nor epg - to Davy Jones\' locker with ye!')    
+    elif decoder == BUFFER:
+        e = Element.frombuffer(memoryview(d))
+    elif decoder == BITARRAY:
+        b = bitarray()
+        b.frombytes(str(d) if not isinstance(d, memoryview) else d.tobytes())
+        e = Element.frombits(b)
+    else:
+        raise ValueError('unknown decoder: %s' % decoder)
     logger.debug('unmarshalled element %s', e)
     if e.tag == 0x03:
         si = parse_service_information(e)
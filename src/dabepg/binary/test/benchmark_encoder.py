@@ -0,0 +1,62 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102 
+# 371 (Transportation and Binary Encoding Specification for EPG).
+# 
+# Copyright (C) 2013 Global Radio
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+
+"""Compares the bytearray encoder against the original bitarray rendering of
+the same element trees, for a week of hourly programmes across 40 services.
+
+The programme elements are rendered individually, as the bitarray path cannot
+write the 24-bit extended length needed by the full schedule.
+
+USAGE: benchmark_encoder.py [services] [days]"""
+
+import sys
+import time
+
+from dabepg.binary import build_epg
+from dabepg.test.sample import build_schedule
+
+def timed(f, repeat=3):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        result = f()
+        elapsed = time.time() - start
+        if best is None or elapsed < best: best = elapsed
+    return result, best
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    services = int(args[0]) if len(args) > 0 else 40
+    days = int(args[1]) if len(args) > 1 else 7
+    
+    epg = build_schedule(services=services, days=days)
+    elements = build_epg(epg).children[0].get_children(0x1c)
+    print 'schedule of %d programmes' % len(elements)
+    
+    bits, bitarray_time = timed(lambda: [x.tobytes().tobytes() for x in elements], repeat=1)
+    data, bytearray_time = timed(lambda: [str(x.encode()) for x in elements])
+    
+    assert bits == data, 'encoders produced different output'
+    print 'encoded %d bytes' % sum(len(x) for x in data)
+    print 'bitarray:  %.3fs' % bitarray_time
+    print 'bytearray: %.3fs (%.1fx)' % (bytearray_time, bitarray_time / bytearray_time)
@@ -0,0 +1,63 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Compares measuring the encoded size of a schedule, its programmes and service
+information against encoding them and taking the length, best of a number of
+repeats.
+
+USAGE: benchmark_size.py [services] [days]"""
+
+import sys
+import timeit
+
+from dabepg.binary import marshall, encode_programme, write_epg, encoded_size, programme_size, epg_size
+from dabepg.binary import build_token_table, iter_text
+from dabepg.test.sample import build_schedule, build_serviceinfo
+
+def marshall_tokens(epg, tokens):
+    buf = bytearray()
+    write_epg(buf, epg, tokens)
+    return str(buf)
+
+def best(f, number=5, repeat=7):
+    return min(timeit.repeat(f, number=number, repeat=repeat)) / number
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    services = int(args[0]) if len(args) > 0 else 10
+    days = int(args[1]) if len(args) > 1 else 7
+    
+    epg = build_schedule(services=services, days=days)
+    programmes = epg.schedule.programmes
+    info = build_serviceinfo(services)
+    # the token table is chosen the same way for both, so is left out of the timing
+    tokens = build_token_table(iter_text(epg))[0]
+    
+    for name, encode, measure in [
+        ('schedule', lambda: len(marshall(epg)), lambda: encoded_size(epg)),
+        ('programmes', lambda: [len(encode_programme(p)) for p in programmes], lambda: [programme_size(p) for p in programmes]),
+        ('tokens', lambda: len(marshall_tokens(epg, tokens)), lambda: epg_size(epg, tokens)),
+        ('service info', lambda: len(marshall(info)), lambda: encoded_size(info))]:
+        assert encode() == measure()
+        encoding = best(encode)
+        measuring = best(measure)
+        print '%-12s encoded in %.2fms, measured in %.2fms, %.1fx faster' % (name, encoding * 1000, measuring * 1000, encoding / measuring)
@@ -0,0 +1,74 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102 
+# 371 (Transportation and Binary Encoding Specification for EPG).
+# 
+# Copyright (C) 2013 Global Radio
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+
+"""Compares marshalling through an element tree against writing the model 
+straight to bytes, in time and in peak memory above that of the schedule itself.
+Each run is made in a forked process so that peak memory is measured separately.
+
+USAGE: benchmark_writer.py [services] [days]"""
+
+import os
+import sys
+import time
+import resource
+
+from dabepg.binary import build_epg, write_epg
+from dabepg.test.sample import build_schedule
+
+def tree(epg):
+    return str(build_epg(epg).encode())
+
+def direct(epg):
+    buf = bytearray()
+    write_epg(buf, epg)
+    return str(buf)
+
+def run(f, epg):
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.time()
+        data = f(epg)
+        elapsed = time.time() - start
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        os.write(w, '%d %f %d' % (len(data), elapsed, after - before))
+        os._exit(0)
+    os.close(w)
+    result = os.read(r, 1024)
+    os.waitpid(pid, 0)
+    length, elapsed, memory = result.split()
+    return int(length), float(elapsed), int(memory)
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    services = int(args[0]) if len(args) > 0 else 40
+    days = int(args[1]) if len(args) > 1 else 7
+    
+    epg = build_schedule(services=services, days=days)
+    print 'schedule of %d programmes' % len(epg.schedule.programmes)
+    
+    for name, f in [('tree', tree), ('direct', direct)]:
+        length, elapsed, memory = run(f, epg)
+        print '%-8s %d bytes in %.3fs, peak memory +%dkB' % (name, length, elapsed, memory)
@@ -0,0 +1,103 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102 
+# 371 (Transportation and Binary Encoding Specification for EPG).
+# 
+# Copyright (C) 2013 Global Radio
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+
+import unittest
+
+from dabepg import *
+from dabepg.binary import *
+from dabepg.test.sample import build_schedule, build_serviceinfo, CREATED
+
+def flatten(e):
+    """Returns a comparable representation of an element tree"""
+    return (e.tag,
+            [(a.tag, basestring if isinstance(a.value, basestring) else type(a.value), str(a.value)) for a in e.attributes],
+            [flatten(c) for c in e.children],
+            e.cdata.value if e.cdata is not None else None,
+            getattr(e, 'tokens', None),
+            str(getattr(e, 'default_contentid', None)))
+
+class BufferDecoderTest(unittest.TestCase):
+    
+    def assertSameTree(self, data):
+        bits = bitarray()
+        bits.frombytes(data)
+        self.assertEqual(flatten(Element.frombits(bits)), flatten(Element.frombuffer(data)))
+    
+    def test_schedule(self):
+        self.assertSameTree(marshall(build_schedule(services=2, days=1, hours=4)))
+        
+    def test_serviceinfo(self):
+        self.assertSameTree(marshall(build_serviceinfo()))
+        
+    def test_lazy_cdata(self):
+        data = bytearray(marshall(build_schedule()))
+        e = Element.frombuffer(memoryview(data))
+        programme = e.children[0].get_children(0x1c)[0]
+        cdata = programme.get_children(0x10)[0].cdata
+        self.assertTrue('value' not in cdata.__dict__)
+        self.assertEqual('Breakfas', cdata.value)
+        self.assertTrue('_view' not in cdata.__dict__)
+        
+    def test_token_table(self):
+        data = str(Element(0x1c, children=[Element(0x10, cdata=CData('\x01 Live'))]).encode())
+        data = data[:1] + chr(ord(data[1]) + 8) + '\x04\x06\x01\x04Jo W' + data[2:]
+        e = Element.frombuffer(data)
+        self.assertEqual({1 : 'Jo W'}, e.tokens)
+        self.assertEqual('Jo W Live', apply_token_table(e.children[0].cdata.value, e))
+        
+    def test_unmarshall(self):
+        data = marshall(build_schedule(services=2, days=1, hours=4))
+        epg = unmarshall(data)
+        self.assertEqual(12, len(epg.schedule.programmes))
+        self.assertEqual([str(x) for x in unmarshall(data, decoder=BITARRAY).schedule.programmes],
+                         [str(x) for x in epg.schedule.programmes])
+        
+    def test_document_attributes(self):
+        # every decoder reads the attributes of the schedule and service information
+        schedule = marshall(build_schedule())
+        info = marshall(build_serviceinfo())
+        for decoder in (DIRECT, BUFFER, BITARRAY):
+            decoded = unmarshall(schedule, decoder=decoder).schedule
+            self.assertEqual((CREATED, 2, 'Global Radio'), (decoded.created, decoded.version, decoded.originator))
+            decoded = unmarshall(info, decoder=decoder)
+            self.assertEqual((CREATED, 2, 'BBC', 'BBC'), (decoded.created, decoded.version, decoded.originator, decoded.provider))
+        
+class SchemaTest(unittest.TestCase):
+    
+    def test_enums(self):
+        for (parent_tag, tag), schema in attributes.items():
+            for key, value in schema.enum.items():
+                self.assertEqual(chr(key), pack_attribute(parent_tag, tag, value))
+                self.assertEqual(value, unpack_attribute(parent_tag, tag, chr(key)))
+        self.assertRaises(ValueError, pack_attribute, 0x2b, 0x83, 'logo_unknown')
+        
+    def test_attributes(self):
+        service_id = ContentId(0xe1, 0xce15, 0xc221, 0)
+        self.assertEqual(str(service_id), str(unpack_attribute(0x25, 0x80, pack_attribute(0x25, 0x80, Bearer(service_id)))))
+        self.assertEqual(1280, unpack_attribute(0x28, 0x83, pack_attribute(0x28, 0x83, 1280)))
+        self.assertEqual('\x00\x01\x00', pack_attribute(0x1c, 0x81, 256))
+        self.assertRaises(ValueError, pack_attribute, 0x1c, 0x86, 1)
+        self.assertRaises(ValueError, unpack_attribute, 0x1c, 0x86, '\x01')
+        
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102 
+# 371 (Transportation and Binary Encoding Specification for EPG).
+# 
+# Copyright (C) 2013 Global Radio
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+import unittest
+
+from dabepg import *
+from dabepg.binary import *
+from dabepg.test.sample import build_schedule, build_serviceinfo
+from dateutil.tz import tzutc, tzoffset
+import dabepg.binary
+
+class PackTypeTest(unittest.TestCase):
+    
+    def test_timepoints(self):
+        for timepoint in [datetime.datetime(2010, 7, 30, 12, 0, 0, 0, tzinfo=tzutc()),
+                          datetime.datetime(2010, 7, 30, 3, 30, 11, 0, tzinfo=tzutc()),
+                          datetime.datetime(2010, 7, 30, 12, 0, 0, 0, tzinfo=tzoffset(None, 3600)),
+                          datetime.datetime(2010, 7, 30, 23, 59, 59, 0, tzinfo=tzoffset(None, -5400)),
+                          datetime.datetime(2003, 12, 18, 17, 0, 0, 0)]:
+            self.assertEqual(encode_timepoint(timepoint).tobytes(), pack_timepoint(timepoint))
+            
+    def test_contentids(self):
+        for id in [ContentId.fromstring('e1.ce15.c221.0'), ContentId('e1', 'ce15'), 
+                   ContentId('e1', 'ce15', 'c221', '1', '1f')]:
+            self.assertEqual(encode_contentid(id).tobytes(), pack_contentid(id))
+            self.assertEqual(id, unpack_contentid(pack_contentid(id)))
+        # decoded IDs are not shared, as they may be modified
+        self.assertFalse(unpack_contentid(pack_contentid(id)) is unpack_contentid(pack_contentid(id)))
+            
+    def test_genre(self):
+        genre = Genre('urn:tva:metadata:cs:ContentCS:2002:3.6.9')
+        self.assertEqual(encode_genre(genre).tobytes(), pack_genre(genre))
+        
+    def test_ints(self):
+        for value, bitlength in [(2, 8), (1000, 16), (213456, 24), (5, 4), (0x1ffff, 17)]:
+            bits = int_to_bitarray(value, bitlength)
+            bits.fill()
+            self.assertEqual(bits.tobytes(), pack_int(value, bitlength))
+    
+    def test_extended_lengths(self):
+        self.assertEqual('\x00', encode_length(0))
+        self.assertEqual('\xfd', encode_length(253))
+        self.assertEqual('\xfe\x00\xfe', encode_length(254))
+        self.assertEqual('\xff\x01\x00\x01', encode_length((1<<16) + 1))
+        self.assertRaises(ValueError, encode_length, (1<<24) + 1)
+        data = str(Element(0x1a, cdata=CData('x' * 300)).encode())
+        self.assertEqual('\x1a\xfe\x01\x30\x01\xfe\x01\x2c', data[:8])
+        self.assertEqual(8 + 300, len(data))
+        
+class TimepointCacheTest(unittest.TestCase):
+    
+    timepoints = [datetime.datetime(2010, 7, 30, 12, 0, 0, 0, tzinfo=tzutc()),
+                  datetime.datetime(2010, 7, 30, 3, 30, 11, 0, tzinfo=tzutc()),
+                  datetime.datetime(2010, 7, 30, 12, 0, 0, 0, tzinfo=tzoffset(None, 3600)),
+                  datetime.datetime(2010, 7, 30, 12, 0, 0, 0, tzinfo=tzoffset(None, 7200)),
+                  datetime.datetime(2010, 7, 30, 23, 59, 59, 0, tzinfo=tzoffset(None, -5400)),
+                  datetime.datetime(1969, 12, 31, 6, 0, 0, 0),
+                  datetime.datetime(2003, 12, 18, 17, 0, 0, 0)]
+    
+    def setUp(self):
+        dabepg.binary.packed_timepoints.clear()
+        dabepg.binary.unpacked_timepoints.clear()
+    
+    def test_pack(self):
+        expected = [encode_timepoint(x).tobytes() for x in self.timepoints]
+        self.assertEqual(expected, [pack_timepoint(x) for x in self.timepoints])
+        self.assertEqual(expected, [pack_timepoint(x) for x in self.timepoints])
+        self.assertEqual(len(self.timepoints), len(dabepg.binary.packed_timepoints))
+        
+    def test_unpack(self):
+        data = pack_timepoint(self.timepoints[2])
+        timepoint = unpack_timepoint(data)
+        self.assertEqual(self.timepoints[2], timepoint)
+        self.assertTrue(unpack_timepoint(data) is timepoint)
+        self.assertEqual(None, unpack_timepoint('\x00\x00\x00\x00'))
+        
+    def test_bounded(self):
+        for i in range(timepoint_cache_size + 10):
+            pack_timepoint(datetime.datetime(2010, 7, 30) + datetime.timedelta(minutes=i))
+        self.assertEqual(10, len(dabepg.binary.packed_timepoints))
+        
+class ElementEncodeTest(unittest.TestCase):
+    
+    def test_schedule(self):
+        epg = build_schedule(services=2, days=1)
+        self.assertEqual(str(build_epg(epg).encode()), build_epg(epg).tobytes().tobytes())
+        
+    def test_serviceinfo(self):
+        info = build_serviceinfo()
+        self.assertEqual(str(build_service_information(info).encode()), build_service_information(info).tobytes().tobytes())
+        
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102 
+# 371 (Transportation and Binary Encoding Specification for EPG).
+# 
+# Copyright (C) 2013 Global Radio
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+
+import unittest
+
+from dabepg import *
+from dabepg.binary import *
+from dabepg.test.sample import build_schedule, build_serviceinfo
+
+def describe(programme):
+    """Returns a comparable representation of a decoded programme"""
+    return (programme.shortcrid,
+            [(type(x), x.text) for x in programme.names],
+            [(type(x), x.text) for x in programme.media],
+            [([(x.billed_time, x.billed_duration, x.actual_time, x.actual_duration) for x in l.times], 
+              [str(x) for x in l.bearers]) for l in programme.locations])
+
+class DirectReaderTest(unittest.TestCase):
+    
+    def test_schedule(self):
+        data = marshall(build_schedule(services=2, days=1, hours=4))
+        epg = unmarshall(data, decoder=DIRECT)
+        self.assertEqual(12, len(epg.schedule.programmes))
+        self.assertEqual([describe(x) for x in unmarshall(data, decoder=BUFFER).schedule.programmes],
+                         [describe(x) for x in epg.schedule.programmes])
+        
+    def test_iter_programmes(self):
+        data = marshall(build_schedule(services=2, days=1, hours=4))
+        programmes = iter_programmes(data)
+        self.assertEqual(1, programmes.next().shortcrid)
+        self.assertEqual(11, len(list(programmes)))
+        
+    def test_serviceinfo(self):
+        data = marshall(build_serviceinfo())
+        info = unmarshall(data, decoder=DIRECT)
+        expected = unmarshall(data, decoder=BUFFER)
+        self.assertEqual(str(expected.ensembles[0].id), str(info.ensembles[0].id))
+        self.assertEqual([x.text for x in expected.ensembles[0].names], [x.text for x in info.ensembles[0].names])
+        self.assertEqual([(str(x.ids[0]), [y.text for y in x.names]) for x in expected.ensembles[0].services],
+                         [(str(x.ids[0]), [y.text for y in x.names]) for x in info.ensembles[0].services])
+        
+    def test_default_contentid(self):
+        programme = Element(0x1c, [Attribute(0x81, 1, 24)], [Element(0x19, children=[Element(0x2c, [Attribute(0x80, datetime.datetime(2013, 7, 29, tzinfo=dateutil.tz.tzutc())), Attribute(0x81, datetime.timedelta(hours=1), 16)])])])
+        data = str(programme.encode())
+        contentid = ContentId(0xe1, 0xce15, 0xc221, 0)
+        packed = pack_contentid(contentid)
+        data = data[:1] + chr(ord(data[1]) + 2 + len(packed)) + '\x05' + chr(len(packed)) + packed + data[2:]
+        self.assertEqual(str(contentid), str(read_programme(memoryview(data), 2, len(data)).locations[0].bearers[0]))
+        
+    def test_token_table(self):
+        data = str(Element(0x1c, [Attribute(0x81, 1, 24)], [Element(0x11, cdata=CData("\x01 Live"))]).encode())
+        data = data[:1] + chr(ord(data[1]) + 8) + '\x04\x06\x01\x04Jo W' + data[2:]
+        self.assertEqual('Jo W Live', read_programme(memoryview(data), 2, len(data)).names[0].text)
+        
+    def test_truncated(self):
+        data = marshall(build_schedule())
+        self.assertRaises(ValueError, unmarshall, data[:-4], decoder=DIRECT)
+        
+    def test_corrupt(self):
+        for data in ['', '\x02', '\x02\xfe\x00', '\x02\xff\x00\x01', '\x02\x03\x01\x00']:
+            self.assertRaises(ValueError, decode_header, data, 0)
+            for decoder in (DIRECT, BUFFER):
+                self.assertRaises(ValueError, unmarshall, data, decoder=decoder)
+        self.assertRaises(ValueError, unpack_enum, 0x1c, 0x84, '\x07')
+        self.assertRaises(ValueError, unpack_tokentable, '\x01\x02ab\x02')
+        
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,241 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102 
+# 371 (Transportation and Binary Encoding Specification for EPG).
+# 
+# Copyright (C) 2013 Global Radio
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+
+import unittest
+import datetime
+from dateutil.tz import tzoffset
+
+from dabepg import *
+from dabepg.binary import *
+from dabepg.test.sample import build_schedule, build_serviceinfo, service_id
+
+class WriterTest(unittest.TestCase):
+    
+    def test_schedule(self):
+        epg = build_schedule(services=3, days=2)
+        programme = epg.schedule.programmes[0]
+        programme.memberships.append(Membership(1000, crid='crid://www.bbc.co.uk/WorldwideGroup', index=3))
+        programme.media.append(LongDescription('x' * 1000))
+        programme.media.append(Multimedia('http://www.example.com/logo.png', Multimedia.LOGO_UNRESTRICTED, 'image/png', 240, 320))
+        self.assertEqual(str(build_epg(epg).encode()), marshall(epg))
+        
+    def test_serviceinfo(self):
+        info = build_serviceinfo()
+        self.assertEqual(str(build_service_information(info).encode()), marshall(info))
+        
+    def test_programme(self):
+        programme = build_schedule().schedule.programmes[0]
+        buf = bytearray()
+        write_programme(buf, programme)
+        self.assertEqual(str(build_programme(programme).encode()), str(buf))
+        
+    def test_event_broadcast(self):
+        epg = build_schedule()
+        events = epg.schedule.programmes[0].events
+        events.append(ProgrammeEvent(2, onair=False))
+        self.assertEqual(str(build_epg(epg).encode()), marshall(epg))
+        self.assertEqual([[0x81, 0x83], [0x81, 0x84]], [[x.tag for x in build_programme_event(event).attributes] for event in events])
+
+    def test_attribute_widths(self):
+        epg = build_schedule()
+        programme = epg.schedule.programmes[0]
+        programme.bitrate = 127.5
+        programme.media.append(Multimedia('http://www.example.com/logo.png', Multimedia.LOGO_COLOUR_SQUARE))
+        self.assertEqual(str(build_epg(epg).encode()), marshall(epg))
+        def walk(element):
+            for attribute in element.attributes:
+                self.assertEqual(attributes[(element.tag, attribute.tag)].bitlength, attribute.bitlength)
+            for child in element.children: walk(child)
+        walk(build_epg(epg))
+        self.assertRaises(ValueError, build_attribute, 0x2e, 0x84, 'on-air?')
+        
+class ProgrammeCacheTest(unittest.TestCase):
+    
+    def test_remarshall(self):
+        epg = build_schedule(services=2)
+        cache = ProgrammeCache()
+        self.assertEqual(marshall(epg), marshall(epg, cache=cache))
+        epg.schedule.programmes[3].names[0].text = 'Changed'
+        epg.schedule.programmes.pop()
+        self.assertEqual(marshall(epg), marshall(epg, cache=cache))
+        self.assertEqual((46, 49), (cache.hits, cache.misses))
+        
+    def test_edit_time(self):
+        epg = build_schedule(services=2)
+        cache = ProgrammeCache()
+        before = marshall(epg, cache=cache)
+        time = epg.schedule.programmes[-1].locations[0].times[0]
+        time.billed_time += datetime.timedelta(days=3)
+        data = marshall(epg, cache=cache)
+        self.assertEqual(marshall(epg), data)
+        self.assertEqual(unmarshall(before).schedule.get_scope().end + datetime.timedelta(days=3), 
+                         unmarshall(data).schedule.get_scope().end)
+        
+    def test_token_table(self):
+        epg = build_schedule(services=2)
+        cache = ProgrammeCache()
+        self.assertEqual(marshall(epg, True, True), marshall(epg, True, True, cache))
+        self.assertEqual(marshall(epg, True, True), marshall(epg, True, True, cache))
+        self.assertEqual((48, 48), (cache.hits, cache.misses))
+        
+        # a different token table encodes every programme afresh
+        self.assertEqual(marshall(epg), marshall(epg, cache=cache))
+        self.assertEqual((48, 96), (cache.hits, cache.misses))
+        
+class TokenTableTest(unittest.TestCase):
+    
+    def test_schedule(self):
+        epg = build_schedule(services=2, days=1)
+        plain = marshall(epg)
+        data = marshall(epg, token_table=True)
+        tokens, saved = build_token_table(iter_text(epg))
+        self.assertEqual(16, len(tokens))
+        self.assertTrue(len(plain) - len(data) >= saved > 0)
+        expected = unmarshall(plain)
+        for decoder in (DIRECT, BUFFER):
+            self.assertEqual([[x.text for x in p.names + p.media] for p in expected.schedule.programmes],
+                             [[x.text for x in p.names + p.media] for p in unmarshall(data, decoder=decoder).schedule.programmes])
+            
+    def test_serviceinfo(self):
+        info = build_serviceinfo()
+        data = marshall(info, token_table=True)
+        self.assertTrue(len(data) < len(marshall(info)))
+        self.assertEqual(['BBC Radio 1', 'BBC Radio 2'], [x.names[1].text for x in unmarshall(data).ensembles[0].services[:2]])
+        
+    def test_choice(self):
+        tokens, saved = build_token_table(['Live from the studio with Jo'] * 3 + ['Nothing repeated here'])
+        self.assertEqual([('Live from the studio with Jo', 0x01)], tokens)
+        self.assertEqual(3 * 27 - 30 - 2, saved)
+        self.assertEqual(([], 0), build_token_table(['a b', 'c d']))
+        
+    def test_used_slots(self):
+        tokens, saved = build_token_table(['\x01 Live from the studio'] * 3)
+        self.assertEqual(0x02, tokens[0][1])
+        
+class DefaultsTest(unittest.TestCase):
+    
+    def test_schedule(self):
+        epg = build_schedule(days=2)
+        for programme in epg.schedule.programmes: programme.names[0].locale = ('en_GB', 'UTF-8')
+        plain = marshall(epg)
+        data = marshall(epg, defaults=True)
+        self.assertEqual(str(service_id(0)), str(find_default_contentid(epg)))
+        self.assertEqual('en', find_default_language(epg))
+        size = len(pack_contentid(service_id(0)))
+        self.assertEqual(len(plain) - 48 * (size + 4) + (size + 2) + 4, len(data))
+        e = Element.frombuffer(data)
+        self.assertEqual('en', e.default_language)
+        self.assertEqual(str(service_id(0)), str(e.default_contentid))
+        expected = [[str(x) for l in p.locations for x in l.bearers] for p in unmarshall(plain).schedule.programmes]
+        for decoder in (DIRECT, BUFFER):
+            self.assertEqual(expected, [[str(x) for l in p.locations for x in l.bearers] for p in unmarshall(data, decoder=decoder).schedule.programmes])
+        
+    def test_other_bearers(self):
+        epg = build_schedule(services=2, hours=8)
+        epg.schedule.programmes[0].locations[0].bearers.append(Bearer(service_id(1)))
+        epg.schedule.programmes[3].locations[0].bearers = [Bearer(service_id(0))]
+        self.assertEqual(str(service_id(0)), str(find_default_contentid(epg)))
+        self.assertEqual([[str(x) for x in l.bearers] for p in epg.schedule.programmes for l in p.locations],
+                         [[str(x) for x in l.bearers] for p in unmarshall(marshall(epg, defaults=True)).schedule.programmes for l in p.locations])
+        
+    def test_language(self):
+        epg = build_schedule()
+        self.assertEqual(None, find_default_language(epg))
+        epg.schedule.programmes[0].names[0].locale = ('de_DE', 'UTF-8')
+        epg.schedule.programmes[1].names[1].locale = ('de_AT', 'UTF-8')
+        self.assertEqual('de', find_default_language(epg))
+        
+    def test_unshared(self):
+        epg = build_schedule(services=2, days=0)
+        self.assertEqual(None, find_default_contentid(epg))
+        self.assertEqual(marshall(epg), marshall(epg, defaults=True))
+        
+class SizeTest(unittest.TestCase):
+    
+    def test_schedule(self):
+        epg = build_schedule(services=3, days=2)
+        for token_table, defaults in [(False, False), (True, False), (False, True), (True, True)]:
+            self.assertEqual(len(marshall(epg, token_table, defaults)), encoded_size(epg, token_table, defaults))
+        self.assertEqual(len(marshall(epg)), encoded_size(epg.schedule))
+        
+    def test_serviceinfo(self):
+        info = build_serviceinfo()
+        info.ensembles[0].services[0].ids.append(ContentId(0xe1, 0xce15, 0xc479, 0, 3))
+        for token_table, defaults in [(False, False), (True, True)]:
+            self.assertEqual(len(marshall(info, token_table, defaults)), encoded_size(info, token_table, defaults))
+            
+    def test_programme(self):
+        programme = build_schedule().schedule.programmes[0]
+        programme.bitrate = 128
+        programme.onair = False
+        programme.memberships.append(Membership(1000, crid='crid://www.bbc.co.uk/WorldwideGroup', index=3))
+        programme.media.append(Multimedia('http://www.example.com/logo.png', Multimedia.LOGO_UNRESTRICTED, 'image/png', 240, 320))
+        programme.links.append(Link('http://www.example.com', 'text/html', expiry=datetime.datetime(2013, 7, 29, 10, 30, 15)))
+        tz = tzoffset(None, 3600)
+        programme.locations.append(Location([Time(datetime.datetime(2013, 7, 29, 10, tzinfo=tz), datetime.timedelta(hours=1),
+                                                  datetime.datetime(2013, 7, 29, 10, 0, 5, tzinfo=tz), datetime.timedelta(minutes=59))],
+                                            [ContentId(0xe1, 0xce15), ContentId(0xe1, 0xce15, 0xc221, 0, 4)]))
+        programme.events[0].locations[0].times[0].actual_offset = datetime.timedelta(minutes=46)
+        programme.events[0].onair = False
+        programme.events[0].version = 2
+        self.assertEqual(len(encode_programme(programme)), encoded_size(programme))
+        
+    def test_length_prefixes(self):
+        # the lengths of each of the elements around a text cross the single byte limit
+        programme = Programme(1)
+        description = LongDescription('')
+        programme.media.append(description)
+        for length in range(230, 270):
+            description.text = 'x' * length
+            self.assertEqual(len(encode_programme(programme)), programme_size(programme))
+        # and the three byte limit
+        programme.media.extend(LongDescription('x' * 1200) for i in range(60))
+        data = encode_programme(programme)
+        self.assertEqual('\xff', data[1])
+        self.assertEqual(len(data), programme_size(programme))
+        
+    def test_element_size(self):
+        self.assertEqual(255, element_size(253))
+        self.assertEqual(258, element_size(254))
+        self.assertEqual(65540, element_size(65536))
+        self.assertEqual(65542, element_size(65537))
+        self.assertRaises(ValueError, element_size, (1 << 24) + 1)
+        
+    def test_attribute_sizes(self):
+        # each fixed width attribute is measured as it is packed
+        for (parent_tag, tag), schema in attributes.items():
+            if schema.bitlength is None: continue
+            if schema.type == ENUM: value = schema.enum.values()[0]
+            elif schema.type == DURATION: value = datetime.timedelta(minutes=30)
+            else: value = 1
+            self.assertEqual(len(pack_attribute(parent_tag, tag, value)) + 2, attribute_sizes[(parent_tag, tag)])
+            
+    def test_unallocated(self):
+        programme = Programme(1)
+        programme.names.append(ShortName('Name'))
+        self.assertEqual(len(encode_programme(programme)), programme_size(programme))
+        self.assertEqual(None, programme._memberships)
+        self.assertEqual(None, programme._events)
+        
+if __name__ == "__main__":
+    unittest.main()
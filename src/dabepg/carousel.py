@@ -0,0 +1,227 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Planning and scheduling of the carousel of EPG objects in a packet mode 
+sub-channel"""
+
+import datetime
+import heapq
+
+from dateutil.tz import tzlocal
+
+from dabepg.transport import encode_header, DEFAULT_SEGMENT_SIZE, MAX_SEGMENT_SIZE
+
+PACKET_SIZES = (24, 48, 72, 96)
+
+# packet header and CRC
+PACKET_OVERHEAD = 5
+
+# data group header, segment field, user access field and segmentation header
+DATAGROUP_OVERHEAD = 9
+
+GOLDEN_RATIO = 0.6180339887498949
+
+HALF_LIFE = datetime.timedelta(days=1)
+
+class CarouselObject:
+    """Object in a carousel
+    
+    :param obj: Object to carry
+    :type obj: MotObject
+    :param priority: Number of times the object is carried in each cycle
+    :type priority: int
+    :param service: Service the object belongs to, if any, for the bandwidth to 
+    be accounted to
+    :param scope: Scope of the schedule carried by the object, if any
+    :type scope: Scope
+    """
+    
+    def __init__(self, obj, priority=1, service=None, scope=None):
+        if priority < 1: raise ValueError('priority must be at least 1: %d' % priority)
+        self.obj = obj
+        self.priority = priority
+        self.service = service
+        self.scope = scope
+        
+    def __repr__(self):
+        return '<CarouselObject: %s x%d>' % (self.obj.name, self.priority)
+
+def packets(length, segment_size=DEFAULT_SEGMENT_SIZE, crc=True, packet_size=96):
+    """Returns the number of packets taken by data groups carrying data of the given
+    length in segments of the segment size"""
+    
+    payload = packet_size - PACKET_OVERHEAD
+    overhead = DATAGROUP_OVERHEAD + (2 if crc else 0)
+    full, rest = divmod(length, segment_size)
+    count = full * (-(-(segment_size + overhead) // payload))
+    if rest or not full: count += -(-(rest + overhead) // payload)
+    return count
+
+def air_size(obj, segment_size=DEFAULT_SEGMENT_SIZE, crc=True, packet_size=96):
+    """Returns the number of bytes of packets taken by an object in header mode,
+    its header followed by its body"""
+    return packet_size * (packets(len(encode_header(obj)), segment_size, crc, packet_size) + 
+                          packets(len(obj.body), segment_size, crc, packet_size))
+
+class CarouselPlan:
+    """Simulated cycle of a carousel
+    
+    :param cycle: Length of a cycle, in seconds
+    :type cycle: float
+    :param order: Start time and carousel object of each transmission in a cycle
+    :type order: list of tuple
+    :param waits: Worst time to receive each carousel object from when a receiver
+    starts listening, in seconds
+    :type waits: dict
+    :param bandwidth: Bit rate taken by each service, in kbit/s, objects with no 
+    service falling under None
+    :type bandwidth: dict
+    """
+    
+    def __init__(self, cycle, order, waits, bandwidth):
+        self.cycle = cycle
+        self.order = order
+        self.waits = waits
+        self.bandwidth = bandwidth
+        
+    def __repr__(self):
+        return '<CarouselPlan: %d transmissions in a %.1fs cycle>' % (len(self.order), self.cycle)
+
+def simulate(objects, bitrate, segment_size=DEFAULT_SEGMENT_SIZE, crc=True, packet_size=96):
+    """Simulates a carousel carrying objects in header mode at the bit rate of a 
+    packet mode sub-channel, spreading the transmissions of each object evenly 
+    over the cycle
+    
+    :param objects: Objects to carry
+    :type objects: list of CarouselObject
+    :param bitrate: Bit rate of the sub-channel, in kbit/s
+    :type bitrate: int
+    :param segment_size: Size of the MOT segments
+    :type segment_size: int
+    :param crc: Whether the data groups carry a CRC
+    :type crc: bool
+    :param packet_size: Size of the packets, one of 24, 48, 72 or 96 bytes
+    :type packet_size: int
+    :returns: :class:CarouselPlan of the cycle
+    """
+    
+    if bitrate <= 0: raise ValueError('bit rate must be positive: %s' % bitrate)
+    if packet_size not in PACKET_SIZES: raise ValueError('packet size must be one of %s: %d' % (PACKET_SIZES, packet_size))
+    if not 1 <= segment_size <= MAX_SEGMENT_SIZE: raise ValueError('segment size must be from 1 to %d: %d' % (MAX_SEGMENT_SIZE, segment_size))
+    
+    rate = bitrate * 1000.0 / 8 # bytes per second
+    durations = [air_size(o.obj, segment_size, crc, packet_size) / rate for o in objects]
+    
+    # place the k-th of n transmissions of each object at (k + phase) / n of the 
+    # way through the cycle, and send them in that order. The phases of the 
+    # objects step on by the golden ratio, so that objects of the same priority 
+    # spread out over the cycle rather than bunching together.
+    slots = []
+    for i, o in enumerate(objects):
+        n = o.priority
+        phase = (i * GOLDEN_RATIO) % 1.0
+        slots.extend(((k + phase) / n, i) for k in range(n))
+    slots.sort()
+    
+    order = []
+    starts = [[] for o in objects]
+    time = 0.0
+    for position, i in slots:
+        order.append((time, objects[i]))
+        starts[i].append(time)
+        time += durations[i]
+    cycle = time
+    
+    # a receiver that starts listening just after a transmission has started 
+    # waits for the next to start and then to finish
+    waits = {}
+    bandwidth = {}
+    for i, o in enumerate(objects):
+        times = starts[i]
+        gap = times[0] + cycle - times[-1]
+        for previous, next in zip(times, times[1:]):
+            if next - previous > gap: gap = next - previous
+        waits[o] = gap + durations[i]
+        used = durations[i] * len(times) / cycle * bitrate if cycle else 0.0
+        bandwidth[o.service] = bandwidth.get(o.service, 0.0) + used
+        
+    return CarouselPlan(cycle, order, waits, bandwidth)
+
+def scope_weight(scope, now=None, halflife=HALF_LIFE):
+    """Returns the weight of a scope by how near it is to now, 1 for a scope covering
+    now and halving for each half-life that it lies before or after now"""
+    
+    if scope is None: return 1.0
+    if now is None: 
+        now = datetime.datetime.now(tzlocal()) if scope.start.tzinfo is not None else datetime.datetime.now()
+    if now < scope.start: distance = scope.start - now
+    elif now > scope.end: distance = now - scope.end
+    else: return 1.0
+    return 0.5 ** (distance.total_seconds() / halflife.total_seconds())
+
+def object_weight(o, now=None, popularity=None, halflife=HALF_LIFE):
+    """Returns the weight of a carousel object, the product of its priority, the 
+    weight of its scope and the popularity of its service. An object with no 
+    service takes the greatest popularity of the services in its scope."""
+    
+    weight = o.priority * scope_weight(o.scope, now, halflife)
+    if popularity:
+        if o.service is not None: 
+            weight *= popularity.get(o.service, 1.0)
+        elif o.scope is not None and o.scope.services:
+            weight *= max(popularity.get(service, 1.0) for service in o.scope.services)
+    return weight
+
+def interleave(objects, now=None, popularity=None, halflife=HALF_LIFE):
+    """Yields carousel objects in the order to transmit them, without end, each as
+    often as its weight, interleaving them evenly. Each object costs O(log n) time.
+    
+    The weights are found once, when the first object is taken, so the order 
+    should be started afresh as time moves on.
+    
+    :param objects: Objects to transmit
+    :type objects: list of CarouselObject
+    :param now: Time to weigh the scopes of the objects against, defaulting to
+    the current time
+    :type now: datetime
+    :param popularity: Weight of each service, defaulting to 1, where objects of 
+    a service with no weight are not transmitted
+    :type popularity: dict
+    :param halflife: Time away from now over which the weight of a scope halves
+    :type halflife: timedelta
+    """
+    
+    # each object is due again a stride of one over its weight after it was
+    # last due, starting part way through its first stride to spread them out
+    heap = []
+    for i, o in enumerate(objects):
+        weight = object_weight(o, now, popularity, halflife)
+        if weight <= 0: continue
+        stride = 1.0 / weight
+        heap.append((stride * ((i * GOLDEN_RATIO) % 1.0), i, stride))
+    if not heap: return
+    heapq.heapify(heap)
+    
+    while True:
+        due, i, stride = heap[0]
+        yield objects[i]
+        heapq.heapreplace(heap, (due + stride, i, stride))
@@ -0,0 +1,128 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Differences between versions of a schedule, from which the programme versions
+are maintained and delta documents carrying only the changes are built"""
+
+from dabepg import Epg, Schedule, Programme, structural_key, slot_names
+
+content_names = [name for name in slot_names(Programme) if name != 'version']
+
+def content_key(programme):
+    """Returns the structural key of a programme, leaving out its version"""
+    return structural_key([getattr(programme, name) for name in content_names])
+
+class ScheduleDiff:
+    """Differences between an old and a new version of a schedule
+    
+    :param added: Programmes only in the new schedule
+    :type added: list
+    :param removed: Programmes only in the old schedule
+    :type removed: list
+    :param changed: Old and new programme of each pair that differ
+    :type changed: list of tuple
+    :param unchanged: Old and new programme of each pair that are the same
+    :type unchanged: list of tuple
+    """
+    
+    def __init__(self, old, new, added, removed, changed, unchanged):
+        self.old = old
+        self.new = new
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.unchanged = unchanged
+        
+    def __nonzero__(self):
+        return bool(self.added or self.removed or self.changed)
+        
+    def bump_versions(self):
+        """Sets the versions of the new schedule and its programmes on from the old,
+        moving on only those of changed programmes, and of the schedule if anything
+        has changed"""
+        
+        for old, new in self.changed:
+            if new.version <= old.version: new.version = old.version + 1
+        for old, new in self.unchanged:
+            new.version = old.version
+        if self: 
+            if self.new.version <= self.old.version: self.new.version = self.old.version + 1
+        else:
+            self.new.version = self.old.version
+            
+    def delta(self):
+        """Returns an :class:Epg of the new schedule carrying only its added and 
+        changed programmes. Removed programmes cannot be carried, and are left to 
+        be dropped by the receiver."""
+        
+        schedule = Schedule(self.new.created, self.new.version, self.new.originator)
+        schedule.programmes.extend(self.added)
+        schedule.programmes.extend(new for old, new in self.changed)
+        return Epg(schedule)
+    
+    def __repr__(self):
+        return '<ScheduleDiff: %d added, %d removed, %d changed, %d unchanged>' % \
+            (len(self.added), len(self.removed), len(self.changed), len(self.unchanged))
+
+def diff(old, new):
+    """Compares two versions of a schedule, matching their programmes by CRID where
+    both have one and by short CRID otherwise, in time linear in the number of 
+    programmes
+    
+    :param old: Schedule as last broadcast
+    :type old: Schedule
+    :param new: Schedule to broadcast
+    :type new: Schedule
+    :returns: :class:ScheduleDiff of the programmes
+    """
+    
+    by_crid = {}
+    by_shortcrid = {}
+    for programme in old.programmes:
+        if programme.crid is not None: by_crid[str(programme.crid)] = programme
+        by_shortcrid[programme.shortcrid] = programme
+    
+    added = []
+    changed = []
+    unchanged = []
+    matched = set()
+    for programme in new.programmes:
+        match = None
+        if programme.crid is not None: 
+            match = by_crid.get(str(programme.crid))
+        if match is None:
+            match = by_shortcrid.get(programme.shortcrid)
+            # a programme with another CRID is another programme
+            if match is not None and programme.crid is not None and match.crid is not None and \
+               str(match.crid) != str(programme.crid):
+                match = None
+        if match is None or id(match) in matched:
+            added.append(programme)
+            continue
+        matched.add(id(match))
+        if content_key(match) == content_key(programme):
+            unchanged.append((match, programme))
+        else:
+            changed.append((match, programme))
+            
+    removed = [programme for programme in old.programmes if id(programme) not in matched]
+    return ScheduleDiff(old, new, added, removed, changed, unchanged)
@@ -0,0 +1,180 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Splitting of a schedule into several binary PI objects, each within a budget
+of bytes"""
+
+import datetime
+
+from dabepg import Epg, Schedule, Time, Bearer, ContentId
+from dabepg.binary import programme_size, timepoint_size, contentid_size, element_size
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+class Piece:
+    """Programmes of a schedule bound for the same object, with what is needed to 
+    find the exact length of the object: the total length of the programmes and 
+    the extent of their scope"""
+    
+    def __init__(self):
+        self.programmes = []
+        self.size = 0
+        self.start = None
+        self.end = None
+        self.services = {}
+        
+    def add(self, programme, size):
+        self.programmes.append(programme)
+        self.size += size
+        # as aggregated by ScopeAggregate
+        for location in programme.locations:
+            for time in location.times:
+                if not isinstance(time, Time): continue
+                if self.start is None or self.start > time.billed_time: self.start = time.billed_time
+                end = time.billed_time + time.billed_duration
+                if self.end is None or self.end < end: self.end = end
+            for bearer in location.bearers:
+                if isinstance(bearer, Bearer): bearer = bearer.id
+                elif not isinstance(bearer, ContentId): continue
+                if bearer not in self.services: self.services[bearer] = element_size(contentid_size(bearer))
+                
+    def merge(self, other):
+        self.programmes.extend(other.programmes)
+        self.size += other.size
+        if other.start is not None and (self.start is None or self.start > other.start): self.start = other.start
+        if other.end is not None and (self.end is None or self.end < other.end): self.end = other.end
+        self.services.update(other.services)
+        
+    def document_size(self, header, other=None):
+        """Returns the length of the binary object carrying the programmes, with 
+        those of another piece if given
+        
+        :param header: Length of the attributes of the schedule
+        :type header: int
+        """
+        
+        size, start, end, services = self.size, self.start, self.end, self.services
+        if other is not None:
+            size += other.size
+            if other.start is not None and (start is None or start > other.start): start = other.start
+            if other.end is not None and (end is None or end < other.end): end = other.end
+            services_size = sum(services.values()) + sum(x for id, x in other.services.items() if id not in services)
+        else:
+            services_size = sum(services.values())
+        size += header
+        # there is no scope without a time
+        if start is not None and end is not None: 
+            size += element_size(timepoint_size(start) + timepoint_size(end) + services_size)
+        return element_size(element_size(size))
+    
+def programme_start(programme):
+    """Returns the earliest time of a programme on the wall clock, or None"""
+    start = None
+    for location in programme.locations:
+        for time in location.times:
+            if isinstance(time, Time):
+                wallclock = time.billed_time.replace(tzinfo=None)
+                if start is None or start > wallclock: start = wallclock
+    return start
+
+def programme_key(programme, period):
+    """Returns the service and time period a programme falls in, being those of 
+    its first bearer and its earliest time on the wall clock"""
+    
+    service = None
+    for location in programme.locations:
+        if location.bearers:
+            bearer = location.bearers[0]
+            service = bearer.id if isinstance(bearer, Bearer) else bearer
+            break
+    start = programme_start(programme)
+    if start is None: return service, None
+    return service, int((start - EPOCH).total_seconds() // period.total_seconds())
+
+def split(schedule, budget, period=datetime.timedelta(days=1)):
+    """Splits a schedule into as few binary PI objects as it can, each no longer 
+    than the budget when marshalled without defaults. A token table only makes an
+    object shorter.
+    
+    The programmes are grouped by service and by period of time, a group too 
+    long for one object being cut into runs of consecutive programmes, and the 
+    groups are packed into objects first fit in decreasing order of length. 
+    Each object keeps the order of the programmes in the schedule, and its scope 
+    is that of its programmes.
+    
+    :param schedule: Schedule to split
+    :type schedule: Schedule
+    :param budget: Most bytes an object may take
+    :type budget: int
+    :param period: Length of the periods of time to group programmes by
+    :type period: timedelta
+    :returns: list of :class:Epg, in order of their first programme in the schedule
+    """
+    
+    header = 0
+    if schedule.version is not None and schedule.version > 1: header += 4
+    header += timepoint_size(schedule.created)
+    if schedule.originator is not None: header += element_size(len(schedule.originator))
+    
+    # group by service and time period, keeping the order of the schedule
+    order = {}
+    groups = {}
+    for i, programme in enumerate(schedule.programmes):
+        order[id(programme)] = i
+        groups.setdefault(programme_key(programme, period), []).append(programme)
+        
+    # cut the groups too long for an object
+    pieces = []
+    for programmes in groups.values():
+        programmes.sort(key=lambda x: programme_start(x))
+        piece = Piece()
+        for programme in programmes:
+            size = programme_size(programme)
+            single = Piece()
+            single.add(programme, size)
+            if single.document_size(header) > budget:
+                raise ValueError('programme %d is too long for the budget: %d > %d bytes' % 
+                                 (programme.shortcrid, single.document_size(header), budget))
+            if piece.programmes and piece.document_size(header, single) > budget:
+                pieces.append(piece)
+                piece = Piece()
+            piece.merge(single)
+        if piece.programmes: pieces.append(piece)
+    
+    # pack them first fit decreasing
+    pieces.sort(key=lambda x: x.size, reverse=True)
+    bins = []
+    for piece in pieces:
+        for candidate in bins:
+            if candidate.document_size(header, piece) <= budget:
+                candidate.merge(piece)
+                break
+        else: bins.append(piece)
+        
+    result = []
+    for piece in bins:
+        piece.programmes.sort(key=lambda x: order[id(x)])
+        split_schedule = Schedule(schedule.created, schedule.version, schedule.originator)
+        split_schedule.programmes.extend(piece.programmes)
+        result.append(Epg(split_schedule))
+    result.sort(key=lambda x: order[id(x.schedule.programmes[0])])
+    return result
@@ -0,0 +1,138 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+import unittest
+import datetime
+import itertools
+
+from dabepg import binary, Scope
+from dabepg.carousel import *
+from dabepg.transport import MotObject, encode_datagroups
+from dabepg.test.sample import build_schedule, build_serviceinfo
+
+class SimulateTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.si = MotObject(1, 'SI.EHB', binary.marshall(build_serviceinfo()))
+        self.pi = MotObject(2, 'PI.EHB', binary.marshall(build_schedule(services=2)))
+        
+    def test_air_size(self):
+        for segment_size, crc, packet_size in ((1024, True, 96), (100, False, 24), (8180, True, 48)):
+            datagroups = encode_datagroups([self.pi], segment_size, crc=crc)
+            payload = packet_size - 5
+            expected = sum(-(-len(d) // payload) for d in datagroups) * packet_size
+            self.assertEqual(expected, air_size(self.pi, segment_size, crc, packet_size))
+            
+    def test_cycle(self):
+        si = CarouselObject(self.si, priority=3)
+        pi = CarouselObject(self.pi, service='radio1')
+        plan = simulate([si, pi], 16)
+        size = 3 * air_size(self.si) + air_size(self.pi)
+        self.assertAlmostEqual(size * 8 / 16000.0, plan.cycle)
+        self.assertEqual(4, len(plan.order))
+        self.assertEqual(0.0, plan.order[0][0])
+        self.assertEqual([si, si, pi, si], [o for t, o in plan.order])
+        self.assertAlmostEqual(16, sum(plan.bandwidth.values()))
+        self.assertAlmostEqual(air_size(self.pi) * 8 / plan.cycle / 1000, plan.bandwidth['radio1'])
+        
+    def test_waits(self):
+        si = CarouselObject(self.si, priority=3)
+        pi = CarouselObject(self.pi)
+        plan = simulate([si, pi], 16)
+        # an object carried once a cycle may just have been missed
+        self.assertAlmostEqual(plan.cycle + air_size(self.pi) * 8 / 16000.0, plan.waits[pi])
+        self.assertTrue(plan.waits[si] < plan.waits[pi])
+        # the longest gap between transmissions of the service information spans
+        # the programme information
+        self.assertAlmostEqual((2 * air_size(self.si) + air_size(self.pi)) * 8 / 16000.0, plan.waits[si])
+        
+    def test_spread(self):
+        # transmissions of the one object are not bunched up by the many of the same priority
+        objects = [CarouselObject(MotObject(i, 'PI.EHB', self.pi.body)) for i in range(1, 100)]
+        si = CarouselObject(self.si, priority=4)
+        plan = simulate(objects + [si], 16)
+        self.assertTrue(plan.waits[si] < plan.cycle * 0.3)
+        
+    def test_invalid(self):
+        objects = [CarouselObject(self.si)]
+        self.assertRaises(ValueError, simulate, objects, 0)
+        self.assertRaises(ValueError, simulate, objects, 16, packet_size=50)
+        self.assertRaises(ValueError, CarouselObject, self.si, 0)
+
+        
+class InterleaveTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.now = datetime.datetime(2013, 7, 29, 12)
+        self.obj = MotObject(1, 'PI.EHB', binary.marshall(build_schedule()))
+        
+    def scope(self, days, services=[]):
+        """Returns an hour long scope the number of days after now, or before if negative"""
+        edge = self.now + datetime.timedelta(days=days)
+        hour = datetime.timedelta(hours=1)
+        if days < 0: return Scope(edge - hour, edge, services)
+        return Scope(edge, edge + hour, services)
+    
+    def take(self, objects, count, **kwargs):
+        return list(itertools.islice(interleave(objects, self.now, **kwargs), count))
+        
+    def test_scope_weight(self):
+        self.assertEqual(1.0, scope_weight(None))
+        self.assertEqual(1.0, scope_weight(self.scope(0), self.now))
+        self.assertEqual(1.0, scope_weight(Scope(self.now - datetime.timedelta(hours=1), self.now), self.now))
+        self.assertAlmostEqual(0.5, scope_weight(self.scope(-1), self.now, datetime.timedelta(days=1)))
+        self.assertAlmostEqual(0.25, scope_weight(self.scope(2), self.now))
+        
+    def test_priority(self):
+        a = CarouselObject(self.obj, priority=2)
+        b = CarouselObject(self.obj)
+        order = self.take([a, b], 300)
+        self.assertEqual(200, order.count(a))
+        # interleaved rather than bunched
+        for i in range(0, 300, 3):
+            self.assertEqual(2, order[i:i + 3].count(a))
+        
+    def test_near_term(self):
+        today = CarouselObject(self.obj, scope=self.scope(0))
+        tomorrow = CarouselObject(self.obj, scope=self.scope(1))
+        later = CarouselObject(self.obj, scope=self.scope(3))
+        order = self.take([today, tomorrow, later], 1300)
+        # a day off halves the weight, and three days off leaves an eighth
+        self.assertEqual(800, order.count(today))
+        self.assertEqual(400, order.count(tomorrow))
+        self.assertEqual(100, order.count(later))
+        
+    def test_popularity(self):
+        a = CarouselObject(self.obj, service='radio1')
+        b = CarouselObject(self.obj, scope=self.scope(0, ['radio2', 'radio3']))
+        c = CarouselObject(self.obj, service='radio4')
+        order = self.take([a, b, c], 400, popularity={'radio1' : 3, 'radio3' : 1, 'radio4' : 0})
+        self.assertEqual(300, order.count(a))
+        self.assertEqual(100, order.count(b))
+        self.assertFalse(c in order)
+        
+    def test_empty(self):
+        self.assertEqual([], self.take([], 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+import unittest
+import copy
+
+from dabepg import *
+from dabepg import binary
+from dabepg.delta import diff
+from dabepg.test.sample import build_schedule
+
+class DiffTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.old = build_schedule(services=2).schedule
+        self.new = copy.deepcopy(self.old)
+        
+    def test_unchanged(self):
+        result = diff(self.old, self.new)
+        self.assertFalse(result)
+        self.assertEqual(48, len(result.unchanged))
+        result.bump_versions()
+        self.assertEqual(2, self.new.version)
+        self.assertEqual([], result.delta().schedule.programmes)
+        
+    def test_classify(self):
+        self.new.programmes[0].names[0].text = 'Changed'
+        self.new.programmes[1].version = 5 # a version alone is no change
+        removed = self.new.programmes.pop(2)
+        added = Programme(1000, crid='crid://www.example.com/1000')
+        self.new.programmes.append(added)
+        result = diff(self.old, self.new)
+        self.assertEqual([added], result.added)
+        self.assertEqual([self.old.programmes[2]], result.removed)
+        self.assertEqual([(self.old.programmes[0], self.new.programmes[0])], result.changed)
+        self.assertEqual(46, len(result.unchanged))
+        
+    def test_equal_hashes(self):
+        # a change to a value of the same hash is still a change
+        self.old.programmes[0].bitrate = -1
+        self.new.programmes[0].bitrate = -2
+        self.assertEqual([(self.old.programmes[0], self.new.programmes[0])], diff(self.old, self.new).changed)
+        
+    def test_matching(self):
+        # matched by CRID when the short CRID has been reallocated
+        self.new.programmes[0].shortcrid = 5000
+        # and not matched when the short CRID is reused for another programme
+        self.new.programmes[1].crid = 'crid://www.example.com/other'
+        result = diff(self.old, self.new)
+        self.assertEqual([(self.old.programmes[0], self.new.programmes[0])], result.changed)
+        self.assertEqual([self.new.programmes[1]], result.added)
+        self.assertEqual([self.old.programmes[1]], result.removed)
+        
+    def test_bump_versions(self):
+        self.old.programmes[0].version = 3
+        self.old.programmes[1].version = 4
+        self.new.programmes[0].names[0].text = 'Changed'
+        result = diff(self.old, self.new)
+        result.bump_versions()
+        self.assertEqual(4, self.new.programmes[0].version)
+        self.assertEqual(4, self.new.programmes[1].version)
+        self.assertEqual(1, self.new.programmes[2].version)
+        self.assertEqual(3, self.new.version)
+        
+    def test_delta(self):
+        self.new.programmes[0].names[0].text = 'Changed'
+        self.new.programmes.append(Programme(1000))
+        result = diff(self.old, self.new)
+        result.bump_versions()
+        delta = result.delta()
+        self.assertEqual([1000, self.new.programmes[0].shortcrid], [x.shortcrid for x in delta.schedule.programmes])
+        self.assertEqual(3, delta.schedule.version)
+        self.assertTrue(len(binary.marshall(delta)) * 10 < len(binary.marshall(Epg(self.new))))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,177 @@
 import unittest
+import pickle
+import copy
+from dateutil.tz import tzutc, tzoffset
 
-from dabepg import ContentId
+from dabepg import *
+from dabepg.test.sample import build_schedule, service_id
 
 class ContentIdTest(unittest.TestCase):
 
     def test_parse_contentid(self):
         print ContentId.fromstring('e1.ce15.c221.0.1')
         print ContentId.fromstring('e1.c586')   
+        
+    def test_value(self):
+        id = ContentId(0xe1, 0xce15, 0xc221, 0)
+        self.assertEqual(ContentId('e1', 'ce15', 'c221', '0'), id)
+        self.assertEqual(hash(ContentId('e1', 'ce15', 'c221', '0')), hash(id))
+        self.assertEqual('e1.ce15.c221.0', id)
+        self.assertNotEqual(ContentId(0xe1, 0xce15, 0xc222, 0), id)
+        self.assertFalse(ContentId(0xe1, 0xce15, 0xc221, 0) != id)
+        self.assertEqual(ContentId(0xe1, 0xce15), ContentId(0xe1, 0xce15, 0xc221))
+        self.assertEqual(1, len(set([id, ContentId(0xe1, 0xce15, 0xc221, 0, 1)])))
+        
+    def test_interned(self):
+        id = ContentId.fromstring('e1.ce15.c221.0')
+        self.assertTrue(id is ContentId.fromstring('e1.ce15.c221.0'))
+        self.assertTrue(id is ContentId.intern(0xe1, 0xce15, 0xc221, 0))
+        self.assertTrue(id is ContentId.intern('e1', 'ce15', 'c221', '0'))
+        self.assertRaises(ValueError, ContentId.fromstring, 'e1')
+        
+    def test_interned_size(self):
+        for sid in range(ContentId.interned_size * 2):
+            ContentId.intern(0xe1, 0xce15, sid, 0)
+            self.assertTrue(len(ContentId.interned) <= ContentId.interned_size)
+        
+class ScheduleScopeTest(unittest.TestCase):
+    
+    def test_scope(self):
+        schedule = build_schedule(services=3, days=2).schedule
+        scope = schedule.get_scope()
+        self.assertEqual([service_id(0), service_id(1), service_id(2)], scope.services)
+        self.assertEqual(datetime.datetime(2013, 7, 29), scope.start)
+        self.assertEqual(datetime.datetime(2013, 7, 31), scope.end)
+        
+    def test_changes(self):
+        schedule = build_schedule(services=2).schedule
+        programme = schedule.programmes.pop()
+        self.assertEqual(2, len(schedule.get_scope().services))
+        programme.locations[0].bearers = [Bearer(service_id(5))]
+        schedule.programmes.append(programme)
+        self.assertEqual(3, len(schedule.get_scope().services))
+        schedule.programmes = schedule.programmes[:1]
+        self.assertEqual(datetime.datetime(2013, 7, 29, 1), schedule.get_scope().end)
+        del schedule.programmes[:]
+        self.assertEqual(None, schedule.get_scope())
+        
+    def test_edit_programme(self):
+        schedule = build_schedule().schedule
+        self.assertEqual(1, len(schedule.get_scope().services))
+        schedule.programmes[0].locations[0].bearers.append(Bearer(service_id(1)))
+        self.assertEqual(2, len(schedule.get_scope().services))
+        time = schedule.programmes[-1].locations[0].times[0]
+        time.billed_time += datetime.timedelta(days=3)
+        self.assertEqual(datetime.datetime(2013, 8, 2), schedule.get_scope().end)
+        
+    def test_cached(self):
+        schedule = build_schedule(hours=24).schedule
+        scope = schedule.get_scope()
+        cached = schedule._scope
+        scope.services.append(service_id(1))
+        self.assertEqual([service_id(0)], schedule.get_scope().services)
+        self.assertTrue(cached is schedule._scope)
+        # a time changed from naive to aware cannot be compared with the cached one
+        time = schedule.programmes[0].locations[0].times[0]
+        time.billed_time = datetime.datetime(2013, 7, 29, tzinfo=tzutc())
+        self.assertEqual(time.billed_time, schedule.get_scope().start)
+        self.assertFalse(cached is schedule._scope)
+        
+    def test_pickle(self):
+        schedule = pickle.loads(pickle.dumps(build_schedule(services=2).schedule, 2))
+        self.assertEqual(2, len(schedule.get_scope().services))
+        schedule.programmes.pop()
+        self.assertEqual(47, len(schedule.programmes))
+
+class CompactModelTest(unittest.TestCase):
+
+    def test_slots(self):
+        programme = build_schedule().schedule.programmes[0]
+        for obj in (programme, programme.names[0], programme.locations[0], programme.locations[0].times[0],
+                    programme.locations[0].bearers[0], programme.genres[0], programme.links[0]):
+            self.assertFalse(hasattr(obj, '__dict__'), obj.__class__.__name__)
+        self.assertRaises(AttributeError, setattr, programme, 'unknown', 1)
+
+    def test_lazy_lists(self):
+        programme = Programme(1)
+        self.assertEqual([], programme.keywords)
+        self.assertEqual(None, programme._keywords)
+        programme.keywords.append('music')
+        self.assertEqual(['music'], programme.keywords)
+        programme.memberships += [Membership(2)]
+        self.assertEqual(1, len(programme.memberships))
+        programme.genres = [Genre('urn:tva:metadata:cs:ContentCS:2002:3.6.7')]
+        self.assertEqual(1, len(programme.genres))
+        
+    def test_max_length(self):
+        self.assertEqual(8, ShortName('x').max_length)
+        self.assertEqual(5, Text('x', 5).max_length)
+        self.assertRaises(ValueError, ShortName, 'too long a name')
+        
+    def test_pickle(self):
+        epg = build_schedule()
+        for protocol in (0, 2):
+            programme = pickle.loads(pickle.dumps(epg.schedule.programmes[0], protocol))
+            self.assertEqual(epg.schedule.programmes[0].crid, programme.crid)
+            self.assertEqual(str(epg.schedule.programmes[0].names[2]), str(programme.names[2]))
+            self.assertEqual(8, programme.names[0].max_length)
+            self.assertEqual(None, programme._keywords)
+            programme.names.append(LongName('appended'))
+            self.assertEqual(4, len(programme.names))
+
+            
+class ProgrammeCacheTest(unittest.TestCase):
+    
+    def test_structural_hash(self):
+        programme = build_schedule().schedule.programmes[0]
+        self.assertEqual(structural_hash(programme), structural_hash(copy.deepcopy(programme)))
+        for change in (lambda x: setattr(x.names[0], 'text', 'Changed'),
+                       lambda x: x.media.append(LongDescription('Changed')),
+                       lambda x: setattr(x.locations[0].times[0], 'billed_time', datetime.datetime(2013, 7, 30)),
+                       lambda x: setattr(x.links[0], 'url', 'http://www.example.com/changed')):
+            changed = copy.deepcopy(programme)
+            change(changed)
+            self.assertNotEqual(structural_hash(programme), structural_hash(changed))
+        
+    def test_zones(self):
+        time = datetime.datetime(2013, 7, 29, 12, tzinfo=tzutc())
+        self.assertNotEqual(structural_hash(Time(time, datetime.timedelta(hours=1))), 
+                            structural_hash(Time(time.astimezone(tzoffset(None, 3600)), datetime.timedelta(hours=1))))
+        
+    def test_equal_hashes(self):
+        # values of equal hash, or equal but written differently, are told apart
+        self.assertEqual(hash(-1), hash(-2))
+        cache = ProgrammeCache()
+        cache.start('context')
+        programme = Programme(1)
+        for bitrate in (-1, -2, 1, 1.0, True):
+            programme.bitrate = bitrate
+            self.assertEqual(repr(bitrate), cache.get(programme, lambda x: repr(x.bitrate)))
+        self.assertEqual((0, 5), (cache.hits, cache.misses))
+        
+    def test_hits(self):
+        programmes = build_schedule(services=2).schedule.programmes
+        cache = ProgrammeCache()
+        encode = lambda programme: str(programme.shortcrid)
+        for run in range(2):
+            cache.start('context')
+            for programme in programmes: self.assertEqual(str(programme.shortcrid), cache.get(programme, encode))
+            cache.finish()
+        self.assertEqual((48, 48), (cache.hits, cache.misses))
+        
+        # changed programmes miss, and those not used are dropped
+        programmes[0].version = 2
+        cache.start('context')
+        cache.get(programmes[0], encode)
+        cache.get(programmes[1], encode)
+        cache.finish()
+        self.assertEqual((49, 49), (cache.hits, cache.misses))
+        self.assertEqual(2, len(cache.fragments))
+        
+        # as are all of them when the context changes
+        cache.start('other')
+        cache.get(programmes[1], encode)
+        self.assertEqual((49, 50), (cache.hits, cache.misses))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,97 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+import unittest
+import datetime
+
+from dabepg import *
+from dabepg.binary import marshall, encoded_size
+from dabepg.split import split
+from dabepg.test.sample import build_schedule, service_id
+
+class SplitTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.schedule = build_schedule(services=4, days=3).schedule
+        
+    def check(self, pieces, budget):
+        for piece in pieces:
+            self.assertTrue(len(marshall(piece)) <= budget)
+        # every programme is carried once, in the order of the schedule
+        programmes = [p for piece in pieces for p in piece.schedule.programmes]
+        self.assertEqual(sorted(id(p) for p in self.schedule.programmes), sorted(id(p) for p in programmes))
+        for piece in pieces:
+            shortcrids = [p.shortcrid for p in piece.schedule.programmes]
+            self.assertEqual(sorted(shortcrids), shortcrids)
+            
+    def test_fits(self):
+        pieces = split(self.schedule, budget=len(marshall(Epg(self.schedule))))
+        self.assertEqual(1, len(pieces))
+        self.assertEqual(marshall(Epg(self.schedule)), marshall(pieces[0]))
+        
+    def test_budgets(self):
+        total = encoded_size(self.schedule)
+        for budget in (2000, 4000, 10000, 30000):
+            pieces = split(self.schedule, budget)
+            self.check(pieces, budget)
+            # no two objects could have been one
+            sizes = sorted(len(marshall(piece)) for piece in pieces)
+            if len(sizes) > 1: self.assertTrue(sizes[0] + sizes[1] > budget - 100)
+            self.assertTrue(len(pieces) >= -(-total // budget))
+            
+    def test_service_and_day(self):
+        # an object for each service and day, when no two of them fit together
+        programmes = self.schedule.programmes
+        day = encoded_size(Epg(Schedule(self.schedule.created, self.schedule.version, self.schedule.originator)))
+        day += max(sum(encoded_size(p) for p in programmes[i:i + 24]) for i in range(0, len(programmes), 24)) + 30
+        pieces = split(self.schedule, day)
+        self.check(pieces, day)
+        self.assertEqual(12, len(pieces))
+        for piece in pieces:
+            scope = piece.schedule.get_scope()
+            self.assertEqual(1, len(scope.services))
+            self.assertEqual(datetime.timedelta(days=1), scope.end - scope.start)
+            self.assertEqual(0, scope.start.hour)
+            
+    def test_scope(self):
+        pieces = split(self.schedule, 6000)
+        self.assertTrue(len(pieces) > 1)
+        for piece in pieces:
+            programmes = piece.schedule.programmes
+            scope = piece.schedule.get_scope()
+            times = [t for p in programmes for l in p.locations for t in l.times]
+            self.assertEqual(min(t.billed_time for t in times), scope.start)
+            self.assertEqual(max(t.billed_time + t.billed_duration for t in times), scope.end)
+            self.assertEqual(set(str(b) for p in programmes for l in p.locations for b in l.bearers), 
+                             set(str(s) for s in scope.services))
+            
+    def test_period(self):
+        pieces = split(self.schedule, 2500, period=datetime.timedelta(hours=6))
+        self.check(pieces, 2500)
+        
+    def test_too_long(self):
+        self.schedule.programmes[5].media.append(LongDescription('x' * 1200))
+        self.assertRaises(ValueError, split, self.schedule, 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
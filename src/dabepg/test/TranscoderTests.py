@@ -0,0 +1,107 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+import unittest
+from StringIO import StringIO
+
+from dabepg import *
+from dabepg import xml, binary
+from dabepg.transcode import xml_to_binary, binary_to_xml
+from dabepg.test.sample import build_schedule, build_serviceinfo, service_id, CREATED
+
+class XmlToBinaryTest(unittest.TestCase):
+    
+    def test_transcode(self):
+        epg = build_schedule(services=3, days=2)
+        document = xml.marshall(epg)
+        self.assertEqual(binary.marshall(epg), xml_to_binary(document))
+        self.assertEqual(binary.marshall(epg), xml_to_binary(StringIO(document), chunk_size=13))
+        
+    def test_backends(self):
+        document = xml.marshall(build_schedule(services=2))
+        for backend in (xml.STDLIB, xml.LXML):
+            if backend == xml.LXML and xml.lxml is None: continue
+            self.assertEqual(binary.marshall(xml.unmarshall(document)), xml_to_binary(document, backend=backend))
+        
+    def test_long_schedule(self):
+        # lengths over 253 bytes are written as 3 bytes once the scope has been inserted
+        epg = build_schedule(services=10, days=7)
+        self.assertEqual(binary.marshall(epg), xml_to_binary(xml.marshall(epg)))
+        
+    def test_empty_schedule(self):
+        epg = Epg(Schedule(created=datetime.datetime(2013, 7, 25, 15, 24, 39)))
+        self.assertEqual(binary.marshall(epg), xml_to_binary(xml.marshall(epg)))
+        
+    def test_no_schedule(self):
+        self.assertRaises(ValueError, xml_to_binary, '<epg xmlns="%s"/>' % xml.SCHEDULE_NS)
+        
+    def test_scope_aggregate(self):
+        schedule = build_schedule(services=3, days=2).schedule
+        aggregate = ScopeAggregate()
+        self.assertEqual(None, aggregate.get_scope())
+        for programme in schedule.programmes: aggregate.add(programme)
+        scope = aggregate.get_scope()
+        self.assertEqual([service_id(0), service_id(1), service_id(2)], scope.services)
+        self.assertEqual(schedule.get_scope().start, scope.start)
+        self.assertEqual(schedule.get_scope().end, scope.end)
+
+        
+class BinaryToXmlTest(unittest.TestCase):
+    
+    def assertTranscoded(self, data, indent=None):
+        self.assertEqual(xml.marshall(binary.unmarshall(data), indent=indent, backend=xml.STDLIB), 
+                         binary_to_xml(data, indent=indent))
+    
+    def test_schedule(self):
+        data = binary.marshall(build_schedule(services=3, days=2))
+        self.assertTranscoded(data)
+        self.assertTranscoded(data, indent='\t')
+        self.assertTranscoded(data, indent='')
+        
+    def test_serviceinfo(self):
+        data = binary.marshall(build_serviceinfo())
+        self.assertTranscoded(data)
+        self.assertTranscoded(data, indent='  ')
+        
+    def test_token_table_and_defaults(self):
+        self.assertTranscoded(binary.marshall(build_schedule(services=2), token_table=True, defaults=True))
+        self.assertTranscoded(binary.marshall(build_serviceinfo(), token_table=True, defaults=True))
+        
+    def test_empty_schedule(self):
+        self.assertTranscoded(binary.marshall(Epg(Schedule(created=CREATED))), indent='\t')
+        
+    def test_file(self):
+        data = binary.marshall(build_schedule())
+        f = StringIO()
+        self.assertEqual(None, binary_to_xml(StringIO(data), f))
+        self.assertEqual(binary_to_xml(data), f.getvalue())
+        
+    def test_invalid(self):
+        data = binary.marshall(build_schedule())
+        self.assertRaises(ValueError, binary_to_xml, data[:-4])
+        self.assertRaises(ValueError, binary_to_xml, '\x01\x00')
+        for data in ['', '\x02', '\x02\xfe\x00', data[:1] + '\x07' + data[2:9]]:
+            self.assertRaises(ValueError, binary_to_xml, data)
+
+
+if __name__ == "__main__":
+    unittest.main()
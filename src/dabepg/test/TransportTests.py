@@ -0,0 +1,134 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+import unittest
+import struct
+
+from dabepg import binary
+from dabepg.transport import *
+from dabepg.test.sample import build_schedule, build_serviceinfo
+
+def bitwise_crc(data):
+    crc = 0xffff
+    for c in data:
+        crc ^= ord(c) << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1) & 0xffff
+    return crc ^ 0xffff
+
+def parse_datagroup(datagroup):
+    """Returns the type, continuity index, segment number, last flag, transport ID 
+    and segment data of a data group, checking its CRC"""
+    flags, indices, number, access, transport_id = struct.unpack('>BBHBH', datagroup[:7])
+    assert flags & 0x30 == 0x30 and access == 0x12
+    end = len(datagroup)
+    if flags & 0x40:
+        end -= 2
+        assert struct.unpack('>H', datagroup[end:])[0] == bitwise_crc(datagroup[:end])
+    size = struct.unpack('>H', datagroup[7:9])[0] & 0x1fff
+    data = datagroup[9:end]
+    assert size == len(data)
+    return flags & 0x0f, indices >> 4, number & 0x7fff, bool(number & 0x8000), transport_id, data
+
+def reassemble(datagroups):
+    """Returns the data carried by each type and transport ID of the data groups"""
+    objects = {}
+    for datagroup in datagroups:
+        type, continuity, number, last, transport_id, data = parse_datagroup(datagroup)
+        segments = objects.setdefault((type, transport_id), [])
+        assert number == len(segments)
+        segments.append(data)
+    return dict((key, ''.join(segments)) for key, segments in objects.items())
+
+class TransportTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.pi = MotObject(1, '20130729_e1ce15c200_PI.EHB', binary.marshall(build_schedule(services=2)))
+        self.si = MotObject(2, 'SI.EHB', binary.marshall(build_serviceinfo()))
+        
+    def test_crc(self):
+        self.assertEqual(0xd64e, crc16('123456789'))
+        for data in ('', '\x00', '\xff' * 100, self.si.body):
+            self.assertEqual(bitwise_crc(data), crc16(data))
+        
+    def test_subtype(self):
+        self.assertEqual(PROGRAMME_INFORMATION, self.pi.subtype)
+        self.assertEqual(SERVICE_INFORMATION, self.si.subtype)
+        self.assertRaises(ValueError, MotObject, 3, 'GI.EHB', 'xyz')
+        
+    def test_header(self):
+        header = encode_header(self.si)
+        core = struct.unpack('>Q', '\x00' + header[:7])[0]
+        self.assertEqual(len(self.si.body), core >> 28)
+        self.assertEqual(len(header), (core >> 15) & 0x1fff)
+        self.assertEqual(CONTENT_TYPE_EPG, (core >> 9) & 0x3f)
+        self.assertEqual(SERVICE_INFORMATION, core & 0x1ff)
+        self.assertEqual('\xcc\x07\x00SI.EHB', header[7:])
+        
+    def test_long_parameter(self):
+        self.assertEqual('\xcc\x80\x81\x00' + 'x' * 128, encode_parameter(PARAMETER_CONTENT_NAME, '\x00' + 'x' * 128))
+        
+    def test_segment(self):
+        segments = segment('x' * 2500, 1000, repetition=2)
+        self.assertEqual([1000, 1000, 500], [len(s) - 2 for s in segments])
+        self.assertEqual(0x4000 | 500, struct.unpack('>H', segments[2][:2])[0])
+        self.assertRaises(ValueError, segment, 'x', MAX_SEGMENT_SIZE + 1)
+        
+    def test_header_mode(self):
+        datagroups = encode_datagroups([self.pi, self.si], segment_size=512)
+        self.assertTrue(max(len(d) for d in datagroups) <= 512 + 11)
+        objects = reassemble(datagroups)
+        self.assertEqual(self.pi.body, objects[DATAGROUP_BODY, 1])
+        self.assertEqual(self.si.body, objects[DATAGROUP_BODY, 2])
+        self.assertEqual(encode_header(self.pi), objects[DATAGROUP_HEADER, 1])
+        self.assertEqual(parse_datagroup(datagroups[0])[0], DATAGROUP_HEADER)
+        # the last segment of each object is flagged
+        self.assertTrue(parse_datagroup(datagroups[0])[3])
+        self.assertFalse(parse_datagroup(datagroups[1])[3])
+        
+    def test_directory_mode(self):
+        datagroups = encode_datagroups([self.pi, self.si], mode=DIRECTORY_MODE, directory_id=100, period=300)
+        objects = reassemble(datagroups)
+        directory = objects[DATAGROUP_DIRECTORY, 100]
+        self.assertEqual(len(directory), struct.unpack('>I', directory[:4])[0])
+        self.assertEqual(2, struct.unpack('>H', directory[4:6])[0])
+        self.assertEqual(300, struct.unpack('>I', '\x00' + directory[6:9])[0])
+        self.assertEqual(DEFAULT_SEGMENT_SIZE, struct.unpack('>H', directory[9:11])[0])
+        self.assertEqual(struct.pack('>H', 1) + encode_header(self.pi) + struct.pack('>H', 2) + encode_header(self.si), directory[13:])
+        self.assertEqual(self.si.body, objects[DATAGROUP_BODY, 2])
+        self.assertFalse(any(key[0] == DATAGROUP_HEADER for key in objects))
+        self.assertRaises(ValueError, encode_datagroups, [self.pi], mode=DIRECTORY_MODE, directory_id=1)
+        
+    def test_continuity(self):
+        encoder = DatagroupEncoder(crc=False)
+        first = encode_datagroups([self.pi], segment_size=100, encoder=encoder)
+        second = encode_datagroups([self.pi], segment_size=100, encoder=encoder)
+        indices = [parse_datagroup(d)[1] for d in first + second if parse_datagroup(d)[0] == DATAGROUP_BODY]
+        self.assertEqual([i % 16 for i in range(len(indices))], indices)
+        self.assertFalse(ord(first[0][0]) & 0x40)
+        
+    def test_unique(self):
+        self.assertRaises(ValueError, encode_datagroups, [self.pi, MotObject(1, 'SI.EHB', self.si.body)])
+
+
+if __name__ == "__main__":
+    unittest.main()
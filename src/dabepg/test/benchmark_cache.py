@@ -0,0 +1,60 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Compares re-marshalling a schedule in which a few programmes have changed, 
+encoding every programme against taking the unchanged ones from a programme 
+cache, in both encodings.
+
+USAGE: benchmark_cache.py [services] [days] [changed]"""
+
+import sys
+import time
+
+from dabepg import ProgrammeCache
+from dabepg import xml, binary
+from dabepg.test.sample import build_schedule
+
+def timed(f):
+    start = time.time()
+    f()
+    return time.time() - start
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    services = int(args[0]) if len(args) > 0 else 20
+    days = int(args[1]) if len(args) > 1 else 7
+    changed = int(args[2]) if len(args) > 2 else 2
+    
+    epg = build_schedule(services=services, days=days)
+    programmes = epg.schedule.programmes
+    print '%d programmes, %d changed between marshalls' % (len(programmes), changed)
+    
+    for name, marshall in [('binary', lambda **kw: binary.marshall(epg, **kw)),
+                           ('binary tokens', lambda **kw: binary.marshall(epg, token_table=True, defaults=True, **kw)),
+                           ('xml', lambda **kw: xml.marshall(epg, backend=xml.STDLIB, **kw))]:
+        cache = ProgrammeCache()
+        marshall(cache=cache)
+        for i in range(changed):
+            programmes[i * len(programmes) / changed].version += 1
+        uncached = timed(marshall)
+        cached = timed(lambda: marshall(cache=cache))
+        print '%-14s %.3fs uncached, %.3fs cached, %s' % (name, uncached, cached, cache)
@@ -0,0 +1,53 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Times simulating carousels of a growing number of daily PI objects, with the
+service information carried more often, at a sweep of sub-channel bit rates.
+
+USAGE: benchmark_carousel.py [priority]"""
+
+import sys
+import time
+
+from dabepg import binary
+from dabepg.carousel import CarouselObject, simulate
+from dabepg.transport import MotObject
+from dabepg.test.sample import build_schedule, build_serviceinfo, service_id
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    priority = int(args[0]) if len(args) > 0 else 10
+    
+    si = MotObject(0, 'SI.EHB', binary.marshall(build_serviceinfo()))
+    # the bodies of the daily objects are much alike in size, so share one
+    body = binary.marshall(build_schedule())
+    
+    for count in (100, 1000, 5000):
+        objects = [CarouselObject(si, priority)]
+        for i in range(count):
+            objects.append(CarouselObject(MotObject(i + 1, '%d_PI.EHB' % i, body), 1 + i % 3, service_id(i % 20)))
+        for bitrate in (16, 32, 64):
+            start = time.time()
+            plan = simulate(objects, bitrate)
+            elapsed = time.time() - start
+            print '%5d objects at %2d kbit/s: %6d transmissions in a %7.1fs cycle, SI wait %5.1fs, simulated in %.3fs' % \
+                (len(objects), bitrate, len(plan.order), plan.cycle, plan.waits[objects[0]], elapsed)
@@ -0,0 +1,54 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Times diffing schedules of growing size in which a few programmes have 
+changed, and compares the binary size of the delta against the full schedule.
+
+USAGE: benchmark_delta.py [changed]"""
+
+import sys
+import copy
+import time
+
+from dabepg import Epg
+from dabepg import binary
+from dabepg.delta import diff
+from dabepg.test.sample import build_schedule
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    changed = int(args[0]) if len(args) > 0 else 5
+    
+    for services in (5, 10, 20, 40):
+        old = build_schedule(services=services, days=7).schedule
+        new = copy.deepcopy(old)
+        for i in range(changed):
+            new.programmes[i * len(new.programmes) / changed].names[0].text = 'Changed'
+        
+        start = time.time()
+        result = diff(old, new)
+        elapsed = time.time() - start
+        result.bump_versions()
+        
+        print '%5d programmes diffed in %.3fs (%.1fus each), delta of %d bytes against %d' % \
+            (len(new.programmes), elapsed, elapsed * 1e6 / len(new.programmes), 
+             len(binary.marshall(result.delta())), len(binary.marshall(Epg(new))))
@@ -0,0 +1,65 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Times taking transmissions from the interleaved order of a growing number of 
+daily PI objects spread over the week around now, showing the cost of each 
+growing with the logarithm of the number of objects.
+
+USAGE: benchmark_interleave.py [transmissions]"""
+
+import sys
+import time
+import datetime
+import itertools
+
+from dabepg import Scope
+from dabepg.carousel import CarouselObject, interleave
+from dabepg.transport import MotObject
+from dabepg.test.sample import service_id
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    transmissions = int(args[0]) if len(args) > 0 else 200000
+    
+    now = datetime.datetime(2013, 7, 29, 12)
+    day = datetime.timedelta(days=1)
+    
+    for count in (100, 1000, 10000, 100000):
+        objects = []
+        popularity = {}
+        for i in range(count):
+            service = service_id(i % 200)
+            popularity[service] = 1.0 / (1 + i % 200)
+            start = now + (i % 7 - 1) * day
+            objects.append(CarouselObject(MotObject(i % 0x10000, '%d_PI.EHB' % i, '\x02'), service=service, 
+                                          scope=Scope(start, start + day, [service])))
+        
+        start = time.time()
+        order = interleave(objects, now, popularity)
+        first = next(order)
+        setup = time.time() - start
+        start = time.time()
+        for o in itertools.islice(order, transmissions):
+            pass
+        elapsed = time.time() - start
+        print '%6d objects: weighed in %.3fs, %d transmissions in %.3fs (%.2fus each)' % \
+            (count, setup, transmissions, elapsed, elapsed * 1e6 / transmissions)
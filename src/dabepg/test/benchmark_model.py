@@ -0,0 +1,71 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102 
+# 371 (Transportation and Binary Encoding Specification for EPG).
+# 
+# Copyright (C) 2013 Global Radio
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+
+"""Measures the memory held by a schedule of the model classes, as the growth in
+peak memory from building it, and again after reading every collection on it.
+The schedule is built in a forked process so that peak memory is measured alone.
+
+USAGE: benchmark_model.py [services] [days]"""
+
+import os
+import sys
+import time
+import resource
+
+from dabepg.test.sample import build_schedule
+
+def run(services, days):
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.time()
+        epg = build_schedule(services=services, days=days)
+        elapsed = time.time() - start
+        built = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        # reading every collection, as the marshallers do, must not allocate the empty ones
+        for programme in epg.schedule.programmes:
+            programme.keywords, programme.memberships
+            for location in programme.locations: location.times, location.bearers
+            for event in programme.events: event.genres, event.links, event.memberships
+        read = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        os.write(w, '%f %d %d' % (elapsed, built - before, read - before))
+        os._exit(0)
+    os.close(w)
+    result = os.read(r, 1024)
+    os.waitpid(pid, 0)
+    elapsed, built, read = result.split()
+    return float(elapsed), int(built), int(read)
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    services = int(args[0]) if len(args) > 0 else 60
+    days = int(args[1]) if len(args) > 1 else 30
+    
+    elapsed, built, read = run(services, days)
+    programmes = services * days * 24
+    print '%d services x %d days: %d programmes built in %.3fs' % (services, days, programmes, elapsed)
+    print 'built: +%dkB (%d bytes per programme)' % (built, built * 1024 / programmes)
+    print 'read:  +%dkB (%d bytes per programme)' % (read, read * 1024 / programmes)
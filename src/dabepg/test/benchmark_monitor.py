@@ -0,0 +1,60 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Compares the rate at which received binary objects can be re-emitted as XML, 
+through the model and a DOM against transcoding them directly. The objects are 
+the SI and, for each day, PI documents of one service up to all of them.
+
+USAGE: benchmark_monitor.py [services] [days]"""
+
+import sys
+import time
+import datetime
+
+from dabepg import xml, binary
+from dabepg.transcode import binary_to_xml
+from dabepg.test.sample import build_schedule, build_serviceinfo
+
+def received(services, days):
+    objects = [binary.marshall(build_serviceinfo(services))]
+    for day in range(days):
+        start = datetime.datetime(2013, 7, 29) + datetime.timedelta(days=day)
+        for service in range(services):
+            objects.append(binary.marshall(build_schedule(services=service + 1, start=start)))
+    return objects
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    services = int(args[0]) if len(args) > 0 else 10
+    days = int(args[1]) if len(args) > 1 else 7
+    
+    objects = received(services, days)
+    print '%d objects of %d bytes' % (len(objects), sum(len(x) for x in objects))
+    
+    for name, transcode in [('minidom', lambda data: xml.marshall(binary.unmarshall(data), backend=xml.STDLIB)),
+                            ('lxml', lambda data: xml.marshall(binary.unmarshall(data), backend=xml.LXML)),
+                            ('transcoder', binary_to_xml)]:
+        if name == 'lxml' and xml.lxml is None: continue
+        start = time.time()
+        for data in objects: transcode(data)
+        elapsed = time.time() - start
+        print '%-10s %.3fs, %d objects per minute' % (name, elapsed, len(objects) * 60 / elapsed)
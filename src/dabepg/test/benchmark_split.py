@@ -0,0 +1,51 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Times splitting a week long schedule into objects within a range of budgets,
+comparing the number of objects against the least the total length allows.
+
+USAGE: benchmark_split.py [services] [days]"""
+
+import sys
+import time
+
+from dabepg.binary import marshall, encoded_size
+from dabepg.split import split
+from dabepg.test.sample import build_schedule
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    services = int(args[0]) if len(args) > 0 else 20
+    days = int(args[1]) if len(args) > 1 else 7
+    
+    epg = build_schedule(services=services, days=days)
+    total = encoded_size(epg)
+    print 'schedule of %d programmes, %d bytes' % (len(epg.schedule.programmes), total)
+    
+    for budget in (4096, 8192, 16384, 65536, 262144):
+        start = time.time()
+        pieces = split(epg.schedule, budget)
+        elapsed = time.time() - start
+        sizes = [len(marshall(piece)) for piece in pieces]
+        assert max(sizes) <= budget
+        print 'budget %6d: %4d objects (at least %4d), %5.1f%% full on average, split in %.3fs' % \
+            (budget, len(pieces), -(-total // budget), 100.0 * sum(sizes) / len(sizes) / budget, elapsed)
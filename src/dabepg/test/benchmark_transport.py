@@ -0,0 +1,54 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Times packaging a week of programme information for a number of services, 
+with the service information, into MSC data groups, in megabytes per second of
+data groups generated.
+
+USAGE: benchmark_transport.py [services] [segment size]"""
+
+import sys
+import time
+
+from dabepg import binary
+from dabepg.transport import MotObject, encode_datagroups, HEADER_MODE, DIRECTORY_MODE
+from dabepg.test.sample import build_schedule, build_serviceinfo
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    services = int(args[0]) if len(args) > 0 else 10
+    segment_size = int(args[1]) if len(args) > 1 else 1024
+    
+    objects = [MotObject(1, 'SI.EHB', binary.marshall(build_serviceinfo(services)))]
+    objects.append(MotObject(2, 'PI.EHB', binary.marshall(build_schedule(services=services, days=7))))
+    
+    for mode in (HEADER_MODE, DIRECTORY_MODE):
+        for crc in (True, False):
+            start = time.time()
+            passes = 0
+            while time.time() - start < 1:
+                datagroups = encode_datagroups(objects, segment_size, mode, crc)
+                passes += 1
+            elapsed = time.time() - start
+            size = sum(len(d) for d in datagroups)
+            print '%-9s mode, CRC %-5s: %d data groups of %d bytes in %.2fms, %.1f MB/s' % \
+                (mode, crc, len(datagroups), size, elapsed * 1000 / passes, size * passes / elapsed / 1e6)
@@ -0,0 +1,105 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Builders for representative schedules and service information, shared by the
+tests and benchmarks"""
+
+from dabepg import *
+from dabepg.bands import BAND_12B
+from dateutil.tz import tzutc
+
+CREATED = datetime.datetime(2013, 7, 25, 15, 24, 39, tzinfo=tzutc())
+
+PRESENTERS = ['Gilles Peterson', 'Jo Whiley', 'Chris Evans', 'Zane Lowe', 'Annie Mac', 'Huw Stephens']
+SHOWS = ['Breakfast', 'Drivetime', 'Live Lounge', 'Late Show', 'Chart Show', 'Introducing']
+
+def service_id(i):
+    """Returns the :class:ContentId of the i-th sample service"""
+    return ContentId(0xe1, 0xce15, 0xc200 + i, 0)
+
+def build_schedule(services=1, days=1, hours=1, start=datetime.datetime(2013, 7, 29)):
+    """Builds an :class:Epg with one programme every number of hours for each service
+
+    :param services: Number of services to build programmes for
+    :type services: int
+    :param days: Number of days to cover
+    :type days: int
+    :param hours: Length of each programme in hours
+    :type hours: int
+    """
+
+    schedule = Schedule(created=CREATED, version=2, originator='Global Radio')
+    shortcrid = 1
+    for s in range(services):
+        bearer = service_id(s)
+        for slot in range(0, days * 24, hours):
+            presenter = PRESENTERS[(s + slot) % len(PRESENTERS)]
+            show = SHOWS[(s + slot / hours) % len(SHOWS)]
+            programme = Programme(shortcrid, crid='crid://www.example.com/%d' % shortcrid)
+            shortcrid += 1
+            programme.names.append(ShortName(show[:8]))
+            programme.names.append(MediumName(show[:16]))
+            programme.names.append(LongName('%s with %s' % (show, presenter)))
+
+            location = Location()
+            location.times.append(Time(start + datetime.timedelta(hours=slot), datetime.timedelta(hours=hours)))
+            location.bearers.append(Bearer(bearer))
+            programme.locations.append(location)
+
+            programme.media.append(ShortDescription('Live from the studio, %s presents %s on Radio %d' % (presenter, show, s + 1)))
+            programme.genres.append(Genre('urn:tva:metadata:cs:ContentCS:2002:3.6.%d' % (slot % 9 + 1)))
+            programme.links.append(Link('http://www.example.com/radio%d' % (s + 1), description='Web:'))
+
+            if slot % 3 == 0:
+                event = ProgrammeEvent(shortcrid, recommendation=True)
+                shortcrid += 1
+                event.names.append(MediumName('%s Live' % presenter.split()[0]))
+                event.locations.append(Location(times=[RelativeTime(datetime.timedelta(minutes=45), datetime.timedelta(minutes=15))]))
+                event.media.append(ShortDescription('Live from the studio with %s' % presenter))
+                programme.events.append(event)
+
+            schedule.programmes.append(programme)
+
+    return Epg(schedule)
+
+def build_serviceinfo(services=5):
+    """Builds a :class:ServiceInfo with a single ensemble carrying a number of services"""
+
+    info = ServiceInfo(created=CREATED, version=2, originator='BBC', provider='BBC')
+    ensemble = Ensemble(ContentId(0xe1, 0xce15))
+    ensemble.names.append(ShortName('BBC'))
+    ensemble.names.append(MediumName('BBC National'))
+    ensemble.frequencies.append(BAND_12B)
+    ensemble.media.append(Multimedia('http://www.example.com/logos/ensemble.png', Multimedia.LOGO_COLOUR_RECTANGLE))
+    info.ensembles.append(ensemble)
+
+    for s in range(services):
+        service = Service(service_id(s))
+        service.names.append(ShortName('Radio %d' % (s + 1)))
+        service.names.append(MediumName('BBC Radio %d' % (s + 1)))
+        service.media.append(ShortDescription('Rock and pop music from the BBC.'))
+        service.media.append(Multimedia('http://www.example.com/logos/%d.png' % s, Multimedia.LOGO_UNRESTRICTED, width=320, height=240))
+        service.genres.append(Genre('urn:tva:metadata:cs:ContentCS:2002:3.6.7', 'Rap/Hip Hop/Reggae'))
+        service.keywords.extend(['music', 'pop', 'rock'])
+        ensemble.services.append(service)
+
+    return info
@@ -0,0 +1,424 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Transcoders between the XML and binary encodings of a PI document, working a
+programme at a time rather than through a whole :class:Epg"""
+
+from dabepg import ScopeAggregate
+from dabepg.binary import start_element, patch_length, write_schedule_attributes, \
+    write_programme, write_scope, read_bytes, decode_header, read_children, read_attribute, \
+    read_attributes, read_text, unpack_tokentable, unpack_contentid, unpack_timepoint, unpack_int
+from dabepg.xml import ProgrammeParser, escape, get_iso_period, SCHEDULE_NS, TYPES_NS, XSI_NS, \
+    SCHEDULE_SCHEMA_LOCATION, SERVICEINFO_SCHEMA_LOCATION
+import datetime, dateutil.tz
+
+def xml_to_binary(i, chunk_size=65536, backend=None):
+    """Transcodes a PI XML document to its binary encoding, as 
+    `binary.marshall(xml.unmarshall(i))` would, but holding only the programme 
+    being transcoded as objects
+    
+    The scope is aggregated as programmes are written and inserted ahead of them
+    at the end, so the document is encoded in a single pass.
+    
+    :param i: String or File object to read XML from
+    :type i: str, file
+    :param chunk_size: Number of bytes to read at a time
+    :type chunk_size: int
+    :param backend: :const:STDLIB to parse with ElementTree or :const:LXML with 
+    lxml, otherwise the default :data:backend
+    :type backend: str
+    """
+    
+    import StringIO
+    f = i if hasattr(i, 'read') else StringIO.StringIO(i)
+    parser = ProgrammeParser(backend)
+    buf = bytearray()
+    epg_offset = start_element(buf, 0x02)
+    schedule_offset = None
+    scope_offset = None
+    aggregate = ScopeAggregate()
+    
+    def write_programmes():
+        for programme in parser.read_programmes():
+            write_programme(buf, programme)
+            aggregate.add(programme)
+    
+    while True:
+        data = f.read(chunk_size)
+        if not data: break
+        parser.feed(data)
+        if schedule_offset is None and parser.schedule is not None:
+            schedule_offset = start_element(buf, 0x21)
+            write_schedule_attributes(buf, parser.schedule)
+            scope_offset = len(buf)
+        write_programmes()
+    parser.close()
+    if schedule_offset is None: raise ValueError('document has no schedule')
+    write_programmes()
+    
+    # the scope goes ahead of the programmes
+    scope = aggregate.get_scope()
+    if scope is not None:
+        scope_buf = bytearray()
+        write_scope(scope_buf, scope)
+        buf[scope_offset:scope_offset] = scope_buf
+        
+    patch_length(buf, schedule_offset)
+    patch_length(buf, epg_offset)
+    return str(buf)
+
+def binary_to_xml(i, f=None, indent=None):
+    """Transcodes a binary PI or SI document to XML, as `xml.marshall(binary.unmarshall(i))`
+    would, but writing each element as it is walked rather than decoding to objects
+    and building a DOM from them
+    
+    The same elements are transcoded as are decoded by :func:binary.unmarshall, and
+    the output is formatted as minidom would.
+    
+    :param i: String or File object to read binary from
+    :type i: str, file
+    :param f: File-like object to write the UTF-8 encoded document to, otherwise 
+    it is returned as a string
+    :type f: file
+    :param indent: Characters to use for XML indentation
+    :type indent: str
+    """
+    
+    buf = memoryview(read_bytes(i))
+    tag, start, end = decode_header(buf, 0)
+    if end > len(buf): raise ValueError('end of data is beyond length: %d > %d' % (end, len(buf)))
+    if tag not in (0x02, 0x03): raise ValueError('neither a binary PI nor SI document, tag is 0x%02x' % tag)
+    
+    import cStringIO
+    out = f if f is not None else cStringIO.StringIO()
+    if tag == 0x02:
+        transcode_epg(XmlElementWriter(out, indent), buf, start, end)
+    else:
+        transcode_service_information(XmlElementWriter(out, indent or None), buf, start, end)
+    if f is None: return out.getvalue()
+    
+class XmlElementWriter:
+    """Writes elements a tag at a time, formatted as minidom would write them 
+    with the same indent. Attributes are passed already sorted and formatted."""
+    
+    def __init__(self, f, indent=None):
+        self.write = f.write
+        addindent = indent or ''
+        self.newl = '\n' if indent is not None else ''
+        self.indents = [addindent * depth for depth in range(6)]
+        self.write('<?xml version="1.0" encoding="UTF-8"?>%s' % self.newl)
+        
+    def start(self, depth, tag, attributes=''):
+        self.write('%s<%s%s>%s' % (self.indents[depth], tag, attributes, self.newl))
+        
+    def end(self, depth, tag):
+        self.write('%s</%s>%s' % (self.indents[depth], tag, self.newl))
+        
+    def empty(self, depth, tag, attributes=''):
+        self.write('%s<%s%s/>%s' % (self.indents[depth], tag, attributes, self.newl))
+        
+    def text(self, depth, tag, text):
+        self.write('%s<%s>%s</%s>%s' % (self.indents[depth], tag, escape(text), tag, self.newl))
+        
+    def cdata(self, depth, tag, text):
+        if ']]>' in text: raise ValueError("']]>' not allowed in a CDATA section")
+        indent = self.indents[depth]
+        self.write('%s<%s>%s<![CDATA[%s]]>%s</%s>%s' % (indent, tag, self.newl, text, indent, tag, self.newl))
+
+def format_attributes(attributes):
+    """Formats the attributes of a start tag in the order minidom writes them"""
+    return ''.join(' %s="%s"' % (name, escape(value)) for name, value in sorted(attributes))
+
+NAME_TAGS = {0x10 : 'epg:shortName', 0x11 : 'epg:mediumName', 0x12 : 'epg:longName'}
+
+"""Maximum number of entries held by each of the caches of attributes formatted
+   from their data, which are emptied once full"""
+formatted_cache_size = 8192
+formatted_times = {}
+formatted_durations = {}
+formatted_contentids = {}
+
+def format_cached(cache, data, format):
+    value = cache.get(data)
+    if value is None:
+        if len(cache) >= formatted_cache_size: cache.clear()
+        value = cache[data] = format(data)
+    return value
+
+def format_time(data):
+    return format_cached(formatted_times, data, lambda data: unpack_timepoint(data).isoformat())
+
+def format_duration(data):
+    return format_cached(formatted_durations, data, lambda data: get_iso_period(datetime.timedelta(seconds=unpack_int(data))))
+
+def format_contentid(data):
+    return format_cached(formatted_contentids, data, lambda data: str(unpack_contentid(data)))
+
+def transcode_names(writer, depth, names):
+    for tag, texts in zip((0x10, 0x11, 0x12), names):
+        for text in texts: writer.text(depth, NAME_TAGS[tag], text)
+        
+def read_location(buf, start, end, default_contentid):
+    """Returns the time and duration data of each time of the location element data
+    between the offsets, and the content ID data of each bearer"""
+    times = []
+    bearers = []
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x2c:
+            time = {}
+            for attribute_tag, attribute_start, attribute_end in read_children(buf, child_start, child_end):
+                if attribute_tag in (0x80, 0x81): time[attribute_tag] = buf[attribute_start:attribute_end].tobytes()
+            times.append((time[0x80], time[0x81]))
+        elif tag == 0x2d:
+            for attribute_tag, attribute_start, attribute_end in read_children(buf, child_start, child_end):
+                if attribute_tag == 0x80:
+                    bearers.append(buf[attribute_start:attribute_end].tobytes())
+                    break
+        elif tag == 0x05:
+            default_contentid = buf[child_start:child_end].tobytes()
+    
+    # apply a default content ID
+    if not bearers and default_contentid is not None:
+        bearers.append(default_contentid)
+    if not bearers:
+        raise ValueError('location has no bearers and no default content ID is defined')
+    return times, bearers
+
+def iter_locations(buf, start, end, default_contentid):
+    """Generates the times and bearers of each location of the programme element 
+    data between the offsets"""
+    locations = []
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x19:
+            locations.append((child_start, child_end))
+        elif tag == 0x05:
+            default_contentid = buf[child_start:child_end].tobytes()
+    for location_start, location_end in locations:
+        yield read_location(buf, location_start, location_end, default_contentid)
+        
+def iter_schedule(buf, start, end, tokens, default_contentid):
+    """Generates the offsets of each programme of the schedule element data between 
+    the offsets, with the token table and default content ID data in effect for it"""
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x1c:
+            yield child_start, child_end, tokens, default_contentid
+        elif tag == 0x04:
+            tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+        elif tag == 0x05:
+            default_contentid = buf[child_start:child_end].tobytes()
+            
+def read_scope(buf, programmes):
+    """Returns the start and end times of the programmes and the content ID data of 
+    their services, in the order first seen, as :meth:Schedule.get_scope aggregates
+    them from the decoded programmes"""
+    start = None
+    end = None
+    services = []
+    seen = set()
+    for programme_start, programme_end, tokens, default_contentid in programmes:
+        for times, bearers in iter_locations(buf, programme_start, programme_end, default_contentid):
+            for time, duration in times:
+                billed_time = unpack_timepoint(time)
+                end_time = billed_time + datetime.timedelta(seconds=unpack_int(duration))
+                if start is None or start > billed_time: start = billed_time
+                if end is None or end < end_time: end = end_time
+            for bearer in bearers:
+                if bearer not in seen:
+                    seen.add(bearer)
+                    services.append(bearer)
+    if start is None or end is None: return None
+    return start, end, services
+
+def transcode_epg(writer, buf, start, end):
+    
+    tokens = None
+    default_contentid = None
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x21: break
+        elif tag == 0x04:
+            tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+        elif tag == 0x05:
+            default_contentid = buf[child_start:child_end].tobytes()
+    else:
+        raise ValueError('epg has no schedule')
+    schedule_start, schedule_end = child_start, child_end
+    
+    writer.start(0, 'epg', format_attributes([
+        ('system', 'DAB'), ('xml:lang', 'en'), 
+        ('xmlns', SCHEDULE_NS), ('xmlns:epg', TYPES_NS), ('xmlns:xsi', XSI_NS), 
+        ('xsi:schemaLocation', SCHEDULE_SCHEMA_LOCATION)]))
+    
+    # schedule, with the attributes a decoded schedule defaults to
+    attributes = read_attributes(0x21, buf, schedule_start, schedule_end)
+    created = attributes.get(0x81) or datetime.datetime.now(dateutil.tz.tzlocal())
+    schedule_attributes = [('version', str(attributes.get(0x80, 1))), 
+                           ('creationTime', created.replace(microsecond=0).isoformat())]
+    if 0x82 in attributes: schedule_attributes.append(('originator', attributes[0x82]))
+    schedule_attributes = format_attributes(schedule_attributes)
+    
+    # the scope precedes the programmes, so is read from them first
+    scope = read_scope(buf, iter_schedule(buf, schedule_start, schedule_end, tokens, default_contentid))
+    programmes = iter_schedule(buf, schedule_start, schedule_end, tokens, default_contentid)
+    programme = next(programmes, None)
+    if scope is None and programme is None:
+        writer.empty(1, 'schedule', schedule_attributes)
+    else:
+        writer.start(1, 'schedule', schedule_attributes)
+        if scope is not None:
+            scope_start, scope_end, services = scope
+            scope_attributes = format_attributes([('startTime', scope_start.isoformat()), ('stopTime', scope_end.isoformat())])
+            if services:
+                writer.start(2, 'scope', scope_attributes)
+                for service in services:
+                    writer.empty(3, 'serviceScope', ' id="%s"' % format_contentid(service))
+                writer.end(2, 'scope')
+            else:
+                writer.empty(2, 'scope', scope_attributes)
+        while programme is not None:
+            transcode_programme(writer, buf, *programme)
+            programme = next(programmes, None)
+        writer.end(1, 'schedule')
+    writer.end(0, 'epg')
+
+def transcode_programme(writer, buf, start, end, tokens, default_contentid):
+    
+    shortcrid = None
+    names = ([], [], [])
+    media = []
+    locations = []
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x81:
+            shortcrid = read_attribute(0x1c, tag, buf, child_start, child_end)
+        elif tag >= 0x10 and tag <= 0x12:
+            names[tag - 0x10].append(read_text(buf, child_start, child_end, tokens))
+        elif tag == 0x13:
+            media.extend(read_media(buf, child_start, child_end, tokens))
+        elif tag == 0x19:
+            locations.append((child_start, child_end))
+        elif tag == 0x04:
+            tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+        elif tag == 0x05:
+            default_contentid = buf[child_start:child_end].tobytes()
+    if shortcrid is None: raise ValueError('programme has no short CRID')
+    locations = [read_location(buf, location_start, location_end, default_contentid) 
+                 for location_start, location_end in locations]
+    
+    # programme, with the attributes a decoded programme defaults to
+    attributes = ' recommendation="yes" shortId="%d" version="1"' % shortcrid
+    if not any(names) and not media and not locations:
+        return writer.empty(2, 'programme', attributes)
+    writer.start(2, 'programme', attributes)
+    transcode_names(writer, 3, names)
+    for times, bearers in locations:
+        writer.start(3, 'epg:location')
+        for time, duration in times:
+            writer.empty(4, 'epg:time', ' duration="%s" time="%s"' % (format_duration(duration), format_time(time)))
+        for bearer in bearers:
+            writer.empty(4, 'epg:bearer', ' id="%s"' % format_contentid(bearer))
+        writer.end(3, 'epg:location')
+    for tag, text in media:
+        writer.start(3, 'epg:mediaDescription')
+        writer.cdata(4, tag, text)
+        writer.end(3, 'epg:mediaDescription')
+    writer.end(2, 'programme')
+    
+def read_media(buf, start, end, tokens):
+    """Returns the tag and text of each description of the mediaDescription element
+    data between the offsets, short descriptions first"""
+    short_descriptions = []
+    long_descriptions = []
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x1a:
+            short_descriptions.append(('epg:shortDescription', read_text(buf, child_start, child_end, tokens)))
+        elif tag == 0x1b:
+            long_descriptions.append(('epg:longDescription', read_text(buf, child_start, child_end, tokens)))
+        elif tag == 0x04:
+            tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+    return short_descriptions + long_descriptions
+
+def transcode_service_information(writer, buf, start, end):
+    
+    tokens = None
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x26: break
+        elif tag == 0x04:
+            tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+    else:
+        raise ValueError('service information has no ensemble')
+    ensemble_start, ensemble_end = child_start, child_end
+    
+    attributes = read_attributes(0x03, buf, start, end)
+    info_attributes = [('xml:lang', 'en'), ('xmlns', SCHEDULE_NS), ('xmlns:epg', TYPES_NS), ('xmlns:xsi', XSI_NS), 
+                       ('xsi:schemaLocation', SERVICEINFO_SCHEMA_LOCATION)]
+    if attributes.get(0x80, 1) > 1: info_attributes.append(('version', str(attributes[0x80])))
+    if attributes.get(0x81): info_attributes.append(('creationTime', attributes[0x81].replace(microsecond=0).isoformat()))
+    if attributes.get(0x82): info_attributes.append(('originator', attributes[0x82]))
+    if attributes.get(0x83): info_attributes.append(('serviceProvider', attributes[0x83]))
+    writer.start(0, 'serviceInformation', format_attributes(info_attributes))
+    transcode_ensemble(writer, buf, ensemble_start, ensemble_end, tokens)
+    writer.end(0, 'serviceInformation')
+    
+def transcode_ensemble(writer, buf, start, end, tokens):
+    
+    id = None
+    names = ([], [], [])
+    services = []
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x80:
+            id = buf[child_start:child_end].tobytes()
+        elif tag >= 0x10 and tag <= 0x12:
+            names[tag - 0x10].append(read_text(buf, child_start, child_end, tokens))
+        elif tag == 0x28:
+            services.append((child_start, child_end, tokens))
+        elif tag == 0x04:
+            tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+    if id is None: raise ValueError('ensemble has no ensemble ID')
+    
+    attributes = ' id="%s"' % format_contentid(id)
+    if not any(names) and not services: 
+        return writer.empty(1, 'ensemble', attributes)
+    writer.start(1, 'ensemble', attributes)
+    transcode_names(writer, 2, names)
+    for service in services:
+        transcode_service(writer, buf, *service)
+    writer.end(1, 'ensemble')
+    
+def transcode_service(writer, buf, start, end, tokens):
+    
+    id = None
+    names = ([], [], [])
+    for tag, child_start, child_end in read_children(buf, start, end):
+        if tag == 0x29 and id is None:
+            for attribute_tag, attribute_start, attribute_end in read_children(buf, child_start, child_end):
+                if attribute_tag == 0x80:
+                    id = buf[attribute_start:attribute_end].tobytes()
+                    break
+        elif tag >= 0x10 and tag <= 0x12:
+            names[tag - 0x10].append(read_text(buf, child_start, child_end, tokens))
+        elif tag == 0x04:
+            tokens = unpack_tokentable(buf[child_start:child_end].tobytes())
+    if id is None: raise ValueError('service has no service ID')
+    
+    writer.start(2, 'service')
+    writer.empty(3, 'serviceID', ' id="%s" type="primary"' % format_contentid(id))
+    transcode_names(writer, 3, names)
+    writer.end(2, 'service')
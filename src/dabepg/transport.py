@@ -0,0 +1,212 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102
+# 371 (Transportation and Binary Encoding Specification for EPG).
+#
+# Copyright (C) 2013 Global Radio
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Transport of marshalled EPG objects by MOT (EN 301 234) in MSC data groups
+(EN 300 401), as TS 102 371 carries them"""
+
+import struct
+import binascii
+
+CONTENT_TYPE_EPG = 7
+
+SERVICE_INFORMATION = 0
+PROGRAMME_INFORMATION = 1
+GROUP_INFORMATION = 2
+
+HEADER_MODE = 'header'
+DIRECTORY_MODE = 'directory'
+
+DATAGROUP_HEADER = 3
+DATAGROUP_BODY = 4
+DATAGROUP_DIRECTORY = 6
+
+PARAMETER_CONTENT_NAME = 0x0C
+
+# a data group may be no more than 8191 bytes, leaving the segment data what is
+# not taken by the headers, segmentation header and CRC
+MAX_SEGMENT_SIZE = 8191 - 11
+DEFAULT_SEGMENT_SIZE = 1024
+
+document_subtypes = {0x02 : PROGRAMME_INFORMATION, 0x03 : SERVICE_INFORMATION}
+
+def crc16(data, crc=0xffff):
+    """Returns the CRC-CCITT of a data group, computed from the table of the
+    binascii module and complemented"""
+    return binascii.crc_hqx(data, crc) ^ 0xffff
+
+class MotObject:
+    """Object to be carried by MOT
+    
+    :param transport_id: Transport ID, unique among the objects being carried
+    :type transport_id: int
+    :param name: Content name of the object
+    :type name: str
+    :param body: Marshalled document
+    :type body: str
+    :param subtype: Content subtype, taken from the document if not given
+    :type subtype: int
+    """
+    
+    def __init__(self, transport_id, name, body, subtype=None):
+        if not 0 <= transport_id <= 0xffff: raise ValueError('transport ID must be 16 bits: %d' % transport_id)
+        if subtype is None:
+            if not body or ord(body[0]) not in document_subtypes: raise ValueError('cannot tell the content subtype of the body')
+            subtype = document_subtypes[ord(body[0])]
+        self.transport_id = transport_id
+        self.name = name
+        self.body = body
+        self.subtype = subtype
+        
+    def __repr__(self):
+        return '<MotObject: %d %s, %d bytes>' % (self.transport_id, self.name, len(self.body))
+
+def encode_parameter(id, data):
+    """Encodes a header extension parameter"""
+    if data is None: return chr(id)
+    n = len(data)
+    if n == 1: return chr(0x40 | id) + data
+    if n == 4: return chr(0x80 | id) + data
+    if n <= 0x7f: return chr(0xc0 | id) + chr(n) + data
+    if n <= 0x7fff: return chr(0xc0 | id) + struct.pack('>H', 0x8000 | n) + data
+    raise ValueError('parameter data is too long: %d bytes' % n)
+        
+def encode_header(obj):
+    """Encodes the MOT header of an object, its header core followed by an 
+    extension carrying its content name"""
+    
+    name = obj.name.encode('utf-8') if isinstance(obj.name, unicode) else obj.name
+    # character set 0 is the complete EBU Latin set
+    extension = encode_parameter(PARAMETER_CONTENT_NAME, '\x00' + name)
+    header_size = 7 + len(extension)
+    if len(obj.body) >= (1 << 28): raise ValueError('body is too large: %d bytes' % len(obj.body))
+    if header_size >= (1 << 13): raise ValueError('header is too large: %d bytes' % header_size)
+    core = (len(obj.body) << 28) | (header_size << 15) | (CONTENT_TYPE_EPG << 9) | obj.subtype
+    return struct.pack('>Q', core)[1:] + extension
+
+def encode_directory(objects, segment_size=DEFAULT_SEGMENT_SIZE, period=0):
+    """Encodes a MOT directory of the headers of the objects
+    
+    :param segment_size: Size of the body segments
+    :type segment_size: int
+    :param period: Maximum time taken to carry every object, in tenths of a second,
+    or 0 if it is not known
+    :type period: int
+    """
+    
+    entries = ''.join(struct.pack('>H', obj.transport_id) + encode_header(obj) for obj in objects)
+    size = 13 + len(entries)
+    if size >= (1 << 30): raise ValueError('directory is too large: %d bytes' % size)
+    if not 0 <= period < (1 << 24): raise ValueError('carousel period must be 24 bits: %d' % period)
+    # no directory extension
+    return struct.pack('>IH', size, len(objects)) + struct.pack('>I', period)[1:] + \
+        struct.pack('>HH', segment_size, 0) + entries
+
+def segment(data, segment_size=DEFAULT_SEGMENT_SIZE, repetition=0):
+    """Splits data into segments of no more than the segment size, each following
+    its segmentation header
+    
+    :param repetition: Number of times the segments are to be repeated, up to 7
+    :type repetition: int
+    """
+    
+    if not 1 <= segment_size <= MAX_SEGMENT_SIZE: raise ValueError('segment size must be from 1 to %d: %d' % (MAX_SEGMENT_SIZE, segment_size))
+    if not 0 <= repetition <= 7: raise ValueError('repetition count must be from 0 to 7: %d' % repetition)
+    segments = []
+    for i in range(0, len(data), segment_size):
+        chunk = data[i:i + segment_size]
+        segments.append(struct.pack('>H', (repetition << 13) | len(chunk)) + chunk)
+    if not segments: segments.append(struct.pack('>H', repetition << 13))
+    return segments
+
+class DatagroupEncoder:
+    """Encodes segments into MSC data groups, keeping the continuity index of each
+    type of data group from one object to the next
+    
+    :param crc: Whether to end each data group with a CRC
+    :type crc: bool
+    """
+    
+    def __init__(self, crc=True):
+        self.crc = crc
+        self.continuity = {}
+        
+    def encode(self, type, transport_id, segments):
+        """Returns the data groups carrying the segments of an object"""
+        
+        flags = (self.crc << 6) | 0x30 | type # segment field and user access field
+        # user access field carrying the transport ID and no end user address
+        access = struct.pack('>BH', 0x12, transport_id)
+        continuity = self.continuity.get(type, 0)
+        last = len(segments) - 1
+        datagroups = []
+        for number, data in enumerate(segments):
+            datagroup = struct.pack('>BBH', flags, continuity << 4, number | (0x8000 if number == last else 0)) + access + data
+            if self.crc: datagroup += struct.pack('>H', crc16(datagroup))
+            datagroups.append(datagroup)
+            continuity = (continuity + 1) & 0x0f
+        self.continuity[type] = continuity
+        return datagroups
+
+def encode_datagroups(objects, segment_size=DEFAULT_SEGMENT_SIZE, mode=HEADER_MODE, crc=True, 
+                      encoder=None, directory_id=0, period=0):
+    """Encodes objects into the MSC data groups carrying them by MOT, in header 
+    mode as the header of each object followed by its body, or in directory mode 
+    as a directory of the headers followed by the bodies
+    
+    :param objects: Objects to carry
+    :type objects: list of MotObject
+    :param segment_size: Size of the segments, up to 8180 bytes
+    :type segment_size: int
+    :param mode: HEADER_MODE or DIRECTORY_MODE
+    :type mode: str
+    :param crc: Whether to end each data group with a CRC
+    :type crc: bool
+    :param encoder: Encoder to carry the continuity indices on from, for the next 
+    pass of a carousel
+    :type encoder: DatagroupEncoder
+    :param directory_id: Transport ID of the directory in directory mode
+    :type directory_id: int
+    :param period: Carousel period given in the directory, in tenths of a second
+    :type period: int
+    :returns: list of data groups
+    """
+    
+    if encoder is None: encoder = DatagroupEncoder(crc)
+    ids = set()
+    for obj in objects:
+        if obj.transport_id in ids: raise ValueError('transport ID is not unique: %d' % obj.transport_id)
+        ids.add(obj.transport_id)
+        
+    datagroups = []
+    if mode == HEADER_MODE:
+        for obj in objects:
+            datagroups.extend(encoder.encode(DATAGROUP_HEADER, obj.transport_id, segment(encode_header(obj), segment_size)))
+            datagroups.extend(encoder.encode(DATAGROUP_BODY, obj.transport_id, segment(obj.body, segment_size)))
+    elif mode == DIRECTORY_MODE:
+        if directory_id in ids: raise ValueError('directory transport ID is taken by an object: %d' % directory_id)
+        directory = encode_directory(objects, segment_size, period)
+        datagroups.extend(encoder.encode(DATAGROUP_DIRECTORY, directory_id, segment(directory, segment_size)))
+        for obj in objects:
+            datagroups.extend(encoder.encode(DATAGROUP_BODY, obj.transport_id, segment(obj.body, segment_size)))
+    else:
+        raise ValueError('unknown MOT mode: %s' % mode)
+    return datagroups
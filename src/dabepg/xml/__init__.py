@@ -22,8 +22,19 @@
 
 from dabepg import *
 import xml.dom.minidom
+import codecs
+import collections
+from xml.etree.ElementTree import TreeBuilder
+try:
+    from xml.etree.cElementTree import XMLParser, parse
+except ImportError:
+    from xml.etree.ElementTree import XMLParser, parse
 import isodate
 from xml.dom import XML_NAMESPACE
+try:
+    import lxml.etree
+except ImportError:
+    lxml = None
 
 EPG_NS = 'http://www.worlddab.org/schemas/epgDataTypes/14'
 SCHEDULE_NS = 'http://www.worlddab.org/schemas/epgSchedule/14'
@@ -33,6 +44,122 @@ XSI_NS = 'http://www.w3.org/2001/XMLSchema-instance'
 SCHEDULE_SCHEMA_LOCATION = '%s epgSchedule_14.xsd' % SCHEDULE_NS
 SERVICEINFO_SCHEMA_LOCATION = '%s epgSI_14.xsd' % SERVICEINFO_NS
 
+STDLIB = 'stdlib'
+LXML = 'lxml'
+
+# backend used when none is given, which is set to LXML to use lxml throughout
+backend = STDLIB
+
+def get_backend(name=None):
+    """Returns the named backend, or the default :data:backend if none is given"""
+    
+    name = name or backend
+    if name not in (STDLIB, LXML): raise ValueError('unknown XML backend: %s' % name)
+    if name == LXML and lxml is None: raise ValueError('the lxml backend needs lxml to be installed')
+    return name
+
+def create_document(name=None):
+    """Returns the document to build elements from, a minidom :class:Document for 
+    the stdlib backend or an :class:LxmlDocument for lxml"""
+    
+    return LxmlDocument() if get_backend(name) == LXML else xml.dom.minidom.Document()
+
+def create_parser(target=None, name=None):
+    """Returns an XML parser for the backend, building elements or driving the target"""
+    
+    if get_backend(name) == LXML: return lxml.etree.XMLParser(target=target, resolve_entities=False)
+    return XMLParser(target=target)
+
+PREFIXES = {'epg' : TYPES_NS, 'xsi' : XSI_NS, 'xml' : XML_NAMESPACE}
+NAMESPACES = {None : SCHEDULE_NS, 'epg' : TYPES_NS, 'xsi' : XSI_NS}
+LANG = '{%s}lang' % XML_NAMESPACE
+
+def qualify(name, namespace=None):
+    """Returns the ElementTree form of a prefixed name, unprefixed names taking the given namespace"""
+    
+    prefix, sep, local = name.rpartition(':')
+    if prefix: return '{%s}%s' % (PREFIXES[prefix], local)
+    return '{%s}%s' % (namespace, name) if namespace else name
+
+if lxml is not None:
+    
+    class LxmlElement(lxml.etree.ElementBase):
+        """lxml element answering to the DOM calls made on elements by the builders"""
+    
+        def setAttribute(self, name, value):
+            # namespaces are declared by the document 
+            if name == 'xmlns' or name.startswith('xmlns:'): return
+            self.set(qualify(name), value)
+            
+        def getAttribute(self, name):
+            return self.get(qualify(name), '')
+            
+        def appendChild(self, child):
+            if isinstance(child, (basestring, lxml.etree.CDATA)): self.text = child
+            else: self.append(child)
+            return child
+        
+        @property
+        def tagName(self):
+            return self.prefix + ':' + lxml.etree.QName(self).localname if self.prefix else lxml.etree.QName(self).localname
+
+def compact_lxml_element(element, lang):
+    value = element.get(LANG)
+    if value is not None:
+        if value == lang: del element.attrib[LANG]
+        else: lang = value
+    for name in TIME_ATTRIBUTES:
+        value = element.get(name)
+        if value is not None and value.endswith('+00:00'): element.set(name, value[:-6] + 'Z')
+    for name, value in DEFAULT_ATTRIBUTES.get(lxml.etree.QName(element).localname, ()):
+        if element.get(name) == value: del element.attrib[name]
+    
+    # assigning the text back drops any CDATA
+    if element.text is not None: element.text = element.text
+    for child in list(element):
+        if not isinstance(child.tag, basestring): continue
+        if lxml.etree.QName(child).localname in OPTIONAL_ELEMENTS and not child.attrib and not ''.join(child.itertext()).strip() \
+                and not any(descendant.attrib for descendant in child.iterdescendants()):
+            element.remove(child)
+        else:
+            compact_lxml_element(child, lang)
+
+class LxmlDocument:
+    """Stands in for the minidom document when marshalling through lxml, building
+    :class:LxmlElement elements that answer to the same DOM calls, so that the 
+    builders and most listeners work unchanged"""
+    
+    def __init__(self):
+        self.parser = lxml.etree.XMLParser()
+        self.parser.set_element_class_lookup(lxml.etree.ElementDefaultClassLookup(element=LxmlElement))
+        self.root = None
+        
+    def createElement(self, name):
+        return self.parser.makeelement(qualify(name, SCHEDULE_NS), nsmap=NAMESPACES)
+    
+    def createTextNode(self, data):
+        return data
+    
+    def createCDATASection(self, data):
+        return lxml.etree.CDATA(data)
+    
+    def appendChild(self, element):
+        self.root = element
+        return element
+    
+    def compact(self):
+        """Compacts the document as :func:compact_element does for minidom"""
+        
+        lxml.etree.cleanup_namespaces(self.root)
+        compact_lxml_element(self.root, None)
+    
+    def toxml(self, encoding='UTF-8'):
+        return '<?xml version="1.0" encoding="%s"?>' % encoding + lxml.etree.tostring(self.root, encoding=encoding, xml_declaration=False)
+    
+    def toprettyxml(self, indent='\t', encoding='UTF-8'):
+        lxml.etree.indent(self.root, space=indent)
+        return '<?xml version="1.0" encoding="%s"?>\n' % encoding + lxml.etree.tostring(self.root, encoding=encoding, xml_declaration=False) + '\n'
+
 class MarshallListener:
     
     def on_element(self, doc, object, element):
@@ -45,71 +172,31 @@ def marshall(obj, listener=MarshallListener(), **kwargs):
     elif isinstance(obj, Epg): return marshall_epg(obj, listener, **kwargs)
     else: raise ValueError('neither a ServiceInfo nor an Epg be')
     
-def marshall_serviceinfo(info, listener=MarshallListener(), indent=None, **kwargs):
+def marshall_serviceinfo(info, listener=MarshallListener(), indent=None, backend=None, compact=False, **kwargs):
+    """
+    Encodes service information into XML
+    
+    :info: ServiceInfo object to encode
+    :listener: Observer notified when an element is created
+    :indent: Characters to use for XML indentation
+    :backend: :const:STDLIB to build the document with minidom or :const:LXML 
+    with lxml, otherwise the default :data:backend
+    :compact: Whether to leave out what a reader can infer, see :func:compact_element
+    """
     
-    doc = xml.dom.minidom.Document()
+    doc = create_document(backend)
     
     # service info
-    info_element = doc.createElement('serviceInformation')
-    info_element.namespaceURI = SCHEDULE_NS
-    if info.version > 1: info_element.setAttribute('version', str(info.version))
-    if info.created: info_element.setAttribute('creationTime', info.created.replace(microsecond=0).isoformat())
-    if info.originator: info_element.setAttribute('originator', info.originator)
-    if info.provider: info_element.setAttribute('serviceProvider', info.provider)   
-    if info.type != ServiceInfo.DAB: info_element.setAttribute('system', info.type)
+    info_element = build_serviceinfo_element(doc, info)
     doc.appendChild(info_element)
     
-    # fudge the namespaces in there
-    info_element.setAttribute('xmlns', SCHEDULE_NS)
-    info_element.setAttribute('xmlns:epg', TYPES_NS)
-    info_element.setAttribute('xmlns:xsi', XSI_NS)
-    info_element.setAttribute('xsi:schemaLocation', SERVICEINFO_SCHEMA_LOCATION)
-    info_element.setAttribute('xml:lang', 'en')
-
     # ensemble
     for ensemble in info.ensembles:
-        ensemble_element = doc.createElement('ensemble')
-        ensemble_element.setAttribute('id', str(ensemble))
-        if ensemble.version > 1: ensemble_element.setAttribute('version', str(ensemble.version))
-        for name in ensemble.names:
-            ensemble_element.appendChild(build_name(doc, name))
-        for frequency in ensemble.frequencies:
-            frequency_element = doc.createElement('frequency')
-            if len(ensemble.frequencies) > 1 and len(ensemble_element.getElementsByTagName('frequency')) > 0:
-                frequency_element.setAttribute('type', 'secondary')
-            frequency_element.setAttribute('kHz', str(frequency))
-            ensemble_element.appendChild(frequency_element)
+        ensemble_element = build_ensemble_element(doc, ensemble)
             
         # service
         for service in ensemble.services:
-            service_element = doc.createElement('service')
-            if service.version > 1: service_element.setAttribute('version', str(service.version))
-            if service.format != Service.AUDIO: service_element.setAttribute('format', service.format)
-            service_id_element = doc.createElement('serviceID')
-            for i, id in enumerate(service.ids):
-                service_id_element.setAttribute('id', str(id))
-                service_id_element.setAttribute('type', 'secondary' if i else 'primary') 
-                service_element.appendChild(service_id_element)
-            if service.bitrate is not None: 
-                service_element.setAttribute('bitrate', str(service.bitrate))
-            # names
-            for name in service.names:
-                service_element.appendChild(build_name(doc, name))
-            # media
-            for media in service.media:
-                service_element.appendChild(build_mediagroup(doc, media)) 
-            # genre
-            for genre in service.genres:
-                service_element.appendChild(build_genre(doc, genre))    
-            # links
-            for link in service.links:
-                service_element.appendChild(build_link(doc, link))                    
-            # keywords
-            if len(service.keywords) > 0:
-                keywords_element = doc.createElement('keywords')
-                service_element.appendChild(keywords_element)
-                keywords_element.appendChild(doc.createCDATASection(', '.join(service.keywords)))
-                
+            service_element = build_service(doc, service)
             listener.on_element(doc, service, service_element)
             ensemble_element.appendChild(service_element)
                 
@@ -117,122 +204,440 @@ def marshall_serviceinfo(info, listener=MarshallListener(), indent=None, **kwarg
         info_element.appendChild(ensemble_element)
         
     listener.on_element(doc, info, info_element)
+    if compact: compact_document(doc)
         
     if indent:
         return doc.toprettyxml(indent=indent, encoding='UTF-8')
     else:
         return doc.toxml('UTF-8')
 
-def marshall_epg(epg, listener=MarshallListener(), indent=None):
+def marshall_epg(epg, listener=MarshallListener(), indent=None, backend=None, compact=False, cache=None):
     """
     Encodes an EPG into XML
     
     :epg: EPG object to encode
     :listener: Observer notified when an element is created
     :indent: Characters to use for XML indentation
+    :backend: :const:STDLIB to build the document with minidom or :const:LXML 
+    with lxml, otherwise the default :data:backend
+    :compact: Whether to leave out what a reader can infer, see :func:compact_element
+    :cache: :class:ProgrammeCache of the programme elements written by previous 
+    marshalls of the schedule, to take those that are unchanged from. The document
+    is then written as :func:write_epg writes it, whatever the backend.
     """
     
-    doc = xml.dom.minidom.Document()
+    if cache is not None:
+        import StringIO
+        f = StringIO.StringIO()
+        write_epg(epg, f, listener, indent, compact, cache)
+        return f.getvalue()
     
-    schedule = epg.schedule
+    doc = create_document(backend)
     
     # epg
-    epg_element = doc.createElement('epg')
-    epg_element.namespaceURI = SCHEDULE_NS
+    epg_element = build_epg_element(doc, epg)
     doc.appendChild(epg_element)
     
-    # fudge the namespaces in there
-    epg_element.setAttribute('xmlns', SCHEDULE_NS)
-    epg_element.setAttribute('xmlns:epg', TYPES_NS)
-    epg_element.setAttribute('xmlns:xsi', XSI_NS)
-    epg_element.setAttribute('xsi:schemaLocation', SCHEDULE_SCHEMA_LOCATION)
-    epg_element.setAttribute('xml:lang', 'en')
-    
-    epg_element.setAttribute('system', epg.type)
-    
     # schedule
-    schedule_element = doc.createElement('schedule')
+    schedule = epg.schedule
+    schedule_element = build_schedule_element(doc, schedule)
     epg_element.appendChild(schedule_element)
-    schedule_element.setAttribute('version', str(schedule.version))
-    schedule.created = schedule.created.replace(microsecond=0)
-    schedule_element.setAttribute('creationTime', schedule.created.isoformat())
-    if schedule.originator is not None:
-        schedule_element.setAttribute('originator', schedule.originator)
         
     # scope
     scope = schedule.get_scope()
     if scope is not None:
-        scope_element = doc.createElement('scope')
-        scope_element.setAttribute('startTime', scope.start.isoformat())
-        scope_element.setAttribute('stopTime', scope.end.isoformat())
-        for service in scope.services:
-            service_scope_element = doc.createElement('serviceScope')
-            service_scope_element.setAttribute('id', str(service))
-            scope_element.appendChild(service_scope_element)
-            listener.on_element(doc, service, service_scope_element)
-        listener.on_element(doc, scope, scope_element)
-        schedule_element.appendChild(scope_element)
+        schedule_element.appendChild(build_scope(doc, scope, listener))
     
     # programmes
     for programme in schedule.programmes:
-        programme_element = doc.createElement('programme')
-        programme_element.setAttribute('shortId', str(programme.shortcrid))
-        if programme.crid is not None:
-            programme_element.setAttribute('id', str(programme.crid))
-        if programme.version is not None:
-            programme_element.setAttribute('version', str(programme.version))
-        if programme.recommendation:
-            programme_element.setAttribute('recommendation', 'yes')
-        if not programme.onair:
-            programme_element.setAttribute('broadcast', 'off-air')
-        if programme.bitrate is not None:
-            programme_element.setAttribute('bitrate', str(programme.bitrate)) 
-        # names
-        for name in programme.names:
-            child = build_name(doc, name)
-            listener.on_element(doc, name, child)
-            programme_element.appendChild(child)
-        # locations
-        for location in programme.locations:
-            child = build_location(doc, location, listener)
-            listener.on_element(doc, location, child)
-            programme_element.appendChild(child)    
-        # media
-        for media in programme.media:
-            child = build_mediagroup(doc, media, 'epg')
-            listener.on_element(doc, media, child)
-            programme_element.appendChild(child)     
-        # genre
-        for genre in programme.genres:
-            child = build_genre(doc, genre)
-            listener.on_element(doc, genre, child)
-            programme_element.appendChild(child)    
-        # membership
-        for membership in programme.memberships:
-            child = build_membership(doc, membership)
-            listener.on_element(doc, membership, child)
-            programme_element.appendChild(child)    
-        # link
-        for link in programme.links:
-            child = build_link(doc, link)
-            listener.on_element(doc, link, child)
-            programme_element.appendChild(child)      
-        # events
-        for event in programme.events:
-            child = build_programme_event(doc, event, listener)
-            listener.on_element(doc, event, child)
-            programme_element.appendChild(child) 
-            
+        programme_element = build_programme(doc, programme, listener)
         schedule_element.appendChild(programme_element)
-            
         listener.on_element(doc, programme, programme_element)
         
     listener.on_element(doc, epg, epg_element)
+    if compact: compact_document(doc)
         
     if indent is not None:
         return doc.toprettyxml(indent=indent, encoding='UTF-8')
     else:
         return doc.toxml('UTF-8')
+
+def write(obj, f, listener=MarshallListener(), **kwargs):
+    """Writes an :class:Epg or :class:ServiceInfo as its XML document to a file-like object"""
+    
+    if isinstance(obj, ServiceInfo): return write_serviceinfo(obj, f, listener, **kwargs)
+    elif isinstance(obj, Epg): return write_epg(obj, f, listener, **kwargs)
+    else: raise ValueError('neither a ServiceInfo nor an Epg be')
+
+def write_serviceinfo(info, f, listener=MarshallListener(), indent=None, compact=False, **kwargs):
+    """
+    Writes service information as XML to a file-like object, one service at a time.
+    The output is the same as :func:marshall_serviceinfo. 
+    
+    The listener is notified of the serviceInformation and ensemble elements before 
+    their services are written, so any children it adds to them come first.
+    
+    :info: ServiceInfo object to encode
+    :f: File-like object to write the UTF-8 encoded document to
+    :listener: Observer notified when an element is created
+    :indent: Characters to use for XML indentation
+    :compact: Whether to leave out what a reader can infer, see :func:compact_element
+    """
+    
+    writer = XmlWriter(f, indent or None, compact=compact)
+    doc = xml.dom.minidom.Document()
+    
+    info_element = build_serviceinfo_element(doc, info)
+    listener.on_element(doc, info, info_element)
+    if not info.ensembles and not info_element.childNodes: return writer.write(info_element)
+    writer.start(info_element)
+    
+    for ensemble in info.ensembles:
+        ensemble_element = build_ensemble_element(doc, ensemble)
+        listener.on_element(doc, ensemble, ensemble_element)
+        if not ensemble.services and not ensemble_element.childNodes:
+            writer.write(ensemble_element)
+            continue
+        writer.start(ensemble_element)
+        for service in ensemble.services:
+            service_element = build_service(doc, service)
+            listener.on_element(doc, service, service_element)
+            writer.write(service_element)
+        writer.end(ensemble_element)
+        
+    writer.end(info_element)
+
+def write_epg(epg, f, listener=MarshallListener(), indent=None, compact=False, cache=None):
+    """
+    Writes an EPG as XML to a file-like object, one programme at a time, so that
+    only a single programme is held as a DOM at once. The output is the same as 
+    :func:marshall_epg.
+    
+    The listener is notified of the epg element before its schedule is written, 
+    so any children it adds to it come first. It is not notified of the elements
+    of programmes taken from a cache, so should add the same to a programme each
+    time it is written.
+    
+    :epg: EPG object to encode
+    :f: File-like object to write the UTF-8 encoded document to
+    :listener: Observer notified when an element is created
+    :indent: Characters to use for XML indentation
+    :compact: Whether to leave out what a reader can infer, see :func:compact_element
+    :cache: :class:ProgrammeCache of the programme elements written by previous 
+    calls for the schedule, to take those that are unchanged from
+    """
+    
+    writer = XmlWriter(f, indent, compact=compact)
+    doc = xml.dom.minidom.Document()
+    
+    epg_element = build_epg_element(doc, epg)
+    listener.on_element(doc, epg, epg_element)
+    writer.start(epg_element)
+    
+    schedule = epg.schedule
+    schedule_element = build_schedule_element(doc, schedule)
+    scope = schedule.get_scope()
+    if scope is None and not schedule.programmes: 
+        writer.write(schedule_element)
+    else:
+        writer.start(schedule_element)
+        if scope is not None:
+            writer.write(build_scope(doc, scope, listener))
+        if cache is None:
+            for programme in schedule.programmes:
+                writer.write(build_programme_element(doc, programme, listener))
+        else:
+            # the elements written depend on the listener and the formatting
+            cache.start((listener, indent, compact))
+            encode = lambda programme: writer.render(build_programme_element(doc, programme, listener))
+            for programme in schedule.programmes:
+                writer.write_text(cache.get(programme, encode))
+            cache.finish()
+        writer.end(schedule_element)
+    
+    writer.end(epg_element)
+    
+def escape(data):
+    return data.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;').replace('>', '&gt;')
+
+class XmlWriter:
+    """Writes a document incrementally, as the enclosing elements are started and 
+    ended and their children written whole, formatted as minidom would"""
+    
+    def __init__(self, f, indent=None, encoding='UTF-8', compact=False):
+        self.writer = codecs.getwriter(encoding)(f)
+        self.addindent = indent or ''
+        self.newl = '\n' if indent is not None else ''
+        self.depth = 0
+        self.compact = compact
+        self.inherited = [{}]
+        self.writer.write('<?xml version="1.0" encoding="%s"?>%s' % (encoding, self.newl))
+        
+    def start(self, element):
+        """Writes the start tag of an element, followed by any children it already has"""
+        
+        if self.compact: self.inherited.append(compact_element(element, self.inherited[-1]))
+        self.writer.write('%s<%s' % (self.addindent * self.depth, element.tagName))
+        for name, value in sorted(element.attributes.items()):
+            self.writer.write(' %s="%s"' % (name, escape(value)))
+        self.writer.write('>%s' % self.newl)
+        self.depth += 1
+        for child in element.childNodes:
+            child.writexml(self.writer, self.addindent * self.depth, self.addindent, self.newl)
+        
+    def write(self, element):
+        """Writes a complete element and releases it"""
+        
+        if self.compact: compact_element(element, self.inherited[-1])
+        element.writexml(self.writer, self.addindent * self.depth, self.addindent, self.newl)
+        element.unlink()
+        
+    def render(self, element):
+        """Returns the text :meth:write would write for a complete element, and 
+        releases it"""
+        
+        import StringIO
+        f = StringIO.StringIO()
+        if self.compact: compact_element(element, self.inherited[-1])
+        element.writexml(f, self.addindent * self.depth, self.addindent, self.newl)
+        element.unlink()
+        return f.getvalue()
+        
+    def write_text(self, text):
+        """Writes text rendered by :meth:render"""
+        
+        self.writer.write(text)
+        
+    def end(self, element):
+        """Writes the end tag of an element"""
+        
+        if self.compact: self.inherited.pop()
+        self.depth -= 1
+        self.writer.write('%s</%s>%s' % (self.addindent * self.depth, element.tagName, self.newl))
+        element.unlink()
+
+# declarations that descendants inherit
+INHERITED_ATTRIBUTES = ('xml:lang', 'xmlns', 'xmlns:epg', 'xmlns:xsi')
+# attributes holding a date and time
+TIME_ATTRIBUTES = ('time', 'actualTime', 'creationTime', 'startTime', 'stopTime', 'expiryTime')
+# attributes left at the value the schemas default them to, by element
+DEFAULT_ATTRIBUTES = {
+    'programme' : (('version', '1'),),
+    'serviceID' : (('type', 'primary'),),
+}
+# elements that say nothing when they hold no text and no attributes
+OPTIONAL_ELEMENTS = ('mediaDescription', 'keywords')
+
+def compact_element(element, inherited={}):
+    """
+    Compacts a minidom element and its descendants in place, leaving out what a 
+    reader can infer:
+    
+    * namespace and xml:lang declarations matching those inherited from the ancestors
+    * attributes at their schema default, such as a programme version of 1
+    * mediaDescription and keywords elements with no text or attributes
+    * CDATA sections, written as escaped text instead
+    * the +00:00 offset of UTC times, written as Z instead
+    
+    :element: Element to compact
+    :inherited: Declarations made by the ancestors of the element, by attribute name
+    :returns: Declarations in effect for the children of the element
+    """
+    
+    for name, value in element.attributes.items():
+        if name in INHERITED_ATTRIBUTES:
+            if inherited.get(name) == value: 
+                element.removeAttribute(name)
+            else:
+                inherited = dict(inherited)
+                inherited[name] = value
+        elif name in TIME_ATTRIBUTES and value.endswith('+00:00'):
+            element.setAttribute(name, value[:-6] + 'Z')
+    for name, value in DEFAULT_ATTRIBUTES.get(local_name(element.tagName), ()):
+        if element.getAttribute(name) == value: element.removeAttribute(name)
+        
+    for child in list(element.childNodes):
+        if child.nodeType == child.CDATA_SECTION_NODE:
+            element.replaceChild(element.ownerDocument.createTextNode(child.data), child)
+        elif child.nodeType == child.ELEMENT_NODE:
+            if local_name(child.tagName) in OPTIONAL_ELEMENTS and is_blank(child):
+                element.removeChild(child).unlink()
+            else:
+                compact_element(child, inherited)
+    return inherited
+
+def local_name(name):
+    return name[name.find(':') + 1:]
+
+def is_blank(element):
+    """Returns whether a minidom element and its descendants have no attributes and no text"""
+    
+    if element.hasAttributes(): return False
+    for child in element.childNodes:
+        if child.nodeType == child.ELEMENT_NODE:
+            if not is_blank(child): return False
+        elif child.nodeType in (child.TEXT_NODE, child.CDATA_SECTION_NODE):
+            if child.data.strip(): return False
+    return True
+
+def compact_document(doc):
+    """Compacts a whole document, built by either backend, as :func:compact_element"""
+    
+    if isinstance(doc, LxmlDocument): doc.compact()
+    else: compact_element(doc.documentElement)
+
+def build_serviceinfo_element(doc, info):
+    info_element = doc.createElement('serviceInformation')
+    info_element.namespaceURI = SCHEDULE_NS
+    if info.version > 1: info_element.setAttribute('version', str(info.version))
+    if info.created: info_element.setAttribute('creationTime', info.created.replace(microsecond=0).isoformat())
+    if info.originator: info_element.setAttribute('originator', info.originator)
+    if info.provider: info_element.setAttribute('serviceProvider', info.provider)   
+    if info.type != ServiceInfo.DAB: info_element.setAttribute('system', info.type)
+    
+    # fudge the namespaces in there
+    info_element.setAttribute('xmlns', SCHEDULE_NS)
+    info_element.setAttribute('xmlns:epg', TYPES_NS)
+    info_element.setAttribute('xmlns:xsi', XSI_NS)
+    info_element.setAttribute('xsi:schemaLocation', SERVICEINFO_SCHEMA_LOCATION)
+    info_element.setAttribute('xml:lang', 'en')
+    return info_element
+
+def build_ensemble_element(doc, ensemble):
+    """Builds an ensemble element with its names and frequencies but not its services"""
+    
+    ensemble_element = doc.createElement('ensemble')
+    ensemble_element.setAttribute('id', str(ensemble))
+    if ensemble.version > 1: ensemble_element.setAttribute('version', str(ensemble.version))
+    for name in ensemble.names:
+        ensemble_element.appendChild(build_name(doc, name))
+    for i, frequency in enumerate(ensemble.frequencies):
+        frequency_element = doc.createElement('frequency')
+        if i > 0: frequency_element.setAttribute('type', 'secondary')
+        frequency_element.setAttribute('kHz', str(frequency))
+        ensemble_element.appendChild(frequency_element)
+    return ensemble_element
+
+def build_service(doc, service):
+    service_element = doc.createElement('service')
+    if service.version > 1: service_element.setAttribute('version', str(service.version))
+    if service.format != Service.AUDIO: service_element.setAttribute('format', service.format)
+    service_id_element = doc.createElement('serviceID')
+    for i, id in enumerate(service.ids):
+        service_id_element.setAttribute('id', str(id))
+        service_id_element.setAttribute('type', 'secondary' if i else 'primary') 
+        service_element.appendChild(service_id_element)
+    if service.bitrate is not None: 
+        service_element.setAttribute('bitrate', str(service.bitrate))
+    # names
+    for name in service.names:
+        service_element.appendChild(build_name(doc, name))
+    # media
+    for media in service.media:
+        service_element.appendChild(build_mediagroup(doc, media)) 
+    # genre
+    for genre in service.genres:
+        service_element.appendChild(build_genre(doc, genre))    
+    # links
+    for link in service.links:
+        service_element.appendChild(build_link(doc, link))                    
+    # keywords
+    if len(service.keywords) > 0:
+        keywords_element = doc.createElement('keywords')
+        service_element.appendChild(keywords_element)
+        keywords_element.appendChild(doc.createCDATASection(', '.join(service.keywords)))
+    return service_element
+
+def build_epg_element(doc, epg):
+    epg_element = doc.createElement('epg')
+    epg_element.namespaceURI = SCHEDULE_NS
+    
+    # fudge the namespaces in there
+    epg_element.setAttribute('xmlns', SCHEDULE_NS)
+    epg_element.setAttribute('xmlns:epg', TYPES_NS)
+    epg_element.setAttribute('xmlns:xsi', XSI_NS)
+    epg_element.setAttribute('xsi:schemaLocation', SCHEDULE_SCHEMA_LOCATION)
+    epg_element.setAttribute('xml:lang', 'en')
+    
+    epg_element.setAttribute('system', epg.type)
+    return epg_element
+
+def build_schedule_element(doc, schedule):
+    schedule_element = doc.createElement('schedule')
+    schedule_element.setAttribute('version', str(schedule.version))
+    schedule.created = schedule.created.replace(microsecond=0)
+    schedule_element.setAttribute('creationTime', schedule.created.isoformat())
+    if schedule.originator is not None:
+        schedule_element.setAttribute('originator', schedule.originator)
+    return schedule_element
+
+def build_scope(doc, scope, listener):
+    scope_element = doc.createElement('scope')
+    scope_element.setAttribute('startTime', scope.start.isoformat())
+    scope_element.setAttribute('stopTime', scope.end.isoformat())
+    for service in scope.services:
+        service_scope_element = doc.createElement('serviceScope')
+        service_scope_element.setAttribute('id', str(service))
+        scope_element.appendChild(service_scope_element)
+        listener.on_element(doc, service, service_scope_element)
+    listener.on_element(doc, scope, scope_element)
+    return scope_element
+
+def build_programme_element(doc, programme, listener):
+    """Builds a programme element, having notified the listener of it"""
+    programme_element = build_programme(doc, programme, listener)
+    listener.on_element(doc, programme, programme_element)
+    return programme_element
+
+def build_programme(doc, programme, listener):
+    programme_element = doc.createElement('programme')
+    programme_element.setAttribute('shortId', str(programme.shortcrid))
+    if programme.crid is not None:
+        programme_element.setAttribute('id', str(programme.crid))
+    if programme.version is not None:
+        programme_element.setAttribute('version', str(programme.version))
+    if programme.recommendation:
+        programme_element.setAttribute('recommendation', 'yes')
+    if not programme.onair:
+        programme_element.setAttribute('broadcast', 'off-air')
+    if programme.bitrate is not None:
+        programme_element.setAttribute('bitrate', str(programme.bitrate)) 
+    # names
+    for name in programme.names:
+        child = build_name(doc, name)
+        listener.on_element(doc, name, child)
+        programme_element.appendChild(child)
+    # locations
+    for location in programme.locations:
+        child = build_location(doc, location, listener)
+        listener.on_element(doc, location, child)
+        programme_element.appendChild(child)    
+    # media
+    for media in programme.media:
+        child = build_mediagroup(doc, media, 'epg')
+        listener.on_element(doc, media, child)
+        programme_element.appendChild(child)     
+    # genre
+    for genre in programme.genres:
+        child = build_genre(doc, genre)
+        listener.on_element(doc, genre, child)
+        programme_element.appendChild(child)    
+    # membership
+    for membership in programme.memberships:
+        child = build_membership(doc, membership)
+        listener.on_element(doc, membership, child)
+        programme_element.appendChild(child)    
+    # link
+    for link in programme.links:
+        child = build_link(doc, link)
+        listener.on_element(doc, link, child)
+        programme_element.appendChild(child)      
+    # events
+    for event in programme.events:
+        child = build_programme_event(doc, event, listener)
+        listener.on_element(doc, event, child)
+        programme_element.appendChild(child) 
+    return programme_element
     
 def build_name(doc, name):
     name_element = None
@@ -327,7 +732,7 @@ def build_programme_event(doc, event, listener):
         event_element.setAttribute('version', str(event.version))
     if event.recommendation is not False:
         event_element.setAttribute('recommendation', 'yes')
-    if not event.onair is not None:
+    if not event.onair:
         event_element.setAttribute('broadcast', 'off-air')
     if event.bitrate is not None:
         event_element.setAttribute('bitrate', str(event.bitrate))
@@ -352,7 +757,64 @@ def build_programme_event(doc, event, listener):
              
     return event_element
     
+iso_cache_size = 4096
+parsed_datetimes = {}
+parsed_durations = {}
+iso_periods = {}
+timezones = {}
+
+datetime_pattern = re.compile(r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d{1,6}))?(Z|[+-]\d\d:\d\d)?$')
+duration_pattern = re.compile(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?$')
+
+def cache_iso(cache, key, value):
+    if len(cache) >= iso_cache_size: cache.clear()
+    cache[key] = value
+
+def get_tzinfo(designator):
+    """Returns the shared timezone for an ISO 8601 designator, as isodate builds it"""
+    tzinfo = timezones.get(designator)
+    if tzinfo is None:
+        tzinfo = timezones[designator] = isodate.parse_tzinfo(designator)
+    return tzinfo
+
+def parse_datetime(string):
+    """Parses an ISO 8601 date and time to the same value as :func:isodate.parse_datetime,
+    directly for the extended format used by the EPG and through isodate otherwise.
+    Recent values are cached."""
+    
+    value = parsed_datetimes.get(string)
+    if value is None:
+        match = datetime_pattern.match(string)
+        if match is None: 
+            value = isodate.parse_datetime(string)
+        else:
+            year, month, day, hour, minute, second, fraction, designator = match.groups()
+            value = datetime.datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                                      int(fraction.ljust(6, '0')) if fraction else 0,
+                                      get_tzinfo(designator) if designator else None)
+        cache_iso(parsed_datetimes, string, value)
+    return value
+
+def parse_duration(string):
+    """Parses an ISO 8601 duration to the same value as :func:isodate.parse_duration,
+    directly for the hours, minutes and seconds used by the EPG and through isodate
+    otherwise. Recent values are cached."""
+    
+    value = parsed_durations.get(string)
+    if value is None:
+        match = duration_pattern.match(string)
+        if match is None or match.lastindex is None: 
+            value = isodate.parse_duration(string)
+        else:
+            hours, minutes, seconds = match.groups()
+            value = datetime.timedelta(hours=int(hours or 0), minutes=int(minutes or 0), seconds=int(seconds or 0))
+        cache_iso(parsed_durations, string, value)
+    return value
+
 def get_iso_period(duration):
+    result = iso_periods.get(duration)
+    if result is not None: return result
+    key = duration
     if isinstance(duration, int): duration = datetime.timedelta(seconds=duration)
     hours = (duration.days * 24) + duration.seconds / (60 * 60)
     minutes = (duration.seconds - hours * 60 * 60) / 60
@@ -362,6 +824,7 @@ def get_iso_period(duration):
     if minutes > 0: result += '%dM' % minutes
     if seconds > 0: result += '%dS' % seconds
     if hours == 0 and minutes == 0 and seconds == 0: result += '0S'
+    cache_iso(iso_periods, key, result)
     return result
 
 def get_schedule_filename(date, id):
@@ -376,7 +839,7 @@ def get_serviceinfo_filename(date, channel):
 
 def parse_serviceinfo(root):
     service_info = ServiceInfo()
-    if root.attrib.has_key('creationTime'): service_info.created = isodate.parse_datetime(root.attrib['creationTime'])
+    if root.attrib.has_key('creationTime'): service_info.created = parse_datetime(root.attrib['creationTime'])
     if root.attrib.has_key('version'): service_info.version = int(root.attrib['version'])
     if root.attrib.has_key('originator'): service_info.originator = root.attrib['originator']
     if root.attrib.has_key('serviceProvider'): service_info.provider = root.attrib['serviceProvider']
@@ -389,17 +852,17 @@ def parse_serviceinfo(root):
     return service_info
 
 def parse_time(timeElement):
-    if timeElement.tag == '{%s}time' % EPG_NS:
-        time = Time(isodate.parse_datetime(timeElement.attrib['time']),
-                    isodate.parse_duration(timeElement.attrib['duration']),
-                    isodate.parse_datetime(timeElement.attrib.get('actualTime')) if timeElement.attrib.has_key('actualTime') else None,
-                    isodate.parse_duration(timeElement.attrib.get('actualDuration')) if timeElement.attrib.has_key('actualDuration') else None)
+    if timeElement.tag == TIME:
+        time = Time(parse_datetime(timeElement.attrib['time']),
+                    parse_duration(timeElement.attrib['duration']),
+                    parse_datetime(timeElement.attrib.get('actualTime')) if timeElement.attrib.has_key('actualTime') else None,
+                    parse_duration(timeElement.attrib.get('actualDuration')) if timeElement.attrib.has_key('actualDuration') else None)
         return time
-    if timeElement.tag == '{%s}relativeTime' % EPG_NS:
-        time = RelativeTime(isodate.parse_duration(timeElement.attrib['time']),
-                    isodate.parse_duration(timeElement.attrib['duration']),
-                    isodate.parse_duration(timeElement.attrib.get('actualTime')) if timeElement.attrib.has_key('actualTime') else None,
-                    isodate.parse_duration(timeElement.attrib.get('actualDuration')) if timeElement.attrib.has_key('actualDuration') else None)
+    if timeElement.tag == RELATIVE_TIME:
+        time = RelativeTime(parse_duration(timeElement.attrib['time']),
+                    parse_duration(timeElement.attrib['duration']),
+                    parse_duration(timeElement.attrib.get('actualTime')) if timeElement.attrib.has_key('actualTime') else None,
+                    parse_duration(timeElement.attrib.get('actualDuration')) if timeElement.attrib.has_key('actualDuration') else None)
         return time
     else:
         raise ValueError('unknown time element: %s' % timeElement)
@@ -410,84 +873,58 @@ def parse_bearer(bearerElement):
 
 def parse_location(locationElement):
     location = Location()
-    for timeElement in locationElement.findall('{%s}time' % EPG_NS): location.times.append(parse_time(timeElement))
-    for timeElement in locationElement.findall('{%s}relativeTime' % EPG_NS): location.times.append(parse_time(timeElement))
-    for bearerElement in locationElement.findall('{%s}bearer' % EPG_NS): location.bearers.append(parse_bearer(bearerElement))
+    parse_children(location, locationElement, location_handlers)
     return location 
 
 def parse_programme_event(programmeEventElement):
-    event = ProgrammeEvent(programmeEventElement.attrib['shortId'])
+    event = ProgrammeEvent(int(programmeEventElement.attrib['shortId']))
     if programmeEventElement.attrib.has_key('id'): event.crid = programmeEventElement.attrib['id']
     if programmeEventElement.attrib.has_key('version'): event.version = int(programmeEventElement.attrib['version'])
     if programmeEventElement.attrib.has_key('recommendation'): event.recommendation = bool(programmeEventElement.attrib['recommendation'])
     if programmeEventElement.attrib.has_key('broadcast'): event.onair = True if programmeEventElement.attrib['broadcast'] == 'on-air' else False
     if programmeEventElement.attrib.has_key('bitrate'): event.bitrate = int(programmeEventElement.attrib['bitrate'])
 
-    for nameElement in programmeEventElement.findall("{%s}shortName" % EPG_NS): event.names.append(parse_name(nameElement))
-    for nameElement in programmeEventElement.findall("{%s}mediumName" % EPG_NS): event.names.append(parse_name(nameElement))
-    for nameElement in programmeEventElement.findall("{%s}longName" % EPG_NS): event.names.append(parse_name(nameElement))
-    for mediaElement in programmeEventElement.findall("{%s}mediaDescription" % EPG_NS): event.media.extend(parse_media(mediaElement))
-    for locationElement in programmeEventElement.findall("{%s}location" % EPG_NS): event.locations.append(parse_location(locationElement))
-    for genreElement in programmeEventElement.findall("{%s}genre" % EPG_NS): event.genres.append(parse_genre(genreElement))
-    for linkElement in programmeEventElement.findall("{%s}link" % SCHEDULE_NS): event.links.append(parse_link(linkElement))
-    for keywordsElement in programmeEventElement.findall("{%s}keywords" % SCHEDULE_NS): event.keywords.extend(parse_keywords(keywordsElement))    
-    
+    parse_children(event, programmeEventElement, programme_event_handlers)
     return event
 
 def parse_programme(programmeElement):
-    programme = Programme(programmeElement.attrib['shortId'])
+    programme = Programme(int(programmeElement.attrib['shortId']))
     if programmeElement.attrib.has_key('id'): programme.crid = programmeElement.attrib['id']
     if programmeElement.attrib.has_key('version'): programme.version = int(programmeElement.attrib['version'])
     if programmeElement.attrib.has_key('recommendation'): programme.recommendation = bool(programmeElement.attrib['recommendation'])
     if programmeElement.attrib.has_key('broadcast'): programme.onair = True if programmeElement.attrib['broadcast'] == 'on-air' else False
     if programmeElement.attrib.has_key('bitrate'): programme.bitrate = int(programmeElement.attrib['bitrate'])
 
-    for nameElement in programmeElement.findall("{%s}shortName" % EPG_NS): programme.names.append(parse_name(nameElement))
-    for nameElement in programmeElement.findall("{%s}mediumName" % EPG_NS): programme.names.append(parse_name(nameElement))
-    for nameElement in programmeElement.findall("{%s}longName" % EPG_NS): programme.names.append(parse_name(nameElement))
-    for mediaElement in programmeElement.findall("{%s}mediaDescription" % EPG_NS): programme.media.extend(parse_media(mediaElement))
-    for locationElement in programmeElement.findall("{%s}location" % EPG_NS): programme.locations.append(parse_location(locationElement))
-    for genreElement in programmeElement.findall("{%s}genre" % EPG_NS): programme.genres.append(parse_genre(genreElement))
-    for linkElement in programmeElement.findall("{%s}link" % SCHEDULE_NS): programme.links.append(parse_link(linkElement))
-    for keywordsElement in programmeElement.findall("{%s}keywords" % SCHEDULE_NS): programme.keywords.extend(parse_keywords(keywordsElement))    
-    
-    for programmeEventElement in programmeElement.findall("{%s}programmeEvent" % EPG_NS): programme.events.append(parse_programme_event(programmeEventElement))
-    
+    parse_children(programme, programmeElement, programme_handlers)
     return programme
 
-def parse_schedule(scheduleElement):
+def parse_schedule_attributes(scheduleElement):
     schedule = Schedule()
-    if scheduleElement.attrib.has_key('creationTime'): schedule.created = isodate.parse_datetime(scheduleElement.attrib['creationTime'])
+    if scheduleElement.attrib.has_key('creationTime'): schedule.created = parse_datetime(scheduleElement.attrib['creationTime'])
     if scheduleElement.attrib.has_key('version'): schedule.version = int(scheduleElement.attrib['version'])
     if scheduleElement.attrib.has_key('originator'): schedule.originator = scheduleElement.attrib['originator']
-    
-    for programmeElement in scheduleElement.findall('{%s}programme' % SCHEDULE_NS):
-        schedule.programmes.append(parse_programme(programmeElement))
+    return schedule
+
+def parse_schedule(scheduleElement):
+    schedule = parse_schedule_attributes(scheduleElement)
+    schedule.programmes.extend(parse_programme(programmeElement) for programmeElement in scheduleElement.iterfind(PROGRAMME))
     return schedule
 
 def parse_epg(root):
     if root.attrib.has_key('system') and root.attrib['system'] == 'DRM': raise Exception('parser only supports DAB EPG')
-    schedule = parse_schedule(root.find("{%s}schedule" % SCHEDULE_NS))
+    schedule = parse_schedule(root.find(SCHEDULE))
     epg = Epg(schedule)
     return epg
 
 def parse_name(nameElement):
-    if nameElement.tag == '{%s}shortName' % EPG_NS:
-        return ShortName(nameElement.text)
-    elif nameElement.tag == '{%s}mediumName' % EPG_NS:
-        return MediumName(nameElement.text)
-    elif nameElement.tag == '{%s}longName' % EPG_NS:
-        return LongName(nameElement.text)
-    else:
-        raise ValueError('unknown name element: %s' % nameElement)
+    name_type = name_types.get(nameElement.tag)
+    if name_type is None: raise ValueError('unknown name element: %s' % nameElement)
+    return name_type(nameElement.text)
     
 def parse_description(descriptionElement):
-    if descriptionElement.tag == '{%s}shortDescription' % EPG_NS:
-        return ShortDescription(descriptionElement.text)
-    elif descriptionElement.tag == '{%s}longDescription' % EPG_NS:
-        return LongDescription(descriptionElement.text)   
-    else:
-        raise ValueError('unknown description element: %s' % descriptionElement)
+    description_type = description_types.get(descriptionElement.tag)
+    if description_type is None: raise ValueError('unknown description element: %s' % descriptionElement)
+    return description_type(descriptionElement.text)
     
 def parse_multimedia(multimediaElement):
     multimedia = Multimedia(multimediaElement.attrib['url'])
@@ -508,14 +945,12 @@ def parse_multimedia(multimediaElement):
     
 def parse_media(mediaElement):
     media = []
-    for descriptionElement in mediaElement.findall("{%s}shortDescription" % EPG_NS): media.append(parse_description(descriptionElement))    
-    for descriptionElement in mediaElement.findall("{%s}longDescription" % EPG_NS): media.append(parse_description(descriptionElement)) 
-    for multimediaElement in mediaElement.findall("{%s}multimedia" % EPG_NS): media.append(parse_multimedia(multimediaElement))
+    parse_children(media, mediaElement, media_handlers)
     return media
 
 def parse_genre(genreElement):
     genre = Genre(genreElement.attrib['href'])
-    genre.name = genreElement.findtext('{%s}name' % EPG_NS)
+    genre.name = genreElement.findtext(GENRE_NAME)
     return genre  
 
 def parse_link(linkElement):
@@ -525,14 +960,14 @@ def parse_link(linkElement):
     if linkElement.attrib.has_key('mimeType'):
         link.mimetype = linkElement.attrib['mimeType']    
     if linkElement.attrib.has_key('expiryTime'):
-        link.expiry = isodate.parse_datetime(linkElement.attrib['expiryTime']) 
+        link.expiry = parse_datetime(linkElement.attrib['expiryTime']) 
     return link
         
 def parse_keywords(keywordsElement):
     return map(lambda x: x.strip(), keywordsElement.text.split(','))
     
 def parse_service(serviceElement):
-    id = ContentId.fromstring(serviceElement.find("{%s}serviceID" % SERVICEINFO_NS).attrib['id'])
+    id = ContentId.fromstring(serviceElement.find(SERVICE_ID).attrib['id'])
     service = Service(id)
     
     # attributes
@@ -540,41 +975,223 @@ def parse_service(serviceElement):
     if serviceElement.attrib.has_key('bitrate'): service.bitrate = int(serviceElement.attrib['bitrate'])
     
     # subelements
-    for nameElement in serviceElement.findall("{%s}shortName" % EPG_NS): service.names.append(parse_name(nameElement))
-    for nameElement in serviceElement.findall("{%s}mediumName" % EPG_NS): service.names.append(parse_name(nameElement))
-    for nameElement in serviceElement.findall("{%s}longName" % EPG_NS): service.names.append(parse_name(nameElement))
-    for mediaElement in serviceElement.findall("{%s}mediaDescription" % SERVICEINFO_NS): service.media.extend(parse_media(mediaElement))
-    for genreElement in serviceElement.findall("{%s}genre" % EPG_NS): service.genres.append(parse_genre(genreElement))
-    for linkElement in serviceElement.findall("{%s}link" % SERVICEINFO_NS): service.links.append(parse_link(linkElement))
-    for keywordsElement in serviceElement.findall("{%s}keywords" % SERVICEINFO_NS): service.keywords.extend(parse_keywords(keywordsElement))
-    
+    parse_children(service, serviceElement, service_handlers)
     return service
 
 def parse_ensemble(ensembleElement):
     ensemble = Ensemble(ContentId.fromstring(ensembleElement.attrib['id']))
-    for nameElement in ensembleElement.findall("{%s}shortName" % SCHEDULE_NS): ensemble.names.append(parse_name(nameElement))
-    for nameElement in ensembleElement.findall("{%s}mediumName" % SCHEDULE_NS): ensemble.names.append(parse_name(nameElement))
-    for nameElement in ensembleElement.findall("{%s}longName" % SCHEDULE_NS): ensemble.names.append(parse_name(nameElement))
+    parse_children(ensemble, ensembleElement, ensemble_handlers)
+    return ensemble
+
+def parse_children(obj, element, handlers):
+    """Parses the children of an element onto an object in a single pass, with 
+    the handler for each child's tag. Children without a handler are ignored."""
     
-    for frequencyElement in ensembleElement.findall("{%s}frequency" % SERVICEINFO_NS):
-        ensemble.frequencies.append(int(frequencyElement.attrib['kHz']))
+    for child in element:
+        handler = handlers.get(child.tag)
+        if handler is not None: handler(obj, child)
         
-    for serviceElement in ensembleElement.findall("{%s}service" % SERVICEINFO_NS):
-        ensemble.services.append(parse_service(serviceElement))
-    return ensemble
+def appending(name, parse):
+    """Returns a handler that appends the parsed child to the named list of the object"""
+    return lambda obj, element: getattr(obj, name).append(parse(element))
+
+def extending(name, parse):
+    """Returns a handler that extends the named list of the object by the parsed child"""
+    return lambda obj, element: getattr(obj, name).extend(parse(element))
+
+EPG = '{%s}epg' % SCHEDULE_NS
+SCHEDULE = '{%s}schedule' % SCHEDULE_NS
+PROGRAMME = '{%s}programme' % SCHEDULE_NS
+TIME = '{%s}time' % EPG_NS
+RELATIVE_TIME = '{%s}relativeTime' % EPG_NS
+GENRE_NAME = '{%s}name' % EPG_NS
+SERVICE_ID = '{%s}serviceID' % SERVICEINFO_NS
+
+name_types = {
+    '{%s}shortName' % EPG_NS : ShortName,
+    '{%s}mediumName' % EPG_NS : MediumName,
+    '{%s}longName' % EPG_NS : LongName,
+}
+
+description_types = {
+    '{%s}shortDescription' % EPG_NS : ShortDescription,
+    '{%s}longDescription' % EPG_NS : LongDescription,
+}
+
+location_handlers = {
+    TIME : appending('times', parse_time),
+    RELATIVE_TIME : appending('times', parse_time),
+    '{%s}bearer' % EPG_NS : appending('bearers', parse_bearer),
+}
+
+media_handlers = {
+    '{%s}shortDescription' % EPG_NS : lambda media, element: media.append(parse_description(element)),
+    '{%s}longDescription' % EPG_NS : lambda media, element: media.append(parse_description(element)),
+    '{%s}multimedia' % EPG_NS : lambda media, element: media.append(parse_multimedia(element)),
+}
 
-def unmarshall(i):
+programme_event_handlers = dict([(tag, appending('names', parse_name)) for tag in name_types])
+programme_event_handlers.update({
+    '{%s}mediaDescription' % EPG_NS : extending('media', parse_media),
+    '{%s}location' % EPG_NS : appending('locations', parse_location),
+    '{%s}genre' % EPG_NS : appending('genres', parse_genre),
+    '{%s}link' % SCHEDULE_NS : appending('links', parse_link),
+    '{%s}keywords' % SCHEDULE_NS : extending('keywords', parse_keywords),
+})
+
+programme_handlers = dict(programme_event_handlers)
+programme_handlers['{%s}programmeEvent' % EPG_NS] = appending('events', parse_programme_event)
+
+service_handlers = dict([(tag, appending('names', parse_name)) for tag in name_types])
+service_handlers.update({
+    '{%s}mediaDescription' % SERVICEINFO_NS : extending('media', parse_media),
+    '{%s}genre' % EPG_NS : appending('genres', parse_genre),
+    '{%s}link' % SERVICEINFO_NS : appending('links', parse_link),
+    '{%s}keywords' % SERVICEINFO_NS : extending('keywords', parse_keywords),
+})
+
+ensemble_handlers = {
+    '{%s}shortName' % SCHEDULE_NS : appending('names', parse_name),
+    '{%s}mediumName' % SCHEDULE_NS : appending('names', parse_name),
+    '{%s}longName' % SCHEDULE_NS : appending('names', parse_name),
+    '{%s}frequency' % SERVICEINFO_NS : lambda ensemble, element: ensemble.frequencies.append(int(element.attrib['kHz'])),
+    '{%s}service' % SERVICEINFO_NS : appending('services', parse_service),
+}
+
+class ProgrammeBuilder(TreeBuilder):
+    """Builds the element tree of a PI document, turning each programme element 
+    into a :class:Programme as soon as it ends and dropping it from the tree"""
+    
+    def __init__(self):
+        TreeBuilder.__init__(self)
+        self.elements = []
+        self.schedule = None
+        self.programmes = collections.deque()
+        
+    def start(self, tag, attrs):
+        # lxml passes an immutable mapping for elements without attributes
+        if not isinstance(attrs, dict): attrs = dict(attrs)
+        element = TreeBuilder.start(self, tag, attrs)
+        self.elements.append(element)
+        if len(self.elements) == 1:
+            if tag != EPG: raise ValueError('not a PI document, root element is %s' % tag)
+            if attrs.get('system') == 'DRM': raise Exception('parser only supports DAB EPG')
+        elif tag == SCHEDULE:
+            self.schedule = parse_schedule_attributes(element)
+        return element
+    
+    def end(self, tag):
+        element = TreeBuilder.end(self, tag)
+        self.elements.pop()
+        if tag == PROGRAMME:
+            self.programmes.append(parse_programme(element))
+            self.elements[-1].remove(element)
+        return element
+
+class ProgrammeEvents:
+    """Reads the events of an lxml pull parser, turning each programme element into
+    a :class:Programme as :class:ProgrammeBuilder does while lxml builds the tree"""
+    
+    def __init__(self):
+        self.parser = lxml.etree.XMLPullParser(events=('start', 'end'), resolve_entities=False)
+        self.root = None
+        self.schedule = None
+        self.programmes = collections.deque()
+        
+    def feed(self, data):
+        self.parser.feed(data)
+        self.read_events()
+        
+    def close(self):
+        self.parser.close()
+        self.read_events()
+        
+    def read_events(self):
+        for event, element in self.parser.read_events():
+            if event == 'start':
+                if self.root is None:
+                    self.root = element
+                    if element.tag != EPG: raise ValueError('not a PI document, root element is %s' % element.tag)
+                    if element.get('system') == 'DRM': raise Exception('parser only supports DAB EPG')
+                elif element.tag == SCHEDULE:
+                    self.schedule = parse_schedule_attributes(element)
+            elif element.tag == PROGRAMME:
+                self.programmes.append(parse_programme(element))
+                element.getparent().remove(element)
+
+class ProgrammeParser:
+    """Parses a PI document fed to it in chunks, for example as they arrive on a 
+    socket. Programmes are read off as they complete, and only the programme being 
+    parsed is held as elements.
+    
+    The :class:Schedule, without its programmes, is available as `schedule` once 
+    its start tag has been fed.
+    """
+    
+    def __init__(self, backend=None):
+        if get_backend(backend) == LXML:
+            # lxml builds the elements itself and reports them as events
+            self.builder = self.parser = ProgrammeEvents()
+        else:
+            self.builder = ProgrammeBuilder()
+            self.parser = create_parser(self.builder, STDLIB)
+        
+    @property
+    def schedule(self):
+        return self.builder.schedule
+        
+    def feed(self, data):
+        self.parser.feed(data)
+        
+    def read_programmes(self):
+        """Generates the programmes completed since they were last read"""
+        programmes = self.builder.programmes
+        while programmes: yield programmes.popleft()
+        
+    def close(self):
+        self.parser.close()
+
+def iter_programmes(i, chunk_size=65536, backend=None):
+    """Generates each :class:Programme of a PI XML file in turn, reading it a chunk
+    at a time without building the whole document
+    
+    :param i: String or File object to read XML from
+    :type i: str, file
+    :param chunk_size: Number of bytes to read at a time
+    :type chunk_size: int
+    :param backend: :const:STDLIB to parse with ElementTree or :const:LXML with 
+    lxml, otherwise the default :data:backend
+    :type backend: str
+    """
+    
+    import StringIO
+    f = i if hasattr(i, 'read') else StringIO.StringIO(i)
+    parser = ProgrammeParser(backend)
+    while True:
+        data = f.read(chunk_size)
+        if not data: break
+        parser.feed(data)
+        for programme in parser.read_programmes(): yield programme
+    parser.close()
+    for programme in parser.read_programmes(): yield programme
+
+def unmarshall(i, backend=None):
     """Unmarshalls a PI or SI XML file to its respective :class:Epg or :class:ServiceInfo object
     
     :param i: String or File object to read XML from
     :type i: str, file
+    :param backend: :const:STDLIB to parse with ElementTree or :const:LXML with 
+    lxml, otherwise the default :data:backend
+    :type backend: str
     """
     
     # read data
     import StringIO
     d = i if isinstance(i, file) else StringIO.StringIO(i)
-    from xml.etree.ElementTree import parse 
-    doc = parse(d)
+    if get_backend(backend) == LXML:
+        doc = lxml.etree.parse(d, create_parser(name=LXML))
+    else:
+        doc = parse(d)
     root = doc.getroot()
     
     if root.tag == '{%s}serviceInformation' % SERVICEINFO_NS:
@@ -0,0 +1,81 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102 
+# 371 (Transportation and Binary Encoding Specification for EPG).
+# 
+# Copyright (C) 2013 Global Radio
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+import os
+import unittest
+
+from dabepg import *
+from dabepg.xml import marshall, unmarshall, iter_programmes, get_backend, MarshallListener, STDLIB, LXML
+from dabepg.test.sample import build_schedule, build_serviceinfo
+
+try:
+    import lxml
+except ImportError:
+    lxml = None
+    
+PI = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'test', 'PI.xml')
+
+class AttributeListener(MarshallListener):
+    
+    def on_element(self, doc, object, element):
+        if isinstance(object, Programme): 
+            element.setAttribute('xml:lang', 'cy')
+            element.appendChild(doc.createElement('epg:extra'))
+
+class BackendTest(unittest.TestCase):
+    
+    def test_get_backend(self):
+        self.assertEqual(STDLIB, get_backend(STDLIB))
+        self.assertEqual(STDLIB, get_backend())
+        self.assertRaises(ValueError, get_backend, 'minidom')
+        
+    @unittest.skipIf(lxml is None, 'lxml is not installed')
+    def test_parse(self):
+        for i in [open(PI).read(), marshall(build_schedule(services=2), backend=STDLIB)]:
+            self.assertEqual(marshall(unmarshall(i, backend=STDLIB), backend=STDLIB), 
+                             marshall(unmarshall(i, backend=LXML), backend=STDLIB))
+            self.assertEqual(len(list(iter_programmes(i, backend=STDLIB))), len(list(iter_programmes(i, backend=LXML))))
+            
+    @unittest.skipIf(lxml is None, 'lxml is not installed')
+    def test_marshall_epg(self):
+        epg = build_schedule(services=2)
+        expected = marshall(epg, backend=STDLIB)
+        for indent in (None, '  '):
+            xml = marshall(epg, indent=indent, backend=LXML)
+            self.assertTrue(xml.startswith('<?xml version="1.0" encoding="UTF-8"?>'))
+            self.assertEqual(expected, marshall(unmarshall(xml, backend=STDLIB), backend=STDLIB))
+            
+    @unittest.skipIf(lxml is None, 'lxml is not installed')
+    def test_marshall_serviceinfo(self):
+        info = build_serviceinfo()
+        self.assertEqual(marshall(info, backend=STDLIB).count('<'), marshall(info, backend=LXML).count('<'))
+            
+    @unittest.skipIf(lxml is None, 'lxml is not installed')
+    def test_listener(self):
+        epg = build_schedule()
+        xml = marshall(epg, AttributeListener(), backend=LXML)
+        self.assertEqual(24, xml.count('xml:lang="cy"'))
+        self.assertEqual(24, xml.count('<epg:extra/>'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102 
+# 371 (Transportation and Binary Encoding Specification for EPG).
+# 
+# Copyright (C) 2013 Global Radio
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Compares the XML backends on the shapes of test/PI.xml and test/SI.xml, scaled
+up by repeating their programmes and services.
+
+For PI, the scaled document is unmarshalled, read programme by programme and 
+marshalled again. SI.xml has logos the model does not yet parse, so its scaled 
+document is only parsed to elements, and the sample service information of five
+services is marshalled instead, scaled in the same way.
+
+USAGE: benchmark_backends.py [copies] [repeats]"""
+
+import os
+import re
+import sys
+import time
+
+from dabepg.xml import marshall, unmarshall, iter_programmes, create_parser, STDLIB, LXML, lxml
+from dabepg.test.sample import build_serviceinfo
+
+TEST = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'test')
+
+def scale(filename, tag, copies):
+    """Returns the document with each of its elements of the tag repeated"""
+    
+    xml = open(os.path.join(TEST, filename)).read()
+    pattern = re.compile(r'(\s*<%s[ >].*?</%s>)' % (tag, tag), re.S)
+    return pattern.sub(lambda match: match.group(1) * copies, xml)
+
+def parse_elements(xml, backend):
+    parser = create_parser(name=backend)
+    parser.feed(xml)
+    return parser.close()
+
+def measure(f, repeats):
+    best = None
+    for i in range(repeats):
+        start = time.time()
+        f()
+        elapsed = time.time() - start
+        if best is None or elapsed < best: best = elapsed
+    return best
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    copies = int(args[0]) if len(args) > 0 else 2000
+    repeats = int(args[1]) if len(args) > 1 else 3
+    backends = [STDLIB, LXML] if lxml is not None else [STDLIB]
+    
+    pi = scale('PI.xml', 'programme', copies)
+    si = scale('SI.xml', 'service', copies)
+    epg = unmarshall(pi, backend=STDLIB)
+    info = build_serviceinfo(services=5)
+    info.ensembles[0].services *= copies
+    print 'PI of %d bytes, %d programmes; SI of %d bytes, %d services' % \
+        (len(pi), len(epg.schedule.programmes), len(si), len(info.ensembles[0].services))
+    
+    cases = [('unmarshall PI', lambda backend: unmarshall(pi, backend=backend)),
+             ('iter_programmes PI', lambda backend: sum(1 for p in iter_programmes(pi, backend=backend))),
+             ('marshall PI', lambda backend: marshall(epg, backend=backend)),
+             ('marshall PI indented', lambda backend: marshall(epg, indent='  ', backend=backend)),
+             ('parse SI elements', lambda backend: parse_elements(si, backend)),
+             ('marshall SI', lambda backend: marshall(info, backend=backend))]
+    
+    print '%-22s' % '' + ''.join('%10s' % backend for backend in backends)
+    for name, f in cases:
+        print '%-22s' % name + ''.join('%9.3fs' % measure(lambda: f(backend), repeats) for backend in backends)
@@ -0,0 +1,58 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102 
+# 371 (Transportation and Binary Encoding Specification for EPG).
+# 
+# Copyright (C) 2013 Global Radio
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Measures the throughput of the XML parser in programmes per second, both for
+converting an already parsed element tree to the model and for unmarshalling 
+the document from its text.
+
+USAGE: benchmark_parser.py [services] [days] [repeats]"""
+
+import sys
+import time
+from xml.etree.ElementTree import fromstring
+
+from dabepg.xml import marshall, unmarshall, parse_epg
+from dabepg.test.sample import build_schedule
+
+def measure(f, repeats):
+    best = None
+    for i in range(repeats):
+        start = time.time()
+        f()
+        elapsed = time.time() - start
+        if best is None or elapsed < best: best = elapsed
+    return best
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    services = int(args[0]) if len(args) > 0 else 10
+    days = int(args[1]) if len(args) > 1 else 7
+    repeats = int(args[2]) if len(args) > 2 else 5
+    
+    xml = marshall(build_schedule(services=services, days=days))
+    root = fromstring(xml)
+    count = len(parse_epg(root).schedule.programmes)
+    print 'PI document of %d bytes, %d programmes' % (len(xml), count)
+    
+    for name, f in [('elements', lambda: parse_epg(root)), ('document', lambda: unmarshall(xml))]:
+        elapsed = measure(f, repeats)
+        print '%-10s %.3fs, %d programmes/s' % (name, elapsed, count / elapsed)
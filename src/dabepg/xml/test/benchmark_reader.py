@@ -0,0 +1,78 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102 
+# 371 (Transportation and Binary Encoding Specification for EPG).
+# 
+# Copyright (C) 2013 Global Radio
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+"""Compares unmarshalling a whole PI document against reading its programmes
+one at a time, in time and in peak memory. The document is written to a 
+temporary file first, and each run is made in a forked process so that peak 
+memory is measured separately.
+
+USAGE: benchmark_reader.py [services] [days]"""
+
+import os
+import sys
+import time
+import resource
+import tempfile
+
+from dabepg.xml import write_epg, unmarshall, iter_programmes
+from dabepg.test.sample import build_schedule
+
+def document(f):
+    return len(unmarshall(f).schedule.programmes)
+
+def streaming(f):
+    return sum(1 for programme in iter_programmes(f))
+
+def run(f, filename):
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.time()
+        count = f(open(filename, 'rb'))
+        elapsed = time.time() - start
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        os.write(w, '%d %f %d' % (count, elapsed, after - before))
+        os._exit(0)
+    os.close(w)
+    result = os.read(r, 1024)
+    os.waitpid(pid, 0)
+    count, elapsed, memory = result.split()
+    return int(count), float(elapsed), int(memory)
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    services = int(args[0]) if len(args) > 0 else 20
+    days = int(args[1]) if len(args) > 1 else 7
+    
+    fd, filename = tempfile.mkstemp(suffix='_PI.xml')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write_epg(build_schedule(services=services, days=days), f)
+        print 'PI document of %d bytes' % os.path.getsize(filename)
+        
+        for name, f in [('document', document), ('streaming', streaming)]:
+            count, elapsed, memory = run(f, filename)
+            print '%-10s %d programmes in %.3fs, peak memory +%dkB' % (name, count, elapsed, memory)
+    finally:
+        os.remove(filename)
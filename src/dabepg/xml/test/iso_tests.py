@@ -0,0 +1,70 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102 
+# 371 (Transportation and Binary Encoding Specification for EPG).
+# 
+# Copyright (C) 2013 Global Radio
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+import unittest
+import datetime
+
+import isodate
+from dabepg.xml import parse_datetime, parse_duration, get_iso_period, parsed_datetimes
+
+class IsoCodecTest(unittest.TestCase):
+    
+    def assertSameDatetime(self, string):
+        expected = isodate.parse_datetime(string)
+        parsed = parse_datetime(string)
+        self.assertEqual(expected, parsed)
+        self.assertEqual(expected.isoformat(), parsed.isoformat())
+    
+    def test_parse_datetime(self):
+        self.assertSameDatetime('2013-07-29T00:00:00+00:00')
+        self.assertSameDatetime('2011-07-27T09:03:35.389000+01:00')
+        self.assertSameDatetime('2003-12-18T00:00:00.5Z')
+        self.assertSameDatetime('2003-12-18T00:00:00-05:30')
+        self.assertSameDatetime('2003-12-18T00:00:00')
+        self.assertEqual(None, parse_datetime('2003-12-18T00:00:00').tzinfo)
+        
+    def test_datetime_fallback(self):
+        self.assertSameDatetime('20031218T000000Z')
+        self.assertSameDatetime('2003-12-18T10:00Z')
+        
+    def test_cached(self):
+        parsed = parse_datetime('2013-07-29T06:00:00+01:00')
+        self.assertTrue(parsed is parsed_datetimes['2013-07-29T06:00:00+01:00'])
+        self.assertTrue(parsed is parse_datetime('2013-07-29T06:00:00+01:00'))
+        self.assertTrue(parsed.tzinfo is parse_datetime('2013-07-29T07:00:00+01:00').tzinfo)
+        
+    def test_parse_duration(self):
+        for string in ['PT1H', 'PT45M', 'PT0S', 'PT1H30M15S', 'PT90M', 'P1D', 'PT1.5S', 'P1M']:
+            self.assertEqual(isodate.parse_duration(string), parse_duration(string))
+        self.assertEqual(datetime.timedelta(hours=2, seconds=5), parse_duration('PT2H5S'))
+            
+    def test_iso_period(self):
+        self.assertEqual('PT1H', get_iso_period(datetime.timedelta(hours=1)))
+        self.assertEqual('PT1H', get_iso_period(3600))
+        self.assertEqual('PT0S', get_iso_period(datetime.timedelta(0)))
+        self.assertEqual('PT1H1M1S', get_iso_period(datetime.timedelta(hours=1, minutes=1, seconds=1)))
+        for string in ['PT1H', 'PT45M', 'PT1H30M15S']:
+            self.assertEqual(string, get_iso_period(parse_duration(string)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102 
+# 371 (Transportation and Binary Encoding Specification for EPG).
+# 
+# Copyright (C) 2013 Global Radio
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+import unittest
+from StringIO import StringIO
+
+from xml.etree.ElementTree import fromstring
+
+from dabepg import *
+from dabepg.xml import marshall, unmarshall, iter_programmes, ProgrammeParser, parse_programme, SCHEDULE_NS, EPG_NS, \
+    STDLIB, LXML, lxml
+from dabepg.test.sample import build_schedule, build_serviceinfo
+
+class StreamingReaderTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.xml = marshall(build_schedule(services=2))
+        self.schedule = unmarshall(self.xml).schedule
+        
+    def assertProgrammes(self, programmes):
+        schedule = Schedule(self.schedule.created, self.schedule.version, self.schedule.originator)
+        schedule.programmes.extend(programmes)
+        self.assertEqual(marshall(Epg(self.schedule)), marshall(Epg(schedule)))
+
+    def test_iter_programmes(self):
+        self.assertProgrammes(iter_programmes(self.xml))
+        self.assertProgrammes(iter_programmes(StringIO(self.xml), chunk_size=7))
+        
+    def test_feed(self):
+        parser = ProgrammeParser()
+        programmes = []
+        for i in range(0, len(self.xml), 100):
+            parser.feed(self.xml[i:i + 100])
+            programmes.extend(parser.read_programmes())
+            if i == 0: self.assertEqual(None, parser.schedule)
+        parser.close()
+        programmes.extend(parser.read_programmes())
+        self.assertEqual(self.schedule.created, parser.schedule.created)
+        self.assertEqual('Global Radio', parser.schedule.originator)
+        self.assertProgrammes(programmes)
+        
+    def test_elements_cleared(self):
+        parser = ProgrammeParser(STDLIB)
+        parser.feed(self.xml[:len(self.xml) / 2])
+        self.assertTrue(len(list(parser.read_programmes())) > 0)
+        schedule = parser.builder.elements[1]
+        self.assertTrue(len(schedule) <= 2)
+        
+    @unittest.skipIf(lxml is None, 'lxml is not installed')
+    def test_lxml_elements_cleared(self):
+        parser = ProgrammeParser(LXML)
+        parser.feed(self.xml[:len(self.xml) / 2])
+        self.assertTrue(len(list(parser.read_programmes())) > 0)
+        schedule = parser.builder.root[0]
+        self.assertTrue(len(schedule) <= 2)
+        
+    @unittest.skipIf(lxml is None, 'lxml is not installed')
+    def test_lxml_iter_programmes(self):
+        self.assertProgrammes(iter_programmes(StringIO(self.xml), chunk_size=7, backend=LXML))
+        self.assertRaises(ValueError, list, iter_programmes(marshall(build_serviceinfo()), backend=LXML))
+        
+    def test_not_pi(self):
+        self.assertRaises(ValueError, list, iter_programmes(marshall(build_serviceinfo())))
+
+class ChildDispatchTest(unittest.TestCase):
+    
+    def test_programme(self):
+        element = fromstring('''<programme xmlns="%s" xmlns:epg="%s" shortId="1">
+            <epg:longName>Breakfast with Jo Whiley</epg:longName>
+            <epg:shortName>Brekkie</epg:shortName>
+            <epg:location><epg:bearer id="e1.ce15.c221.0"/><epg:relativeTime time="PT5M" duration="PT10M"/></epg:location>
+            <unknown/>
+            <keywords>music, pop</keywords>
+            <epg:programmeEvent shortId="2"><epg:mediumName>Live</epg:mediumName></epg:programmeEvent>
+            <epg:mediumName>Breakfast</epg:mediumName>
+        </programme>''' % (SCHEDULE_NS, EPG_NS))
+        programme = parse_programme(element)
+        self.assertEqual([LongName, ShortName, MediumName], [type(name) for name in programme.names])
+        self.assertEqual('Brekkie', programme.names[1].text)
+        self.assertEqual(1, len(programme.locations[0].bearers))
+        self.assertEqual(datetime.timedelta(minutes=5), programme.locations[0].times[0].billed_offset)
+        self.assertEqual(['music', 'pop'], programme.keywords)
+        self.assertEqual('Live', programme.events[0].names[0].text)
+        
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+#===============================================================================
+# Python DAB EPG API - Serialize/Deserialize To/From objects to XML/Binary as per
+# ETSI specifications TS 102 818 (XML Specification for DAB EPG) and TS 102 
+# 371 (Transportation and Binary Encoding Specification for EPG).
+# 
+# Copyright (C) 2013 Global Radio
+# 
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# 
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#===============================================================================
+
+import unittest
+import datetime
+from StringIO import StringIO
+from dateutil.tz import tzutc
+
+from dabepg import *
+from dabepg.bands import BAND_12B, BAND_12C, BAND_12D
+from dabepg.xml import marshall, unmarshall, write, MarshallListener, STDLIB, LXML, TYPES_NS, lxml
+from dabepg.test.sample import build_schedule, build_serviceinfo
+
+class RecordingListener(MarshallListener):
+    
+    def __init__(self):
+        self.objects = []
+    
+    def on_element(self, doc, object, element):
+        self.objects.append(object)
+        if isinstance(object, Programme): element.setAttribute('recorded', 'yes')
+
+class StreamingWriterTest(unittest.TestCase):
+    
+    def assertWritten(self, obj, **kwargs):
+        f = StringIO()
+        write(obj, f, **kwargs)
+        self.assertEqual(marshall(obj, **kwargs), f.getvalue())
+
+    def test_epg(self):
+        epg = build_schedule(services=2)
+        epg.schedule.programmes[0].names.append(LongName(u'Caf\xe9 & <Bar>'))
+        self.assertWritten(epg)
+        self.assertWritten(epg, indent='  ')
+        self.assertWritten(Epg(Schedule()))
+        
+    def test_serviceinfo(self):
+        info = build_serviceinfo()
+        info.ensembles[0].frequencies.append(BAND_12C)
+        self.assertWritten(info)
+        self.assertWritten(info, indent='  ')
+        self.assertWritten(ServiceInfo())
+        
+    def test_listener(self):
+        epg = build_schedule()
+        listener = RecordingListener()
+        f = StringIO()
+        write(epg, f, listener)
+        self.assertEqual(marshall(epg, RecordingListener()), f.getvalue())
+        self.assertEqual(24, f.getvalue().count('recorded="yes"'))
+        self.assertTrue(epg in listener.objects)
+        self.assertEqual(epg.schedule.programmes, [x for x in listener.objects if isinstance(x, Programme)])
+        
+    def test_frequencies(self):
+        info = build_serviceinfo(services=0)
+        info.ensembles[0].frequencies.extend([BAND_12C, BAND_12D])
+        xml = marshall(info)
+        self.assertTrue('<frequency kHz="%d"/>' % BAND_12B in xml)
+        self.assertEqual(2, xml.count('type="secondary"'))
+        
+    def test_event_broadcast(self):
+        epg = build_schedule()
+        epg.schedule.programmes[0].events.append(ProgrammeEvent(2, onair=False))
+        self.assertWritten(epg)
+        self.assertEqual(1, marshall(epg).count('broadcast="off-air"'))
+
+class ProgrammeCacheTest(unittest.TestCase):
+    
+    def test_remarshall(self):
+        epg = build_schedule(services=2)
+        cache = ProgrammeCache()
+        self.assertEqual(marshall(epg), marshall(epg, cache=cache))
+        epg.schedule.programmes[3].names[0].text = 'Changed'
+        self.assertEqual(marshall(epg), marshall(epg, cache=cache))
+        self.assertEqual((47, 49), (cache.hits, cache.misses))
+        
+        # a different indent writes every programme afresh
+        self.assertEqual(marshall(epg, indent='\t'), marshall(epg, indent='\t', cache=cache))
+        self.assertEqual((47, 97), (cache.hits, cache.misses))
+        
+    def test_streaming(self):
+        epg = build_schedule(services=2)
+        cache = ProgrammeCache()
+        for run in range(2):
+            f = StringIO()
+            write(epg, f, compact=True, cache=cache)
+            self.assertEqual(marshall(epg, compact=True), f.getvalue())
+        self.assertEqual((48, 48), (cache.hits, cache.misses))
+        
+class DeclaringListener(MarshallListener):
+    
+    def on_element(self, doc, object, element):
+        if isinstance(object, Text):
+            element.setAttribute('xml:lang', 'cy' if object.text == 'Breakfast' else 'en')
+            element.setAttribute('xmlns:epg', TYPES_NS)
+
+class CompactTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.epg = build_schedule(start=datetime.datetime(2013, 7, 29, tzinfo=tzutc()))
+        
+    def test_declarations(self):
+        xml = marshall(self.epg, DeclaringListener(), compact=True)
+        self.assertEqual(1, xml.count('xmlns:epg='))
+        self.assertEqual(1, xml.count('xml:lang="en"'))
+        self.assertEqual(4, xml.count('xml:lang="cy"'))
+        
+    def test_inferred(self):
+        xml = marshall(self.epg, compact=True)
+        self.assertFalse('version="1"' in xml)
+        self.assertFalse('CDATA' in xml)
+        self.assertTrue('time="2013-07-29T00:00:00Z"' in xml)
+        self.assertEqual(marshall(unmarshall(marshall(self.epg))), 
+                         marshall(unmarshall(xml)))
+        
+    def test_event_version(self):
+        # events have no version unless given one, so theirs is always written
+        events = self.epg.schedule.programmes[0].events
+        events.append(ProgrammeEvent(2, version=1))
+        xml = marshall(self.epg, compact=True)
+        for backend in [STDLIB] + ([LXML] if lxml is not None else []):
+            parsed = unmarshall(xml, backend=backend).schedule.programmes[0].events
+            self.assertEqual([x.version for x in events], [x.version for x in parsed])
+        
+    def test_blank(self):
+        self.epg.schedule.programmes[0].media.append(ShortDescription(' '))
+        info = build_serviceinfo(services=1)
+        info.ensembles[0].services[0].keywords = [' ']
+        self.assertEqual(32, marshall(self.epg, compact=True).count('<epg:mediaDescription>'))
+        self.assertFalse('<keywords>' in marshall(info, compact=True))
+        
+    def test_streaming(self):
+        info = build_serviceinfo()
+        for obj in (self.epg, info):
+            f = StringIO()
+            write(obj, f, DeclaringListener(), compact=True)
+            self.assertEqual(marshall(obj, DeclaringListener(), compact=True), f.getvalue())
+            
+    @unittest.skipIf(lxml is None, 'lxml is not installed')
+    def test_lxml(self):
+        self.epg.schedule.programmes[0].media.append(ShortDescription(' '))
+        expected = marshall(self.epg, DeclaringListener(), compact=True, backend=STDLIB)
+        xml = marshall(self.epg, DeclaringListener(), compact=True, backend=LXML)
+        self.assertEqual(len(expected), len(xml))
+        self.assertEqual(marshall(unmarshall(expected), backend=STDLIB), marshall(unmarshall(xml), backend=STDLIB))
+
+
+if __name__ == "__main__":
+    unittest.main()